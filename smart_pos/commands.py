@@ -0,0 +1,57 @@
+# Smart POS - Bench Commands
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("smart-pos-sync-benchmark")
+@click.option("--devices", default=5, help="Number of simulated devices")
+@click.option("--invoices", default=100, help="Invoices per device, per ingest path")
+@click.option("--path", "paths", multiple=True, help="Ingest path to run (repeatable, default all)")
+@click.option("--pos-profile", help="POS Profile to build invoices from")
+@click.option("--seed", type=int, help="Random seed for reproducible data")
+@click.option("--output", help="Where to save the JSON results")
+@click.option("--compare", nargs=2, help="Compare two saved result files instead of running")
+@click.option("--cleanup", is_flag=True, help="Delete documents created by earlier benchmark runs")
+@pass_context
+def sync_benchmark(context, devices, invoices, paths, pos_profile, seed, output, compare, cleanup):
+    """Benchmark offline sync throughput against the current site"""
+    import frappe
+    from smart_pos.smart_pos.benchmarks import sync_benchmark as benchmark
+    
+    if compare:
+        benchmark.compare(*compare)
+        return
+    
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    frappe.set_user("Administrator")
+    try:
+        if cleanup:
+            benchmark.cleanup()
+        else:
+            benchmark.run(devices, invoices, paths, pos_profile, seed, output)
+    finally:
+        frappe.destroy()
+
+
+@click.command("smart-pos-rebuild-sales-rollup")
+@click.option("--from-date", help="First posting date to rebuild (default: oldest invoice)")
+@click.option("--to-date", help="Last posting date to rebuild (default: today)")
+@pass_context
+def rebuild_sales_rollup(context, from_date, to_date):
+    """Recompute the POS sales and payment rollups from submitted invoices"""
+    import frappe
+    from smart_pos.smart_pos.utils.sales_rollup import rebuild_sales_rollup as rebuild
+    
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        rebuild(from_date, to_date)
+    finally:
+        frappe.destroy()
+
+
+commands = [sync_benchmark, rebuild_sales_rollup]
@@ -52,18 +52,41 @@ doc_events = {
     },
     "POS Closing Entry": {
         "on_submit": "smart_pos.smart_pos.api.pos_api.on_closing_entry_submit"
+    },
+    "User": {
+        "on_update": "smart_pos.smart_pos.utils.display_names.on_update",
+        "on_trash": "smart_pos.smart_pos.utils.display_names.on_update",
+        "after_rename": "smart_pos.smart_pos.utils.display_names.after_rename"
+    },
+    "Customer": {
+        "on_update": "smart_pos.smart_pos.utils.display_names.on_update",
+        "on_trash": "smart_pos.smart_pos.utils.display_names.on_update",
+        "after_rename": "smart_pos.smart_pos.utils.display_names.after_rename"
+    },
+    "Item": {
+        "on_update": "smart_pos.smart_pos.utils.display_names.on_update",
+        "on_trash": "smart_pos.smart_pos.utils.display_names.on_update",
+        "after_rename": "smart_pos.smart_pos.utils.display_names.after_rename"
     }
 }
 
+# Request Hooks
+after_request = ["smart_pos.smart_pos.utils.admission.add_retry_after_header"]
+
 # Scheduled Tasks
 scheduler_events = {
     "cron": {
+        "* * * * *": [
+            "smart_pos.smart_pos.utils.zatca_queue.start_zatca_queue"
+        ],
         "*/5 * * * *": [
-            "smart_pos.smart_pos.api.sync_api.process_pending_sync"
+            "smart_pos.smart_pos.api.sync_api.process_pending_sync",
+            "smart_pos.smart_pos.utils.zatca_signing.resume_stale_batches"
         ]
     },
     "daily": [
-        "smart_pos.smart_pos.api.pos_api.cleanup_old_sessions"
+        "smart_pos.smart_pos.api.pos_api.cleanup_old_sessions",
+        "smart_pos.smart_pos.api.sync_api.cleanup_old_sync_logs"
     ],
     "hourly": [
         "smart_pos.smart_pos.api.sync_api.sync_master_data"
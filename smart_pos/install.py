@@ -6,11 +6,27 @@ import frappe
 from frappe import _
 
 
+# Composite indexes for the invoice queries behind the POS reports
+REPORT_INDEXES = [
+    ("POS Invoice", ["posting_date", "docstatus", "pos_profile", "is_return", "grand_total"], "smart_pos_report_date"),
+    ("POS Invoice", ["pos_session", "docstatus"], "smart_pos_report_session"),
+    ("POS Invoice", ["docstatus", "custom_zatca_status"], "smart_pos_report_zatca"),
+    ("Sales Invoice Payment", ["parent", "mode_of_payment", "amount"], "smart_pos_report_payment"),
+]
+
+# Recent invoices list of the manager page
+MANAGER_INDEXES = [
+    ("POS Invoice", ["docstatus", "creation"], "smart_pos_recent_invoices"),
+    ("POS Invoice", ["pos_profile", "docstatus", "creation"], "smart_pos_recent_profile_invoices"),
+]
+
+
 def after_install():
     """Run after app installation"""
     create_default_pos_profile()
     create_default_settings()
     setup_custom_fields()
+    create_report_indexes()
     create_print_formats()
     print("Smart POS installed successfully!")
 
@@ -139,6 +155,13 @@ def setup_custom_fields():
                     print(f"Could not create custom field {field_name}: {e}")
 
 
+def create_report_indexes(indexes=None):
+    """Add reporting indexes, skipping columns that custom fields have not created yet"""
+    for doctype, fields, index_name in indexes or REPORT_INDEXES + MANAGER_INDEXES:
+        if all(frappe.db.has_column(doctype, field) for field in fields):
+            frappe.db.add_index(doctype, fields, index_name)
+
+
 def create_print_formats():
     """Create POS Thermal Receipt print format"""
     import os
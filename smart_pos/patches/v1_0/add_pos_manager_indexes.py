@@ -0,0 +1,6 @@
+from smart_pos.install import MANAGER_INDEXES, create_report_indexes
+
+
+def execute():
+    """Add the indexes behind the manager page's recent invoices list"""
+    create_report_indexes(MANAGER_INDEXES)
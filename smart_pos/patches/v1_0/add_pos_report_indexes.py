@@ -0,0 +1,6 @@
+from smart_pos.install import REPORT_INDEXES, create_report_indexes
+
+
+def execute():
+    """Add composite indexes for the POS reporting queries"""
+    create_report_indexes(REPORT_INDEXES)
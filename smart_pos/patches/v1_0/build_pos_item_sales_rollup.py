@@ -0,0 +1,6 @@
+from smart_pos.smart_pos.utils.sales_rollup import ITEM_ROLLUP, rebuild_sales_rollup
+
+
+def execute():
+    """Populate the item sales rollup from existing invoices"""
+    rebuild_sales_rollup(doctypes=[ITEM_ROLLUP])
@@ -0,0 +1,6 @@
+from smart_pos.smart_pos.utils.sales_rollup import rebuild_sales_rollup
+
+
+def execute():
+    """Populate the sales and payment rollups from existing invoices"""
+    rebuild_sales_rollup()
@@ -0,0 +1,26 @@
+import frappe
+
+from smart_pos.smart_pos.utils.zatca_queue import is_zatca_company
+
+
+def execute():
+    """Queue submitted invoices that were never reported to ZATCA"""
+    if not frappe.db.has_column("POS Invoice", "custom_zatca_status"):
+        return
+    
+    companies = [c for c in frappe.get_all("Company", pluck="name") if is_zatca_company(c)]
+    if not companies:
+        return
+    
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabPOS ZATCA Queue`
+            (name, invoice, company, pos_profile, pos_session, status, attempt_count,
+             next_attempt_at, creation, modified, owner, modified_by, docstatus)
+        SELECT
+            name, name, company, pos_profile, pos_session, 'Pending', 0,
+            NOW(), NOW(), NOW(), 'Administrator', 'Administrator', 0
+        FROM `tabPOS Invoice`
+        WHERE docstatus = 1
+            AND company IN %(companies)s
+            AND IFNULL(custom_zatca_status, '') IN ('', 'Not Submitted')
+    """, {"companies": companies})
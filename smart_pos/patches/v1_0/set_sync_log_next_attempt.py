@@ -0,0 +1,10 @@
+import frappe
+
+
+def execute():
+    """Make existing retryable sync logs due immediately under the backoff scheduler"""
+    frappe.db.sql("""
+        UPDATE `tabPOS Sync Log`
+        SET next_attempt_at = COALESCE(last_attempt, creation)
+        WHERE next_attempt_at IS NULL AND status IN ('Pending', 'Failed')
+    """)
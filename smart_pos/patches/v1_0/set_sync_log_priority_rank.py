@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+    """Derive numeric priority ranks for existing sync logs"""
+    frappe.db.sql("""
+        UPDATE `tabPOS Sync Log`
+        SET priority_rank = CASE priority WHEN 'High' THEN 3 WHEN 'Low' THEN 1 ELSE 2 END
+    """)
@@ -14,7 +14,11 @@ class POSSyncEngine {
         this.settings = {
             syncIntervalMs: 30000,  // 30 seconds
             maxRetries: 5,
-            retryDelayMs: 5000
+            retryDelayMs: 5000,
+            compactUpload: true,  // gzip + field-dictionary batches (protocol v1)
+            compactBatchSize: 100,
+            reconnectJitterMs: 15000,  // spread terminals out after an outage
+            maxRetryAfterMs: 120000
         };
     }
 
@@ -44,7 +48,8 @@ class POSSyncEngine {
         this.emit('online');
         console.log('🌐 Connection restored - starting sync');
         
-        // Immediate sync on reconnect
+        // Random delay so terminals of a store do not all reconnect at once
+        await this.sleep(Math.random() * this.settings.reconnectJitterMs);
         await this.syncAll();
         
         // Resume periodic sync
@@ -160,6 +165,17 @@ class POSSyncEngine {
         const pendingInvoices = await window.POSDatabase.getUnsyncedInvoices();
         console.log(`📤 Syncing ${pendingInvoices.length} pending invoices`);
 
+        if (this.settings.compactUpload && typeof CompressionStream !== 'undefined') {
+            for (let i = 0; i < pendingInvoices.length; i += this.settings.compactBatchSize) {
+                const batch = pendingInvoices.slice(i, i + this.settings.compactBatchSize);
+                const batchResults = await this.uploadCompactBatch(batch);
+                results.success += batchResults.success;
+                results.failed += batchResults.failed;
+                results.errors.push(...batchResults.errors);
+            }
+            return results;
+        }
+
         for (const invoice of pendingInvoices) {
             try {
                 const response = await this.callAPI('smart_pos.smart_pos.api.pos_api.create_pos_invoice', {
@@ -183,6 +199,75 @@ class POSSyncEngine {
         return results;
     }
 
+    /**
+     * Upload a batch of invoices in the compact sync format
+     */
+    async uploadCompactBatch(invoices) {
+        const results = { success: 0, failed: 0, errors: [] };
+        const body = await this.gzip(this.encodeCompactBatch(invoices));
+
+        const ack = await this.request('smart_pos.smart_pos.api.sync_api.upload_offline_data', body, 'application/x-smart-pos-sync');
+
+        for (const [offlineId, serverName] of ack.ack) {
+            await window.POSDatabase.markInvoiceSynced(offlineId, serverName);
+            results.success++;
+            this.emit('invoiceSynced', { offline_id: offlineId, server_name: serverName });
+        }
+
+        for (const [offlineId, error] of ack.err) {
+            results.failed++;
+            results.errors.push({ offline_id: offlineId, error: error });
+        }
+
+        return results;
+    }
+
+    /**
+     * Encode invoices as newline-delimited JSON with one field dictionary per table
+     */
+    encodeCompactBatch(invoices) {
+        const childTables = { items: 'item', payments: 'payment', taxes: 'tax' };
+        const fieldSets = { invoice: new Set(), item: new Set(), payment: new Set(), tax: new Set() };
+
+        for (const invoice of invoices) {
+            for (const [key, value] of Object.entries(invoice)) {
+                if (childTables[key]) {
+                    (value || []).forEach(row => Object.keys(row).forEach(field => fieldSets[childTables[key]].add(field)));
+                } else {
+                    fieldSets.invoice.add(key);
+                }
+            }
+        }
+
+        const fields = {};
+        for (const [table, fieldSet] of Object.entries(fieldSets)) {
+            fields[table] = [...fieldSet];
+        }
+
+        const pack = (row, names) => names.map(name => row[name] === undefined ? null : row[name]);
+        const lines = [JSON.stringify({ v: 1, fields: fields })];
+
+        for (const invoice of invoices) {
+            lines.push(JSON.stringify([
+                'i',
+                pack(invoice, fields.invoice),
+                (invoice.items || []).map(row => pack(row, fields.item)),
+                (invoice.payments || []).map(row => pack(row, fields.payment)),
+                (invoice.taxes || []).map(row => pack(row, fields.tax))
+            ]));
+        }
+
+        return lines.join('\n');
+    }
+
+    /**
+     * Gzip a string using the browser's CompressionStream
+     */
+    async gzip(text) {
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        return new Response(stream).arrayBuffer();
+    }
+
     /**
      * Sync pending customers to server
      */
@@ -228,6 +313,12 @@ class POSSyncEngine {
             return;
         }
 
+        // Devices with an ID resume from their server-side cursor
+        const deviceId = localStorage.getItem('pos_device_id');
+        if (deviceId) {
+            return this.downloadMasterDataChunks(posProfile, deviceId);
+        }
+
         const lastSync = await window.POSDatabase.getLastSyncTime();
         
         try {
@@ -268,12 +359,89 @@ class POSSyncEngine {
         }
     }
 
+    /**
+     * Download master data in acknowledged chunks, resuming where the last run stopped
+     */
+    async downloadMasterDataChunks(posProfile, deviceId) {
+        const totals = { items: 0, customers: 0, prices: 0 };
+
+        try {
+            this.emit('downloadStart');
+
+            for (const section of ['Items', 'Customers', 'Prices']) {
+                let hasMore = true;
+
+                while (hasMore) {
+                    const chunk = await this.callAPI('smart_pos.smart_pos.api.sync_api.get_master_data_chunk', {
+                        pos_profile: posProfile,
+                        device_id: deviceId,
+                        section: section
+                    });
+
+                    if (chunk.rows.length > 0) {
+                        await this.saveMasterDataChunk(section, chunk.rows);
+                        await this.callAPI('smart_pos.smart_pos.api.sync_api.ack_master_data_chunk', {
+                            pos_profile: posProfile,
+                            device_id: deviceId,
+                            section: section,
+                            cursor: chunk.cursor,
+                            row_count: chunk.rows.length
+                        });
+                        totals[section.toLowerCase()] += chunk.rows.length;
+                    }
+
+                    hasMore = chunk.has_more;
+                }
+            }
+
+            console.log('📥 Downloaded master data', totals);
+            await window.POSDatabase.setLastSyncTime(new Date().toISOString());
+            this.emit('downloadComplete', totals);
+
+        } catch (error) {
+            console.error('Master data download error:', error);
+            this.emit('downloadError', error);
+        }
+    }
+
+    /**
+     * Store one downloaded chunk of a master data section locally
+     */
+    async saveMasterDataChunk(section, rows) {
+        if (section === 'Items') {
+            await window.POSDatabase.saveItems(rows);
+        } else if (section === 'Customers') {
+            rows.forEach(customer => customer.synced = true);
+            await window.POSDatabase.saveCustomers(rows);
+        } else if (section === 'Prices') {
+            const items = [];
+            for (const price of rows) {
+                const item = await window.POSDatabase.getItem(price.item_code);
+                if (item) {
+                    item.price = price.price_list_rate;
+                    items.push(item);
+                }
+            }
+            await window.POSDatabase.saveItems(items);
+        }
+    }
+
     /**
      * Force full data refresh
      */
     async forceFullSync() {
         // Clear last sync time to get all data
         await window.POSDatabase.saveSetting('lastSyncTime', null);
+
+        const posProfile = await window.POSDatabase.getSetting('posProfile');
+        const deviceId = localStorage.getItem('pos_device_id');
+        if (posProfile && deviceId && this.isOnline) {
+            await this.callAPI('smart_pos.smart_pos.api.sync_api.reset_master_data_cursor', {
+                pos_profile: posProfile,
+                device_id: deviceId
+            });
+        }
+
         return this.syncAll();
     }
 
@@ -339,26 +507,61 @@ class POSSyncEngine {
      * Call Frappe API
      */
     async callAPI(method, args = {}) {
-        const response = await fetch('/api/method/' + method, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-Frappe-CSRF-Token': frappe?.csrf_token || ''
-            },
-            body: JSON.stringify(args)
-        });
+        return this.request(method, JSON.stringify(args), 'application/json');
+    }
 
-        if (!response.ok) {
-            throw new Error(`API Error: ${response.status}`);
-        }
+    /**
+     * POST to a sync endpoint, waiting out server admission control (HTTP 429)
+     * for as long as its Retry-After hint says
+     */
+    async request(method, body, contentType) {
+        for (let attempt = 0; ; attempt++) {
+            const response = await fetch('/api/method/' + method, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': contentType,
+                    'X-Frappe-CSRF-Token': frappe?.csrf_token || '',
+                    'X-POS-Sync': '1',
+                    'X-POS-Device-ID': localStorage.getItem('pos_device_id') || ''
+                },
+                body: body
+            });
 
-        const result = await response.json();
-        
-        if (result.exc) {
-            throw new Error(result.exc);
+            if (response.status === 429 && attempt < this.settings.maxRetries) {
+                const retryAfterMs = this.getRetryAfterMs(response, attempt);
+                console.log(`⏳ Sync server busy - retrying in ${Math.round(retryAfterMs / 1000)}s`);
+                this.emit('throttled', { method: method, retryAfterMs: retryAfterMs });
+                await this.sleep(retryAfterMs);
+                continue;
+            }
+
+            if (!response.ok) {
+                throw new Error(`API Error: ${response.status}`);
+            }
+
+            const result = await response.json();
+            
+            if (result.exc) {
+                throw new Error(result.exc);
+            }
+
+            return result.message;
         }
+    }
+
+    /**
+     * Delay requested by the server, or exponential backoff when it gave none
+     */
+    getRetryAfterMs(response, attempt) {
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+        const delayMs = retryAfter > 0
+            ? retryAfter * 1000
+            : this.settings.retryDelayMs * Math.pow(2, attempt) * (1 + Math.random());
+        return Math.min(delayMs, this.settings.maxRetryAfterMs);
+    }
 
-        return result.message;
+    sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
     }
 }
 
@@ -13,6 +13,13 @@ from frappe.utils import now_datetime, flt, cint, getdate, get_datetime, nowdate
 import json
 from typing import Dict, List, Optional, Any
 
+from smart_pos.smart_pos.utils.admission import admit_sync_request
+from smart_pos.smart_pos.utils.sales_rollup import update_sales_rollup
+from smart_pos.smart_pos.utils.report_cache import bump_data_version
+from smart_pos.smart_pos.utils.display_names import get_display_name
+from smart_pos.smart_pos.utils.live_dashboard import update_live_totals
+from smart_pos.smart_pos.utils.zatca_queue import queue_zatca_report, remove_from_zatca_queue
+
 
 # =============================================================================
 # Permission Check
@@ -597,6 +604,7 @@ def get_all_customers_for_offline() -> List[Dict]:
 # =============================================================================
 
 @frappe.whitelist()
+@admit_sync_request(sync_clients_only=True)
 def create_pos_invoice(invoice_data) -> Dict:
     """Create POS Invoice"""
     if isinstance(invoice_data, str):
@@ -1056,7 +1064,7 @@ def get_receipt_data(invoice_name: str) -> Dict:
         "discount": invoice.discount_amount,
         "grand_total": invoice.grand_total,
         "payments": payments,
-        "cashier": frappe.db.get_value("User", invoice.owner, "full_name")
+        "cashier": get_display_name("User", invoice.owner)
     }
 
 
@@ -1079,6 +1087,11 @@ def on_pos_invoice_submit(doc, method):
     
     # Update customer loyalty points
     update_customer_loyalty(doc)
+    
+    update_sales_rollup(doc)
+    bump_data_version(doc)
+    update_live_totals(doc)
+    queue_zatca_report(doc)
 
 
 def on_pos_invoice_cancel(doc, method):
@@ -1096,6 +1109,11 @@ def on_pos_invoice_cancel(doc, method):
     
     # Reverse loyalty points
     reverse_customer_loyalty(doc)
+    
+    update_sales_rollup(doc, -1)
+    bump_data_version(doc)
+    update_live_totals(doc, -1)
+    remove_from_zatca_queue(doc)
 
 
 def on_opening_entry_submit(doc, method):
@@ -1247,7 +1265,7 @@ def get_print_receipt_data(invoice_name: str):
         "invoice_name": invoice.name,
         "posting_date": str(invoice.posting_date),
         "posting_time": str(invoice.posting_time) if invoice.posting_time else "",
-        "cashier": frappe.db.get_value("User", invoice.owner, "full_name") or invoice.owner,
+        "cashier": get_display_name("User", invoice.owner),
         "customer_name": invoice.customer_name,
         "items": [{
             "item_name": item.item_name,
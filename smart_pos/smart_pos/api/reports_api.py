@@ -9,24 +9,103 @@ Provides detailed session reports, sales analytics, and dashboard data
 
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, flt, cint, getdate, add_days, nowdate
+from frappe.utils import now_datetime, flt, cint, getdate, add_days, date_diff, nowdate
+import calendar
 import json
 from datetime import datetime, timedelta
 
+from smart_pos.smart_pos.utils.display_names import get_display_names, set_display_names
+from smart_pos.smart_pos.utils.item_analytics import build_item_analysis, get_numpy
+from smart_pos.smart_pos.utils.live_dashboard import get_live_totals
+from smart_pos.smart_pos.utils.replica import read_from_replica
+from smart_pos.smart_pos.utils.report_cache import cached_report, get_cached_history, get_data_version
+from smart_pos.smart_pos.utils.report_export import build_export_response
+from smart_pos.smart_pos.utils.report_jobs import get_job, get_job_status, is_job_requester, start_report_job
+from smart_pos.smart_pos.utils.report_queries import (
+    apply_keyset,
+    apply_scope,
+    get_customer_activity,
+    get_customer_totals,
+    get_filter_values,
+    get_group_fields,
+    get_keyset_page,
+    get_open_sessions,
+    get_payment_rollup_totals,
+    get_recent_invoices,
+    get_sales_rollup_totals,
+    get_top_customers,
+    get_top_items,
+)
+from smart_pos.smart_pos.utils.zatca_queue import UNREPORTED_STATUSES, ZATCA_QUEUE
+
+
+# Longer ranges run as background jobs split by month
+REPORT_JOB_MIN_DAYS = 90
+
+HEATMAP_METRICS = ("sales", "invoices")
+HEATMAP_DEFAULT_DAYS = 91
+HEATMAP_BAND = (10, 50, 90)
+
+BRANCH_DASHBOARD_FIELDS = (
+    "today_sales", "today_invoices", "today_returns",
+    "yesterday_sales", "yesterday_invoices", "yesterday_returns",
+    "week_sales", "week_invoices", "week_returns",
+    "month_sales", "month_invoices", "month_returns"
+)
+# Counted on every call, the report cache's data version does not follow them
+BRANCH_COUNT_FIELDS = ("active_sessions", "pending_zatca")
+
+INVOICE_PAGE_LENGTH = 50
+RECENT_INVOICE_PAGE_LENGTH = 10
+SESSION_PAGE_LENGTH = 50
+MAX_INVOICE_PAGE_LENGTH = 500
+
+EXPORT_FIELDS = [
+    ("name", "Invoice"),
+    ("posting_date", "Posting Date"),
+    ("posting_time", "Posting Time"),
+    ("customer", "Customer"),
+    ("pos_profile", "POS Profile"),
+    ("owner", "Cashier"),
+    ("is_return", "Is Return"),
+    ("grand_total", "Grand Total"),
+    ("status", "Status")
+]
+
 
 @frappe.whitelist()
-def get_session_detailed_report(session_id):
-    """Get comprehensive session report with all details"""
+@read_from_replica
+def get_session_detailed_report(session_id, page_length=None, after=None):
+    """
+    Get comprehensive session report with all details
+    Invoices are paginated, pass next_cursor back as `after` for the next page
+    """
     session = frappe.get_doc("POS Session", session_id)
     
-    # Get all invoices for session
-    invoices = frappe.get_all(
-        "POS Invoice",
-        filters={"pos_session": session_id},
-        fields=["name", "customer", "grand_total", "is_return", "posting_date", 
-                "posting_time", "docstatus", "status"]
+    # Get one page of the session's invoices
+    invoice = frappe.qb.DocType("POS Invoice")
+    invoices = get_invoice_page(
+        frappe.qb.from_(invoice)
+        .select(
+            invoice.name, invoice.customer, invoice.grand_total, invoice.is_return,
+            invoice.posting_date, invoice.posting_time, invoice.docstatus, invoice.status
+        )
+        .where(invoice.pos_session == session_id),
+        page_length, after
     )
     
+    # Get sales and returns totals
+    totals = frappe.db.sql("""
+        SELECT 
+            COUNT(*) as total_invoices,
+            COALESCE(SUM(CASE WHEN is_return = 0 THEN 1 ELSE 0 END), 0) as sales_count,
+            COALESCE(SUM(CASE WHEN is_return = 1 THEN 1 ELSE 0 END), 0) as returns_count,
+            COALESCE(SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END), 0) as total_sales,
+            COALESCE(SUM(CASE WHEN is_return = 1 THEN ABS(grand_total) ELSE 0 END), 0) as total_returns
+        FROM `tabPOS Invoice`
+        WHERE pos_session = %s AND docstatus = 1
+    """, session_id, as_dict=True)[0]
+    
     # Get payment breakdown
     payment_breakdown = frappe.db.sql("""
         SELECT 
@@ -55,40 +134,31 @@ def get_session_detailed_report(session_id):
     # Get top selling items
     top_items = frappe.db.sql("""
         SELECT 
-            item.item_code,
-            item.item_name,
-            SUM(item.qty) as total_qty,
-            SUM(item.amount) as total_amount
-        FROM `tabPOS Invoice Item` item
-        JOIN `tabPOS Invoice` pi ON pi.name = item.parent
-        WHERE pi.pos_session = %s AND pi.docstatus = 1
-        GROUP BY item.item_code, item.item_name
+            item_code,
+            MAX(item_name) as item_name,
+            SUM(qty) as total_qty,
+            SUM(amount) as total_amount
+        FROM `tabPOS Item Sales Rollup`
+        WHERE pos_session = %s
+        GROUP BY item_code
         ORDER BY total_qty DESC
         LIMIT 10
     """, session_id, as_dict=True)
+    set_display_names(top_items, "Item", "item_code", "item_name")
     
     # Get item group breakdown
     group_sales = frappe.db.sql("""
         SELECT 
-            i.item_group,
-            SUM(item.qty) as total_qty,
-            SUM(item.amount) as total_amount
-        FROM `tabPOS Invoice Item` item
-        JOIN `tabPOS Invoice` pi ON pi.name = item.parent
-        JOIN `tabItem` i ON i.name = item.item_code
-        WHERE pi.pos_session = %s AND pi.docstatus = 1
-        GROUP BY i.item_group
+            item_group,
+            SUM(qty) as total_qty,
+            SUM(amount) as total_amount
+        FROM `tabPOS Item Sales Rollup`
+        WHERE pos_session = %s
+        GROUP BY item_group
         ORDER BY total_amount DESC
     """, session_id, as_dict=True)
     
-    # Calculate statistics
-    submitted_invoices = [inv for inv in invoices if inv.docstatus == 1]
-    returns = [inv for inv in submitted_invoices if inv.is_return]
-    sales = [inv for inv in submitted_invoices if not inv.is_return]
-    
-    total_sales = sum(inv.grand_total for inv in sales)
-    total_returns = sum(inv.grand_total for inv in returns)
-    net_sales = total_sales - abs(total_returns)
+    total_sales = flt(totals.total_sales)
     
     return {
         "session": {
@@ -105,51 +175,51 @@ def get_session_detailed_report(session_id):
             "cash_difference": session.cash_difference
         },
         "summary": {
-            "total_invoices": len(submitted_invoices),
-            "sales_count": len(sales),
-            "returns_count": len(returns),
+            "total_invoices": totals.total_invoices,
+            "sales_count": totals.sales_count,
+            "returns_count": totals.returns_count,
             "total_sales": total_sales,
-            "total_returns": abs(total_returns),
-            "net_sales": net_sales,
-            "average_sale": total_sales / len(sales) if sales else 0
+            "total_returns": flt(totals.total_returns),
+            "net_sales": total_sales - flt(totals.total_returns),
+            "average_sale": total_sales / totals.sales_count if totals.sales_count else 0
         },
         "payments": payment_breakdown,
         "hourly_sales": hourly_sales,
         "top_items": top_items,
         "group_sales": group_sales,
-        "invoices": invoices
+        "invoices": invoices["invoices"],
+        "next_cursor": invoices["next_cursor"]
     }
 
 
 @frappe.whitelist()
-def get_daily_sales_report(date=None, pos_profile=None):
-    """Get daily sales report"""
+@read_from_replica
+def get_daily_sales_report(date=None, pos_profile=None, company=None, page_length=None, after=None):
+    """
+    Get daily sales report
+    Invoices are paginated, pass next_cursor back as `after` for the next page
+    """
     if not date:
         date = nowdate()
     
-    filters = {"posting_date": date, "docstatus": 1}
-    if pos_profile:
-        filters["pos_profile"] = pos_profile
-    
-    # Get invoices
-    invoices = frappe.get_all(
-        "POS Invoice",
-        filters=filters,
-        fields=["name", "customer", "grand_total", "is_return", "posting_time",
-                "pos_profile", "user"]
+    # Get one page of invoices
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(
+            invoice.name, invoice.customer, invoice.grand_total, invoice.is_return,
+            invoice.posting_time, invoice.pos_profile, invoice.user
+        )
+        .where(invoice.posting_date == date)
+        .where(invoice.docstatus == 1)
     )
+    invoices = get_invoice_page(apply_scope(query, invoice, pos_profile, company), page_length, after)
     
     # Get hourly breakdown
-    hourly = frappe.db.sql("""
-        SELECT 
-            HOUR(posting_time) as hour,
-            COUNT(*) as count,
-            SUM(grand_total) as total
-        FROM `tabPOS Invoice`
-        WHERE posting_date = %s AND docstatus = 1
-        GROUP BY HOUR(posting_time)
-        ORDER BY hour
-    """, date, as_dict=True)
+    hourly = [
+        {'hour': h.hour, 'count': h.invoice_count, 'total': flt(h.sales) - flt(h.returns)}
+        for h in get_sales_rollup(date, date, pos_profile, company, group_by="hour")
+    ]
     
     # Fill missing hours with zeros
     hourly_dict = {h['hour']: h for h in hourly}
@@ -161,63 +231,122 @@ def get_daily_sales_report(date=None, pos_profile=None):
             hourly_complete.append({'hour': h, 'count': 0, 'total': 0})
     
     # Get payment breakdown
-    payments = frappe.db.sql("""
-        SELECT 
-            sip.mode_of_payment,
-            SUM(sip.amount) as total
-        FROM `tabSales Invoice Payment` sip
-        JOIN `tabPOS Invoice` pi ON pi.name = sip.parent
-        WHERE pi.posting_date = %s AND pi.docstatus = 1
-        GROUP BY sip.mode_of_payment
-    """, date, as_dict=True)
+    payments = get_payment_rollup_totals(date, date, pos_profile, company)
     
-    sales = [inv for inv in invoices if not inv.is_return]
-    returns = [inv for inv in invoices if inv.is_return]
+    totals = get_sales_rollup(date, date, pos_profile, company)[0]
     
     return {
         "date": date,
         "summary": {
-            "total_invoices": len(invoices),
-            "total_sales": sum(inv.grand_total for inv in sales),
-            "total_returns": abs(sum(inv.grand_total for inv in returns)),
-            "net_sales": sum(inv.grand_total for inv in sales) - abs(sum(inv.grand_total for inv in returns))
+            "total_invoices": totals.invoice_count,
+            "total_sales": totals.sales,
+            "total_returns": totals.returns,
+            "net_sales": flt(totals.sales) - flt(totals.returns)
         },
         "hourly": hourly_complete,
         "payments": payments,
-        "invoices": invoices
+        "invoices": invoices["invoices"],
+        "next_cursor": invoices["next_cursor"]
     }
 
 
 @frappe.whitelist()
-def get_sales_trend(days=7, pos_profile=None):
+@read_from_replica
+def export_report_invoices(report, file_format="CSV", date=None, pos_profile=None, company=None, session_id=None):
+    """
+    Download every invoice of a daily or session report as CSV or XLSX
+    Rows come from an unbuffered cursor and go straight to the file
+    """
+    if not frappe.has_permission("POS Invoice", "export"):
+        frappe.throw(_("Not permitted to export POS Invoices"), frappe.PermissionError)
+    
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(*[invoice[field] for field, label in EXPORT_FIELDS])
+        .orderby(invoice.name)
+    )
+    
+    if report == "session":
+        query = query.where(invoice.pos_session == session_id)
+        filename = f"pos-session-{session_id}"
+    elif report == "daily":
+        date = date or nowdate()
+        query = query.where(invoice.posting_date == date).where(invoice.docstatus == 1)
+        query = apply_scope(query, invoice, pos_profile, company)
+        filename = f"pos-sales-{date}"
+    else:
+        frappe.throw(_("Unknown report: {0}").format(report))
+    
+    columns = [_(label) for field, label in EXPORT_FIELDS]
+    with frappe.db.unbuffered_cursor():
+        return build_export_response(query.run(as_iterator=True), columns, filename, file_format)
+
+
+def get_invoice_page(query, page_length=None, after=None) -> dict:
+    """
+    One page of a POS Invoice query, newest first by (creation, name)
+    after: the next_cursor of the previous page
+    """
+    frappe.has_permission("POS Invoice", "read", throw=True)
+    page_length = min(cint(page_length) or INVOICE_PAGE_LENGTH, MAX_INVOICE_PAGE_LENGTH)
+    
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = apply_keyset(query.select(invoice.creation), invoice.creation, invoice.name, after)
+    invoices, next_cursor = get_keyset_page(query, "creation", page_length)
+    
+    return {"invoices": invoices, "next_cursor": next_cursor}
+
+
+@frappe.whitelist()
+@read_from_replica
+def get_sales_trend(days=7, pos_profile=None, company=None):
     """Get sales trend for last N days"""
+    days = cint(days) or 7
+    if days <= REPORT_JOB_MIN_DAYS:
+        return get_recent_sales_trend(days, pos_profile, company)
+    
+    # Job status is per requester and changes as the job runs, so it is never cached
     end_date = getdate(nowdate())
     start_date = add_days(end_date, -days + 1)
-    
-    filters = {
-        "posting_date": ["between", [start_date, end_date]],
-        "docstatus": 1
-    }
-    if pos_profile:
-        filters["pos_profile"] = pos_profile
-    
-    daily_sales = frappe.db.sql("""
-        SELECT 
-            posting_date as date,
-            COUNT(*) as invoice_count,
-            SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END) as sales,
-            SUM(CASE WHEN is_return = 1 THEN ABS(grand_total) ELSE 0 END) as returns
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s AND docstatus = 1
-        {profile_filter}
-        GROUP BY posting_date
-        ORDER BY posting_date
-    """.format(
-        profile_filter=f"AND pos_profile = '{pos_profile}'" if pos_profile else ""
-    ), (start_date, end_date), as_dict=True)
-    
+    return start_report_job(
+        "sales_trend", start_date, end_date,
+        "smart_pos.smart_pos.api.reports_api.get_sales_trend_piece",
+        "smart_pos.smart_pos.api.reports_api.merge_sales_trend",
+        {"start_date": str(start_date), "end_date": str(end_date), "days": days,
+         "pos_profile": pos_profile, "company": company},
+        version=get_data_version(pos_profile)
+    )
+
+
+@cached_report
+def get_recent_sales_trend(days, pos_profile=None, company=None):
+    end_date = getdate(nowdate())
+    start_date = add_days(end_date, -days + 1)
+    daily_sales = get_sales_rollup(start_date, end_date, pos_profile, company, group_by="posting_date")
+    return build_sales_trend(start_date, end_date, days, daily_sales)
+
+
+def get_sales_trend_piece(from_date, to_date, pos_profile=None, company=None, **kwargs):
+    return get_sales_rollup(from_date, to_date, pos_profile, company, group_by="posting_date")
+
+
+def merge_sales_trend(pieces, start_date, end_date, days, **kwargs):
+    daily_sales = [row for piece in pieces for row in piece]
+    return build_sales_trend(getdate(start_date), getdate(end_date), days, daily_sales)
+
+
+def build_sales_trend(start_date, end_date, days, daily_sales):
     # Fill missing dates
-    daily_dict = {str(d['date']): d for d in daily_sales}
+    daily_dict = {
+        str(d.posting_date): {
+            'date': d.posting_date,
+            'invoice_count': d.invoice_count,
+            'sales': d.sales,
+            'returns': d.returns
+        }
+        for d in daily_sales
+    }
     complete_data = []
     
     current_date = start_date
@@ -249,30 +378,70 @@ def get_sales_trend(days=7, pos_profile=None):
 
 
 @frappe.whitelist()
-def get_top_products(days=30, limit=20, pos_profile=None):
+@cached_report
+@read_from_replica
+def get_sales_heatmap(from_date=None, to_date=None, pos_profile=None, company=None, metric="sales", band=0):
+    """
+    Weekday x hour heatmap over a date range, from the hourly POS Sales Rollup
+    Rows are weekdays starting Monday, columns hours 0-23. Cells hold the total and the
+    average per occurrence of the weekday; band=1 adds percentiles of each cell across days
+    """
+    if metric not in HEATMAP_METRICS:
+        frappe.throw(_("Unsupported heatmap metric: {0}").format(metric))
+    
+    to_date = getdate(to_date or nowdate())
+    from_date = getdate(from_date) if from_date else add_days(to_date, -(HEATMAP_DEFAULT_DAYS - 1))
+    if from_date > to_date:
+        frappe.throw(_("From Date cannot be after To Date"))
+    
+    np = get_numpy()
+    day_count = date_diff(to_date, from_date) + 1
+    
+    # One row per day of the range, hours without sales stay zero
+    values = np.zeros((day_count, 24))
+    rows = get_sales_rollup(from_date, to_date, pos_profile, company, group_by=("posting_date", "hour"))
+    for row in rows:
+        value = row.invoice_count if metric == "invoices" else flt(row.sales) - flt(row.returns)
+        values[date_diff(row.posting_date, from_date), cint(row.hour)] = flt(value)
+    
+    weekdays = (np.arange(day_count) + from_date.weekday()) % 7
+    occurrences = np.bincount(weekdays, minlength=7)
+    total = np.zeros((7, 24))
+    np.add.at(total, weekdays, values)
+    average = total / np.maximum(occurrences, 1)[:, None]
+    
+    heatmap = {
+        "period": {"start": str(from_date), "end": str(to_date), "days": day_count},
+        "metric": metric,
+        "weekdays": [_(day) for day in calendar.day_name],
+        "occurrences": occurrences.tolist(),
+        "total": np.round(total, 2).tolist(),
+        "average": np.round(average, 2).tolist()
+    }
+    
+    if cint(band):
+        percentiles = np.zeros((len(HEATMAP_BAND), 7, 24))
+        for weekday in range(7):
+            if occurrences[weekday]:
+                percentiles[:, weekday] = np.percentile(values[weekdays == weekday], HEATMAP_BAND, axis=0)
+        heatmap["band"] = {
+            f"p{q}": np.round(cells, 2).tolist() for q, cells in zip(HEATMAP_BAND, percentiles, strict=True)
+        }
+    
+    return heatmap
+
+
+@frappe.whitelist()
+@cached_report
+@read_from_replica
+def get_top_products(days=30, limit=20, pos_profile=None, company=None):
     """Get top selling products"""
+    days = cint(days) or 30
     end_date = nowdate()
     start_date = add_days(getdate(end_date), -days)
     
-    profile_filter = f"AND pi.pos_profile = '{pos_profile}'" if pos_profile else ""
-    
-    products = frappe.db.sql("""
-        SELECT 
-            item.item_code,
-            item.item_name,
-            SUM(item.qty) as total_qty,
-            SUM(item.amount) as total_amount,
-            COUNT(DISTINCT pi.name) as transaction_count
-        FROM `tabPOS Invoice Item` item
-        JOIN `tabPOS Invoice` pi ON pi.name = item.parent
-        WHERE pi.posting_date BETWEEN %s AND %s 
-            AND pi.docstatus = 1 
-            AND pi.is_return = 0
-            {profile_filter}
-        GROUP BY item.item_code, item.item_name
-        ORDER BY total_qty DESC
-        LIMIT %s
-    """.format(profile_filter=profile_filter), (start_date, end_date, limit), as_dict=True)
+    products = get_top_items(start_date, end_date, pos_profile, company, cint(limit) or 20)
+    set_display_names(products, "Item", "item_code", "item_name")
     
     return {
         "period": {"start": str(start_date), "end": str(end_date)},
@@ -281,41 +450,29 @@ def get_top_products(days=30, limit=20, pos_profile=None):
 
 
 @frappe.whitelist()
-def get_customer_analytics(days=30, limit=20, pos_profile=None):
+@read_from_replica
+def get_customer_analytics(days=30, limit=20, pos_profile=None, company=None):
     """Get customer analytics"""
+    days = cint(days) or 30
     end_date = nowdate()
     start_date = add_days(getdate(end_date), -days)
     
-    profile_filter = f"AND pos_profile = '{pos_profile}'" if pos_profile else ""
+    if days > REPORT_JOB_MIN_DAYS:
+        return start_report_job(
+            "customer_analytics", start_date, end_date,
+            "smart_pos.smart_pos.api.reports_api.get_customer_analytics_piece",
+            "smart_pos.smart_pos.api.reports_api.merge_customer_analytics",
+            {"start_date": str(start_date), "end_date": str(end_date), "limit": cint(limit) or 20,
+             "pos_profile": pos_profile, "company": company},
+            version=get_data_version(pos_profile)
+        )
     
     # Top customers
-    top_customers = frappe.db.sql("""
-        SELECT 
-            customer,
-            customer_name,
-            COUNT(*) as visit_count,
-            SUM(grand_total) as total_spent,
-            AVG(grand_total) as avg_basket
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s 
-            AND docstatus = 1 
-            AND is_return = 0
-            {profile_filter}
-        GROUP BY customer, customer_name
-        ORDER BY total_spent DESC
-        LIMIT %s
-    """.format(profile_filter=profile_filter), (start_date, end_date, limit), as_dict=True)
+    top_customers = get_top_customers(start_date, end_date, pos_profile, company, cint(limit) or 20)
+    set_display_names(top_customers, "Customer", "customer", "customer_name")
     
     # New vs returning customers
-    customer_stats = frappe.db.sql("""
-        SELECT 
-            COUNT(DISTINCT customer) as unique_customers,
-            COUNT(*) as total_transactions
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s 
-            AND docstatus = 1
-            {profile_filter}
-    """.format(profile_filter=profile_filter), (start_date, end_date), as_dict=True)[0]
+    customer_stats = get_customer_totals(start_date, end_date, pos_profile, company)
     
     return {
         "period": {"start": str(start_date), "end": str(end_date)},
@@ -324,65 +481,115 @@ def get_customer_analytics(days=30, limit=20, pos_profile=None):
     }
 
 
+def get_customer_analytics_piece(from_date, to_date, pos_profile=None, company=None, **kwargs):
+    return get_customer_activity(from_date, to_date, pos_profile, company)
+
+
+def merge_customer_analytics(pieces, start_date, end_date, limit, **kwargs):
+    """Combine monthly per-customer activity, distinct customers are counted after merging"""
+    customers = {}
+    for row in (row for piece in pieces for row in piece):
+        customer = customers.setdefault(row.customer, frappe._dict(
+            customer=row.customer, customer_name=row.customer_name,
+            visit_count=0, total_spent=0, transaction_count=0
+        ))
+        customer.visit_count += cint(row.visit_count)
+        customer.total_spent += flt(row.total_spent)
+        customer.transaction_count += cint(row.transaction_count)
+    
+    top_customers = sorted(
+        (c for c in customers.values() if c.visit_count),
+        key=lambda c: c.total_spent, reverse=True
+    )[:limit]
+    for customer in top_customers:
+        customer.avg_basket = customer.total_spent / customer.visit_count
+        del customer["transaction_count"]
+    set_display_names(top_customers, "Customer", "customer", "customer_name")
+    
+    return {
+        "period": {"start": start_date, "end": end_date},
+        "summary": {
+            "unique_customers": len(customers),
+            "total_transactions": sum(c.transaction_count for c in customers.values())
+        },
+        "top_customers": top_customers
+    }
+
+
+@frappe.whitelist()
+def get_report_job(job_id):
+    """Status of a background report job, with its result once completed"""
+    meta = get_job(job_id)
+    if meta and not is_job_requester(job_id):
+        frappe.only_for("System Manager")
+    
+    return get_job_status(job_id, meta, with_result=True)
+
+
 @frappe.whitelist()
-def get_dashboard_stats(pos_profile=None):
+@read_from_replica
+def get_item_velocity_analysis(days=365, limit=500, pos_profile=None, company=None):
+    """
+    ABC class, sales velocity and days of cover per item over complete past days
+    Computed once per profile per day and kept until a back-dated invoice changes history
+    """
+    days = cint(days) or 365
+    end_date = add_days(getdate(nowdate()), -1)
+    start_date = add_days(end_date, -(days - 1))
+    params = {"start_date": str(start_date), "end_date": str(end_date), "limit": cint(limit),
+              "pos_profile": pos_profile, "company": company}
+    
+    result = get_cached_history(
+        "item_velocity_analysis", params, pos_profile,
+        lambda: build_item_analysis(start_date, end_date, pos_profile, company, cint(limit))
+    )
+    names = get_display_names("Item", result["items"])
+    result["item_names"] = [names[item] for item in result["items"]]
+    return result
+
+
+@frappe.whitelist()
+@read_from_replica
+def get_dashboard_stats(pos_profile=None, company=None):
     """Get dashboard statistics for manager view"""
+    # Session and ZATCA counts change without touching sales, so they are never cached
+    return {
+        **get_dashboard_sales(pos_profile, company),
+        "active_sessions": frappe.db.count("POS Session", {"status": "Open"}),
+        "pending_zatca": frappe.db.count(ZATCA_QUEUE, {"status": ["in", UNREPORTED_STATUSES]})
+    }
+
+
+@cached_report
+def get_dashboard_sales(pos_profile=None, company=None):
     today = nowdate()
     yesterday = add_days(getdate(today), -1)
     week_start = add_days(getdate(today), -7)
     month_start = add_days(getdate(today), -30)
     
-    profile_filter = f"AND pos_profile = '{pos_profile}'" if pos_profile else ""
-    
-    # Today's stats
-    today_stats = frappe.db.sql("""
-        SELECT 
-            COUNT(*) as invoices,
-            COALESCE(SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END), 0) as sales,
-            COALESCE(SUM(CASE WHEN is_return = 1 THEN ABS(grand_total) ELSE 0 END), 0) as returns
-        FROM `tabPOS Invoice`
-        WHERE posting_date = %s AND docstatus = 1 {profile_filter}
-    """.format(profile_filter=profile_filter), today, as_dict=True)[0]
-    
-    # Yesterday's stats for comparison
-    yesterday_stats = frappe.db.sql("""
-        SELECT 
-            COALESCE(SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END), 0) as sales
-        FROM `tabPOS Invoice`
-        WHERE posting_date = %s AND docstatus = 1 {profile_filter}
-    """.format(profile_filter=profile_filter), yesterday, as_dict=True)[0]
-    
-    # Week stats
-    week_stats = frappe.db.sql("""
-        SELECT 
-            COUNT(*) as invoices,
-            COALESCE(SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END), 0) as sales
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s AND docstatus = 1 {profile_filter}
-    """.format(profile_filter=profile_filter), (week_start, today), as_dict=True)[0]
-    
-    # Month stats
-    month_stats = frappe.db.sql("""
-        SELECT 
-            COUNT(*) as invoices,
-            COALESCE(SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END), 0) as sales
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s AND docstatus = 1 {profile_filter}
-    """.format(profile_filter=profile_filter), (month_start, today), as_dict=True)[0]
+    # One pass over the month's daily buckets serves every period
+    daily = {
+        getdate(d.posting_date): d
+        for d in get_sales_rollup(month_start, today, pos_profile, company, group_by="posting_date")
+    }
     
-    # Active sessions
-    active_sessions = frappe.db.count("POS Session", {"status": "Open"})
+    def period_stats(start, end):
+        rows = [d for posting_date, d in daily.items() if getdate(start) <= posting_date <= getdate(end)]
+        return {
+            "invoices": sum(cint(d.invoice_count) for d in rows),
+            "sales": sum(flt(d.sales) for d in rows),
+            "returns": sum(flt(d.returns) for d in rows)
+        }
     
-    # Pending sync count
-    pending_sync = frappe.db.count("POS Invoice", {
-        "docstatus": 1,
-        "custom_zatca_status": ["in", ["", "Not Submitted", None]]
-    })
+    today_stats = period_stats(today, today)
+    yesterday_stats = period_stats(yesterday, yesterday)
+    week_stats = period_stats(week_start, today)
+    month_stats = period_stats(month_start, today)
     
     # Calculate growth
     today_sales = flt(today_stats.get('sales', 0))
     yesterday_sales = flt(yesterday_stats.get('sales', 0))
-    growth = ((today_sales - yesterday_sales) / yesterday_sales * 100) if yesterday_sales > 0 else 0
+    growth = get_growth(today_sales, yesterday_sales)
     
     return {
         "today": {
@@ -390,7 +597,7 @@ def get_dashboard_stats(pos_profile=None):
             "invoices": today_stats.get('invoices', 0),
             "returns": today_stats.get('returns', 0),
             "net": today_sales - flt(today_stats.get('returns', 0)),
-            "growth": round(growth, 1)
+            "growth": growth
         },
         "week": {
             "sales": week_stats.get('sales', 0),
@@ -399,40 +606,226 @@ def get_dashboard_stats(pos_profile=None):
         "month": {
             "sales": month_stats.get('sales', 0),
             "invoices": month_stats.get('invoices', 0)
-        },
-        "active_sessions": active_sessions,
-        "pending_zatca": pending_sync
+        }
     }
 
 
 @frappe.whitelist()
-def get_cashier_performance(days=30, pos_profile=None):
+@read_from_replica
+def get_active_sessions(pos_profile=None, company=None, page_length=None, after=None):
+    """Open sessions for the manager page, with live totals kept on each session"""
+    pos_profile, company = get_permitted_scope("POS Session", pos_profile, company)
+    page_length = min(cint(page_length) or SESSION_PAGE_LENGTH, MAX_INVOICE_PAGE_LENGTH)
+    
+    sessions, next_cursor = get_open_sessions(pos_profile, company, page_length, after)
+    set_display_names(sessions, "User", "user", "user_name")
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+@frappe.whitelist()
+@read_from_replica
+def get_latest_invoices(pos_profile=None, company=None, page_length=None, after=None):
+    """Most recently submitted invoices for the manager page"""
+    pos_profile, company = get_permitted_scope("POS Invoice", pos_profile, company)
+    page_length = min(cint(page_length) or RECENT_INVOICE_PAGE_LENGTH, MAX_INVOICE_PAGE_LENGTH)
+    
+    invoices, next_cursor = get_recent_invoices(pos_profile, company, page_length, after)
+    return {"invoices": invoices, "next_cursor": next_cursor}
+
+
+def get_permitted_scope(doctype, pos_profile=None, company=None) -> tuple:
+    """
+    Check read access to doctype and narrow the POS Profile and Company filters
+    to the values the user's User Permissions allow
+    """
+    frappe.has_permission(doctype, "read", throw=True)
+    user_permissions = frappe.permissions.get_user_permissions()
+    
+    scope = {"POS Profile": get_filter_values(pos_profile), "Company": get_filter_values(company)}
+    for link_doctype, values in scope.items():
+        allowed = {permission.doc for permission in user_permissions.get(link_doctype, [])}
+        if not allowed:
+            continue
+        scope[link_doctype] = [value for value in values if value in allowed] if values else sorted(allowed)
+        if not scope[link_doctype]:
+            frappe.throw(_("Not permitted"), frappe.PermissionError)
+    
+    return scope["POS Profile"], scope["Company"]
+
+
+@frappe.whitelist()
+def get_live_dashboard(pos_profile=None):
+    """Today's running totals, kept current by invoice submit and cancel"""
+    return {
+        "date": nowdate(),
+        "today": get_live_totals(pos_profile)
+    }
+
+
+@frappe.whitelist()
+@read_from_replica
+def get_branch_dashboard(pos_profile=None, company=None):
+    """
+    Dashboard figures for many branches (POS Profiles) in one call
+    Every figure is a column aligned with `branches`, region totals are under `totals`
+    """
+    dashboard = get_branch_sales(pos_profile, company)
+    branches = dashboard["branches"]
+    if not branches:
+        return dashboard
+    
+    # Session and ZATCA counts change without touching sales, so they are never cached
+    counts = {field: [0] * len(branches) for field in BRANCH_COUNT_FIELDS}
+    index = {branch: i for i, branch in enumerate(branches)}
+    
+    # Raw counts are grouped by branch, one query each rather than one per branch
+    for branch, count in frappe.get_all(
+        "POS Session",
+        filters={"status": "Open", "pos_profile": ["in", branches]},
+        fields=["pos_profile", "count(name)"],
+        group_by="pos_profile",
+        as_list=True
+    ):
+        counts["active_sessions"][index[branch]] = count
+    
+    for branch, count in frappe.get_all(
+        ZATCA_QUEUE,
+        filters={"status": ["in", UNREPORTED_STATUSES], "pos_profile": ["in", branches]},
+        fields=["pos_profile", "count(name)"],
+        group_by="pos_profile",
+        as_list=True
+    ):
+        counts["pending_zatca"][index[branch]] = count
+    
+    return {
+        **dashboard,
+        **counts,
+        "totals": {**dashboard["totals"], **{field: sum(values) for field, values in counts.items()}}
+    }
+
+
+@cached_report
+def get_branch_sales(pos_profile=None, company=None):
+    today = getdate(nowdate())
+    yesterday = add_days(today, -1)
+    week_start = add_days(today, -7)
+    month_start = add_days(today, -30)
+    
+    profile_filters = {"disabled": 0}
+    if get_filter_values(pos_profile):
+        profile_filters["name"] = ["in", get_filter_values(pos_profile)]
+    if get_filter_values(company):
+        profile_filters["company"] = ["in", get_filter_values(company)]
+    profiles = frappe.get_all("POS Profile", filters=profile_filters, fields=["name", "company"], order_by="name")
+    branches = [p.name for p in profiles]
+    if not branches:
+        return {"branches": [], "companies": [], "totals": {}}
+    
+    columns = {field: [0] * len(branches) for field in BRANCH_DASHBOARD_FIELDS}
+    index = {branch: i for i, branch in enumerate(branches)}
+    
+    # A single rollup read buckets the month by branch and day
+    periods = {
+        "today": (today, today),
+        "yesterday": (yesterday, yesterday),
+        "week": (week_start, today),
+        "month": (month_start, today)
+    }
+    rows = get_sales_rollup(month_start, today, branches, None, group_by=("pos_profile", "posting_date"))
+    for row in rows:
+        i = index.get(row.pos_profile)
+        if i is None:
+            continue
+        posting_date = getdate(row.posting_date)
+        for period, (start, end) in periods.items():
+            if start <= posting_date <= end:
+                columns[f"{period}_sales"][i] += flt(row.sales)
+                columns[f"{period}_invoices"][i] += cint(row.invoice_count)
+                columns[f"{period}_returns"][i] += flt(row.returns)
+    
+    totals = {field: sum(values) for field, values in columns.items()}
+    totals["today_net"] = totals["today_sales"] - totals["today_returns"]
+    totals["growth"] = get_growth(totals["today_sales"], totals["yesterday_sales"])
+    columns["today_net"] = [s - r for s, r in zip(columns["today_sales"], columns["today_returns"], strict=True)]
+    columns["growth"] = [get_growth(t, y) for t, y in zip(columns["today_sales"], columns["yesterday_sales"], strict=True)]
+    
+    return {
+        "branches": branches,
+        "companies": [p.company for p in profiles],
+        **columns,
+        "totals": totals
+    }
+
+
+def get_growth(current, previous):
+    """Percentage change from previous to current, 0 without a previous figure"""
+    return round((flt(current) - flt(previous)) / flt(previous) * 100, 1) if flt(previous) > 0 else 0
+
+
+@frappe.whitelist()
+@cached_report
+@read_from_replica
+def get_cashier_performance(days=30, pos_profile=None, company=None):
     """Get cashier performance report"""
+    days = cint(days) or 30
     end_date = nowdate()
     start_date = add_days(getdate(end_date), -days)
     
-    profile_filter = f"AND pos_profile = '{pos_profile}'" if pos_profile else ""
-    
-    performance = frappe.db.sql("""
-        SELECT 
-            owner as cashier,
-            COUNT(*) as transaction_count,
-            SUM(CASE WHEN is_return = 0 THEN grand_total ELSE 0 END) as total_sales,
-            SUM(CASE WHEN is_return = 1 THEN 1 ELSE 0 END) as return_count,
-            AVG(CASE WHEN is_return = 0 THEN grand_total ELSE NULL END) as avg_transaction
-        FROM `tabPOS Invoice`
-        WHERE posting_date BETWEEN %s AND %s 
-            AND docstatus = 1
-            {profile_filter}
-        GROUP BY owner
-        ORDER BY total_sales DESC
-    """.format(profile_filter=profile_filter), (start_date, end_date), as_dict=True)
+    performance = []
+    for row in get_sales_rollup(start_date, end_date, pos_profile, company, group_by="cashier"):
+        performance.append({
+            "cashier": row.cashier,
+            "transaction_count": row.invoice_count,
+            "total_sales": row.sales,
+            "return_count": row.return_count,
+            "avg_transaction": flt(row.sales) / row.sales_count if row.sales_count else None
+        })
+    performance.sort(key=lambda p: flt(p["total_sales"]), reverse=True)
     
     # Get user full names
-    for p in performance:
-        p['cashier_name'] = frappe.db.get_value("User", p['cashier'], "full_name") or p['cashier']
+    set_display_names(performance, "User", "cashier", "cashier_name")
     
     return {
         "period": {"start": str(start_date), "end": str(end_date)},
         "performance": performance
     }
+
+
+ROLLUP_TOTALS = ("invoice_count", "sales_count", "return_count", "sales", "returns")
+
+
+def get_sales_rollup(from_date, to_date, pos_profile=None, company=None, group_by=None):
+    """
+    Sales and returns totals from the POS Sales Rollup
+    Days before today come from the report cache, only today is queried live
+    group_by: optional bucket column (posting_date, hour or cashier), or a list of them
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    today = getdate(nowdate())
+    if from_date >= today:
+        return get_sales_rollup_totals(from_date, to_date, pos_profile, company, group_by)
+    
+    if to_date < today:
+        return get_cached_history(
+            "sales_rollup", [from_date, to_date, pos_profile, company, group_by], pos_profile,
+            lambda: get_sales_rollup_totals(from_date, to_date, pos_profile, company, group_by)
+        )
+    
+    history = get_sales_rollup(from_date, add_days(today, -1), pos_profile, company, group_by)
+    live = get_sales_rollup_totals(today, to_date, pos_profile, company, group_by)
+    return merge_rollup_rows(history + live, group_by)
+
+
+def merge_rollup_rows(rows, group_by=None):
+    """Add up rollup rows that share a group value"""
+    fields = get_group_fields(group_by)
+    merged = {}
+    for row in rows:
+        group = tuple(row.get(field) for field in fields) if fields else None
+        if group not in merged:
+            merged[group] = frappe._dict(row)
+            continue
+        for field in ROLLUP_TOTALS:
+            merged[group][field] = flt(merged[group][field]) + flt(row[field])
+    
+    return [merged[group] for group in sorted(merged, key=lambda g: [(v is None, v) for v in g or ()])]
@@ -9,16 +9,49 @@ Handles offline/online data synchronization
 
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, nowdate, flt, cint, add_days
+from frappe.utils import now_datetime, nowdate, flt, cint, add_days, get_datetime
 import json
+import time
 from typing import Dict, List, Optional, Any
 
+from smart_pos.smart_pos.doctype.pos_sync_log.pos_sync_log import (
+    MAX_SYNC_ATTEMPTS,
+    archive_payload,
+    delete_payload_archives,
+    load_payload,
+)
+from smart_pos.smart_pos.utils import sync_protocol
+from smart_pos.smart_pos.utils.admission import admit_sync_request
+
+
+# Sync log retention works in small batches so it never holds long table locks
+SYNC_LOG_CLEANUP_BATCH = 500
+SYNC_LOG_CLEANUP_PAUSE = 0.2  # seconds between batches
+
+# Scheduled sync processing: logs per run and scheduling weights
+SYNC_BATCH_SIZE = 50
+SYNC_PRIORITY_WEIGHTS = {3: 4, 2: 2, 1: 1}  # High, Normal, Low
+SYNC_DOCUMENT_TYPE_WEIGHTS = {"POS Invoice": 4, "Customer": 1}
+
+# Sync status is polled by every terminal and cached briefly
+SYNC_STATUS_CACHE_TTL = 5  # seconds
+SYNC_STATUS_BREAKDOWNS = ("device_id", "pos_profile")
+SYNC_STATUS_KEYS = {
+    "Pending": "pending",
+    "Processing": "processing",
+    "Synced": "synced",
+    "Failed": "failed",
+    "Conflict": "conflicts",
+    "Dead Letter": "dead_letter"
+}
+
 
 # =============================================================================
 # Sync Operations
 # =============================================================================
 
 @frappe.whitelist()
+@admit_sync_request()
 def sync_offline_data(data) -> Dict:
     """
     Main sync endpoint for offline data
@@ -91,6 +124,36 @@ def sync_offline_data(data) -> Dict:
     return results
 
 
+@frappe.whitelist(methods=["POST"])
+@admit_sync_request()
+def upload_offline_data() -> Dict:
+    """
+    Compact sync endpoint for offline data
+    Accepts a gzip-compressed, field-dictionary encoded batch (see utils.sync_protocol)
+    as the raw request body and replies with a compact ack vector
+    """
+    from smart_pos.smart_pos.api.pos_api import create_pos_invoice
+    
+    acks = []
+    errors = []
+    
+    # Records are decoded and processed one at a time, never as a whole batch
+    for record_type, record in sync_protocol.iter_records(frappe.request.get_data()):
+        offline_id = record.get("offline_id")
+        try:
+            if record_type == "invoice":
+                result = create_pos_invoice(record)
+            else:
+                result = sync_customer(record)
+                frappe.db.commit()
+            acks.append([offline_id, result.get("name")])
+        except Exception as e:
+            frappe.db.rollback()
+            errors.append([offline_id, str(e)])
+    
+    return sync_protocol.build_ack(acks, errors)
+
+
 def sync_invoice(invoice_data: Dict) -> Dict:
     """Sync a single invoice from offline"""
     offline_id = invoice_data.get("offline_id")
@@ -104,8 +167,9 @@ def sync_invoice(invoice_data: Dict) -> Dict:
     sync_log = frappe.new_doc("POS Sync Log")
     sync_log.offline_id = offline_id
     sync_log.document_type = "POS Invoice"
-    sync_log.data_json = json.dumps(invoice_data)
+    sync_log.set_payload(invoice_data)
     sync_log.device_id = invoice_data.get("device_id")
+    sync_log.pos_profile = invoice_data.get("pos_profile")
     sync_log.user = frappe.session.user
     sync_log.session_id = invoice_data.get("session_id")
     sync_log.created_offline_at = invoice_data.get("created_at")
@@ -115,7 +179,9 @@ def sync_invoice(invoice_data: Dict) -> Dict:
     # Process sync
     result = sync_log.process_sync()
     
-    return result
+    if result.get("success"):
+        return {"status": "success", "name": result.get("document_name")}
+    return {"status": "failed", "error": result.get("error")}
 
 
 def sync_customer(customer_data: Dict) -> Dict:
@@ -156,6 +222,7 @@ def sync_customer(customer_data: Dict) -> Dict:
 # =============================================================================
 
 @frappe.whitelist()
+@admit_sync_request()
 def get_master_data_for_offline(pos_profile: str, last_sync: str = None) -> Dict:
     """
     Get all master data needed for offline operation
@@ -328,32 +395,313 @@ def get_price_update(pos_profile: str, item_codes: List[str] = None, last_sync:
     return prices
 
 
+# =============================================================================
+# Resumable Master Data Sync
+# =============================================================================
+
+# Sections are downloaded in keyset order (modified, name) so a device can
+# resume after the last chunk it acknowledged
+MASTER_DATA_SECTIONS = {
+    "Items": {
+        "table": "tabItem",
+        "fields": "name, item_code, item_name, item_group, stock_uom, image, description, brand, modified",
+        "conditions": "disabled = 0 AND is_sales_item = 1 AND has_variants = 0"
+    },
+    "Customers": {
+        "table": "tabCustomer",
+        "fields": "name, customer_name, customer_group, territory, mobile_no, email_id, customer_type, modified",
+        "conditions": "disabled = 0"
+    },
+    "Prices": {
+        "table": "tabItem Price",
+        "fields": "name, item_code, price_list_rate, modified",
+        "conditions": "price_list = %(price_list)s AND selling = 1"
+    }
+}
+MASTER_DATA_CHUNK_SIZE = 500
+MAX_MASTER_DATA_CHUNK_SIZE = 2000
+
+
+@frappe.whitelist()
+@admit_sync_request()
+def get_master_data_chunk(pos_profile: str, device_id: str, section: str,
+                          chunk_size: int = MASTER_DATA_CHUNK_SIZE) -> Dict:
+    """
+    Get the next chunk of a master data section for a device
+    Continues from the device's last acknowledged chunk
+    """
+    validate_master_data_section(section)
+    validate_master_data_access(pos_profile, device_id)
+    profile = frappe.get_cached_doc("POS Profile", pos_profile)
+    chunk_size = min(cint(chunk_size) or MASTER_DATA_CHUNK_SIZE, MAX_MASTER_DATA_CHUNK_SIZE)
+    
+    cursor = get_sync_cursor(device_id, pos_profile, section)
+    rows = query_master_data(section, profile, cursor, limit=chunk_size)
+    
+    if section == "Items":
+        enrich_offline_items(rows, profile)
+    
+    return {
+        "section": section,
+        "rows": rows,
+        "cursor": encode_master_data_cursor(rows[-1]) if rows else None,
+        "has_more": len(rows) == chunk_size
+    }
+
+
+@frappe.whitelist()
+def ack_master_data_chunk(pos_profile: str, device_id: str, section: str, cursor: str,
+                          row_count: int = 0) -> Dict:
+    """Move a device's sync cursor forward once a chunk has been stored locally"""
+    validate_master_data_section(section)
+    validate_master_data_access(pos_profile, device_id)
+    modified, name = decode_master_data_cursor(cursor)
+    current = get_sync_cursor(device_id, pos_profile, section)
+    
+    # Cursors only move forward; a repeated or late ack is ignored
+    if current.name and not is_ahead_of_cursor(current.name, modified, name):
+        return {"status": "stale", "cursor": encode_master_data_cursor(current, "cursor_")}
+    
+    values = {
+        "cursor_modified": modified,
+        "cursor_name": name,
+        "rows_acknowledged": cint(current.rows_acknowledged) + cint(row_count),
+        "last_ack_at": now_datetime(),
+        "user": frappe.session.user
+    }
+    
+    if current.name:
+        frappe.db.set_value("POS Sync Cursor", current.name, values)
+    else:
+        frappe.get_doc({
+            "doctype": "POS Sync Cursor",
+            "device_id": device_id,
+            "pos_profile": pos_profile,
+            "section": section,
+            **values
+        }).insert(ignore_permissions=True)
+    
+    return {"status": "acknowledged", "cursor": cursor}
+
+
+@frappe.whitelist()
+def reset_master_data_cursor(pos_profile: str, device_id: str, section: str = None) -> Dict:
+    """Forget a device's sync position so its next download starts from scratch"""
+    validate_master_data_access(pos_profile, device_id)
+    filters = {"device_id": device_id, "pos_profile": pos_profile}
+    if section:
+        validate_master_data_section(section)
+        filters["section"] = section
+    
+    frappe.db.delete("POS Sync Cursor", filters)
+    
+    return {"status": "reset"}
+
+
+@frappe.whitelist()
+def get_device_sync_progress(pos_profile: str = None) -> List[Dict]:
+    """Get how far behind each device's master data download is"""
+    frappe.only_for(("System Manager", "Sales Manager"))
+    
+    filters = {"pos_profile": pos_profile} if pos_profile else {}
+    cursors = frappe.get_all(
+        "POS Sync Cursor",
+        filters=filters,
+        fields=[
+            "device_id", "pos_profile", "section", "user", "cursor_modified",
+            "cursor_name", "rows_acknowledged", "last_ack_at"
+        ],
+        order_by="device_id asc, section asc"
+    )
+    
+    for cursor in cursors:
+        profile = frappe.get_cached_doc("POS Profile", cursor.pos_profile)
+        cursor["remaining"] = query_master_data(cursor.section, profile, cursor, count=True)
+        cursor.pop("cursor_name")
+    
+    return cursors
+
+
+def validate_master_data_section(section: str):
+    if section not in MASTER_DATA_SECTIONS:
+        frappe.throw(_("Invalid master data section: {0}").format(section))
+
+
+def validate_master_data_access(pos_profile: str, device_id: str):
+    """A device's cursors are only read or moved by users who can read its POS Profile"""
+    if not device_id:
+        frappe.throw(_("Device ID is required"))
+    frappe.has_permission("POS Profile", "read", pos_profile, throw=True)
+
+
+def is_ahead_of_cursor(cursor_name: str, modified, name: str) -> bool:
+    """
+    Compare a position with a stored cursor in SQL, so names are ordered by the
+    same collation as the ORDER BY that produced the chunk
+    """
+    return bool(frappe.db.sql("""
+        SELECT 1 FROM `tabPOS Sync Cursor`
+        WHERE name = %(cursor)s
+            AND (cursor_modified IS NULL
+                OR cursor_modified < %(modified)s
+                OR (cursor_modified = %(modified)s AND IFNULL(cursor_name, '') < %(name)s))
+    """, {"cursor": cursor_name, "modified": modified, "name": name}))
+
+
+def get_sync_cursor(device_id: str, pos_profile: str, section: str) -> Dict:
+    """Get a device's acknowledged position in a master data section"""
+    return frappe.db.get_value(
+        "POS Sync Cursor",
+        {"device_id": device_id, "pos_profile": pos_profile, "section": section},
+        ["name", "cursor_modified", "cursor_name", "rows_acknowledged"],
+        as_dict=True
+    ) or frappe._dict()
+
+
+def query_master_data(section: str, profile, cursor: Dict, limit: int = None, count: bool = False):
+    """Read master data rows after a cursor position, or count them"""
+    spec = MASTER_DATA_SECTIONS[section]
+    values = {
+        "price_list": profile.selling_price_list,
+        "modified": cursor.get("cursor_modified") or "1900-01-01",
+        "name": cursor.get("cursor_name") or "",
+        "limit": limit
+    }
+    keyset = "(modified > %(modified)s OR (modified = %(modified)s AND name > %(name)s))"
+    
+    if count:
+        return frappe.db.sql(f"""
+            SELECT COUNT(*) FROM `{spec["table"]}`
+            WHERE {spec["conditions"]} AND {keyset}
+        """, values)[0][0]
+    
+    return frappe.db.sql(f"""
+        SELECT {spec["fields"]}
+        FROM `{spec["table"]}`
+        WHERE {spec["conditions"]} AND {keyset}
+        ORDER BY modified, name
+        LIMIT %(limit)s
+    """, values, as_dict=True)
+
+
+def enrich_offline_items(items: List[Dict], profile):
+    """Add price, stock and barcodes to a chunk of items with one query each"""
+    item_codes = [item.item_code for item in items]
+    if not item_codes:
+        return
+    
+    prices = dict(frappe.get_all(
+        "Item Price",
+        filters={"item_code": ["in", item_codes], "price_list": profile.selling_price_list, "selling": 1},
+        fields=["item_code", "price_list_rate"],
+        as_list=True
+    ))
+    stock = dict(frappe.get_all(
+        "Bin",
+        filters={"item_code": ["in", item_codes], "warehouse": profile.warehouse},
+        fields=["item_code", "actual_qty"],
+        as_list=True
+    ))
+    barcodes = {}
+    for row in frappe.get_all(
+        "Item Barcode",
+        filters={"parent": ["in", item_codes]},
+        fields=["parent", "barcode"]
+    ):
+        barcodes.setdefault(row.parent, []).append(row.barcode)
+    
+    for item in items:
+        item["price"] = flt(prices.get(item.item_code))
+        item["stock_qty"] = flt(stock.get(item.item_code))
+        item["barcodes"] = barcodes.get(item.item_code, [])
+
+
+def encode_master_data_cursor(row: Dict, prefix: str = "") -> str:
+    return f"{row.get(prefix + 'modified')}|{row.get(prefix + 'name')}"
+
+
+def decode_master_data_cursor(cursor: str):
+    modified, separator, name = (cursor or "").partition("|")
+    if not separator:
+        frappe.throw(_("Invalid sync cursor"))
+    return get_datetime(modified), name
+
+
 # =============================================================================
 # Scheduled Sync Tasks
 # =============================================================================
 
 def process_pending_sync():
     """Process pending sync logs (scheduled every 5 minutes)"""
-    pending_logs = frappe.get_all(
-        "POS Sync Log",
-        filters={
-            "status": ["in", ["Pending", "Failed"]],
-            "attempt_count": ["<", 5]  # Max 5 retries
-        },
-        order_by="priority desc, creation asc",
-        limit=50
-    )
-    
-    for log in pending_logs:
+    for log_name in claim_due_sync_logs(SYNC_BATCH_SIZE):
         try:
-            sync_log = frappe.get_doc("POS Sync Log", log.name)
+            sync_log = frappe.get_doc("POS Sync Log", log_name)
             sync_log.process_sync()
         except Exception as e:
-            frappe.logger().error(f"Error processing sync log {log.name}: {e}")
+            frappe.logger().error(f"Error processing sync log {log_name}: {e}")
     
     frappe.db.commit()
 
 
+def claim_due_sync_logs(limit: int) -> List[str]:
+    """
+    Pick the next sync logs to process with weighted fair scheduling
+    Each (device, document type) pair is a lane; lanes take turns in proportion
+    to their weight, so one large backlog cannot starve the others
+    """
+    # Only rows whose backoff has elapsed are due; at most `limit` per lane
+    rows = frappe.db.sql("""
+        SELECT name, device_id, document_type, priority_rank
+        FROM (
+            SELECT name, device_id, document_type, priority_rank,
+                ROW_NUMBER() OVER (
+                    PARTITION BY device_id, document_type
+                    ORDER BY priority_rank DESC, creation ASC
+                ) as lane_position
+            FROM `tabPOS Sync Log`
+            WHERE status IN ('Pending', 'Failed')
+                AND next_attempt_at <= %(now)s
+                AND attempt_count < %(max_attempts)s
+        ) due
+        WHERE lane_position <= %(limit)s
+        ORDER BY lane_position
+    """, {"now": now_datetime(), "max_attempts": MAX_SYNC_ATTEMPTS, "limit": limit}, as_dict=True)
+    
+    lanes = {}
+    for row in rows:
+        lanes.setdefault((row.device_id, row.document_type), []).append(row)
+    
+    return weighted_round_robin(list(lanes.values()), limit)
+
+
+def weighted_round_robin(lanes: List[List[Dict]], limit: int) -> List[str]:
+    """Interleave lanes by smooth weighted round robin, weighting each lane by its head row"""
+    picked = []
+    credit = [0] * len(lanes)
+    
+    while len(picked) < limit:
+        weights = [get_lane_weight(lane[0]) if lane else 0 for lane in lanes]
+        total = sum(weights)
+        if not total:
+            break
+        
+        for index, weight in enumerate(weights):
+            credit[index] += weight
+        
+        turn = max((index for index, weight in enumerate(weights) if weight), key=lambda index: credit[index])
+        credit[turn] -= total
+        picked.append(lanes[turn].pop(0).name)
+    
+    return picked
+
+
+def get_lane_weight(row: Dict) -> int:
+    return (
+        SYNC_PRIORITY_WEIGHTS.get(cint(row.priority_rank), 1)
+        * SYNC_DOCUMENT_TYPE_WEIGHTS.get(row.document_type, 1)
+    )
+
+
 def sync_master_data():
     """Sync master data changes (scheduled hourly)"""
     # This is mainly for tracking - actual data fetch is on-demand
@@ -366,13 +714,21 @@ def sync_master_data():
 
 @frappe.whitelist()
 def get_sync_conflicts() -> List[Dict]:
-    """Get list of sync conflicts for resolution"""
+    """Get list of sync conflicts and dead-lettered logs for resolution"""
     conflicts = frappe.get_all(
         "POS Sync Log",
-        filters={"status": "Conflict"},
-        fields=["name", "offline_id", "document_type", "data_json", "error_message", "creation"]
+        filters={"status": ["in", ["Conflict", "Dead Letter"]]},
+        fields=[
+            "name", "offline_id", "document_type", "status", "error_message", "creation",
+            "data_json", "payload", "payload_encoding", "payload_archive"
+        ]
     )
     
+    for conflict in conflicts:
+        conflict["data_json"] = json.dumps(load_payload(conflict))
+        for field in ("payload", "payload_encoding", "payload_archive"):
+            conflict.pop(field)
+    
     return conflicts
 
 
@@ -389,14 +745,16 @@ def resolve_conflict(sync_log_name: str, resolution: str, data: Dict = None) ->
     
     if resolution == "keep_server":
         # Mark as resolved, keep server version
-        sync_log.status = "Synced"
-        sync_log.synced_at = now_datetime()
-        sync_log.error_message = "Resolved: Kept server version"
-        sync_log.save()
-        
+        sync_log.db_set({
+            "status": "Synced",
+            "synced_at": now_datetime(),
+            "error_message": "Resolved: Kept server version",
+            "next_attempt_at": None
+        })
+    
     elif resolution == "keep_offline":
         # Force sync offline data
-        offline_data = json.loads(sync_log.data_json)
+        offline_data = load_payload(sync_log)
         if data:
             offline_data.update(data)
         
@@ -409,13 +767,13 @@ def resolve_conflict(sync_log_name: str, resolution: str, data: Dict = None) ->
         
         # Re-process sync
         sync_log.process_sync()
-        
+    
     elif resolution == "merge":
         # Merge data - requires manual data parameter
         if not data:
             frappe.throw(_("Merge resolution requires merged data"))
         
-        sync_log.data_json = json.dumps(data)
+        sync_log.set_payload(data)
         sync_log.process_sync()
     
     frappe.db.commit()
@@ -428,31 +786,54 @@ def resolve_conflict(sync_log_name: str, resolution: str, data: Dict = None) ->
 # =============================================================================
 
 @frappe.whitelist()
-def get_sync_status() -> Dict:
-    """Get current sync status and statistics"""
-    pending = frappe.db.count("POS Sync Log", {"status": "Pending"})
-    processing = frappe.db.count("POS Sync Log", {"status": "Processing"})
-    synced = frappe.db.count("POS Sync Log", {"status": "Synced"})
-    failed = frappe.db.count("POS Sync Log", {"status": "Failed"})
-    conflicts = frappe.db.count("POS Sync Log", {"status": "Conflict"})
-    
-    # Get last sync time
-    last_sync = frappe.db.get_value(
-        "POS Sync Log",
-        {"status": "Synced"},
-        "synced_at",
-        order_by="synced_at desc"
-    )
+def get_sync_status(breakdown: str = None) -> Dict:
+    """
+    Get current sync status and statistics
+    breakdown: 'device_id' or 'pos_profile' to add per-device or per-profile counts
+    """
+    if breakdown and breakdown not in SYNC_STATUS_BREAKDOWNS:
+        frappe.throw(_("Invalid sync status breakdown: {0}").format(breakdown))
     
-    return {
-        "pending": pending,
-        "processing": processing,
-        "synced": synced,
-        "failed": failed,
-        "conflicts": conflicts,
-        "last_sync": str(last_sync) if last_sync else None,
-        "is_syncing": processing > 0
-    }
+    # Every terminal polls this, so serve a short-lived cached snapshot
+    cache_key = f"smart_pos:sync_status:{breakdown or 'summary'}"
+    status = frappe.cache().get_value(cache_key)
+    if status:
+        return status
+    
+    group_fields = ", ".join(["status"] + ([breakdown] if breakdown else []))
+    rows = frappe.db.sql(f"""
+        SELECT {group_fields}, COUNT(*) as count, MAX(synced_at) as last_sync
+        FROM `tabPOS Sync Log`
+        GROUP BY {group_fields}
+    """, as_dict=True)
+    
+    status = summarize_sync_counts(rows)
+    if breakdown:
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.get(breakdown) or "", []).append(row)
+        status["breakdown"] = {key: summarize_sync_counts(group) for key, group in groups.items()}
+    
+    frappe.cache().set_value(cache_key, status, expires_in_sec=SYNC_STATUS_CACHE_TTL)
+    
+    return status
+
+
+def summarize_sync_counts(rows: List[Dict]) -> Dict:
+    """Fold per-status count rows into the sync status payload"""
+    counts = {status: 0 for status in SYNC_STATUS_KEYS}
+    last_sync = None
+    
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + cint(row.count)
+        if row.status == "Synced" and row.last_sync and (not last_sync or row.last_sync > last_sync):
+            last_sync = row.last_sync
+    
+    summary = {key: counts[status] for status, key in SYNC_STATUS_KEYS.items()}
+    summary["last_sync"] = str(last_sync) if last_sync else None
+    summary["is_syncing"] = summary["processing"] > 0
+    
+    return summary
 
 
 @frappe.whitelist()
@@ -477,16 +858,87 @@ def get_sync_history(limit: int = 50) -> List[Dict]:
 # =============================================================================
 
 @frappe.whitelist()
-def cleanup_old_sync_logs(days: int = 30):
-    """Clean up old sync logs"""
-    cutoff_date = add_days(nowdate(), -days)
+def cleanup_old_sync_logs(days: int = None):
+    """Archive aged payloads and delete expired sync logs (scheduled daily)"""
+    frappe.only_for("System Manager")
+    
+    settings = frappe.get_single("Smart POS Settings")
+    retention = {
+        "Synced": cint(days) or cint(settings.synced_log_retention_days) or 30,
+        "Failed": cint(settings.failed_log_retention_days) or 90,
+        "Dead Letter": cint(settings.failed_log_retention_days) or 90,
+        "Conflict": cint(settings.conflict_log_retention_days) or 180
+    }
     
-    # Delete old successful sync logs
-    frappe.db.sql("""
-        DELETE FROM `tabPOS Sync Log`
-        WHERE status = 'Synced' AND creation < %s
-    """, cutoff_date)
+    deleted = {}
+    for status, retention_days in retention.items():
+        deleted[status] = delete_sync_logs(status, add_days(nowdate(), -retention_days))
     
-    frappe.db.commit()
+    archived = 0
+    if settings.archive_sync_payloads:
+        archived = archive_sync_log_payloads(cint(settings.archive_payloads_after_days) or 7)
+    
+    return {
+        "status": "success",
+        "deleted": deleted,
+        "archived": archived,
+        "message": f"Cleaned up {sum(deleted.values())} sync logs and archived {archived} payloads"
+    }
+
+
+def delete_sync_logs(status: str, cutoff_date) -> int:
+    """Delete sync logs of a status created before the cutoff, one small batch per transaction"""
+    deleted = 0
+    
+    while True:
+        logs = frappe.db.sql("""
+            SELECT name, payload_archive FROM `tabPOS Sync Log`
+            WHERE status = %s AND creation < %s
+            ORDER BY creation
+            LIMIT %s
+        """, (status, cutoff_date, SYNC_LOG_CLEANUP_BATCH), as_dict=True)
+        
+        if not logs:
+            break
+        
+        names = [log.name for log in logs]
+        # Archived payload files go first, nothing points at them once the rows are gone
+        delete_payload_archives(log.payload_archive for log in logs)
+        frappe.db.delete("POS Sync Log", {"name": ["in", names]})
+        frappe.db.commit()
+        deleted += len(names)
+        
+        time.sleep(SYNC_LOG_CLEANUP_PAUSE)
+    
+    return deleted
+
+
+def archive_sync_log_payloads(after_days: int) -> int:
+    """Move payloads of synced logs older than after_days to files on disk"""
+    cutoff_date = add_days(nowdate(), -after_days)
+    archived = 0
+    
+    while True:
+        logs = frappe.get_all(
+            "POS Sync Log",
+            filters={
+                "status": "Synced",
+                "creation": ["<", cutoff_date],
+                "payload_encoding": ["in", ["Plain", "zlib"]]
+            },
+            fields=["name", "creation", "data_json", "payload", "payload_encoding", "payload_archive"],
+            order_by="creation asc",
+            limit=SYNC_LOG_CLEANUP_BATCH
+        )
+        
+        if not logs:
+            break
+        
+        for log in logs:
+            archive_payload(log)
+        frappe.db.commit()
+        archived += len(logs)
+        
+        time.sleep(SYNC_LOG_CLEANUP_PAUSE)
     
-    return {"status": "success", "message": f"Cleaned up sync logs older than {days} days"}
+    return archived
@@ -0,0 +1,146 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate, nowdate
+from unittest.mock import patch
+
+from smart_pos.smart_pos.api import reports_api
+from smart_pos.smart_pos.utils.sales_rollup import (
+    ITEM_ROLLUP,
+    PAYMENT_ROLLUP,
+    SALES_ROLLUP,
+    rebuild_sales_rollup,
+)
+
+
+SEED_DAYS = 365
+SEED_INVOICES_PER_DAY = 20
+TEST_PROFILE = "_Test Explain Profile"
+
+# A plan reading this many rows without an index counts as a full scan
+FULL_SCAN_ROWS = 1000
+
+
+class TestReportsAPI(FrappeTestCase):
+    """EXPLAIN checks for reports_api queries against a year of seeded invoices and their rollups"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        today = getdate(nowdate())
+        invoices, payments, sessions = [], [], []
+        
+        for day in range(SEED_DAYS):
+            posting_date = add_days(today, -day)
+            session = f"_T-EXPLAIN-SESSION-{day:03d}"
+            sessions.append((session, TEST_PROFILE, "Administrator", "Closed", f"{posting_date} 08:00:00"))
+            
+            for n in range(SEED_INVOICES_PER_DAY):
+                name = f"_T-EXPLAIN-{day:03d}-{n:02d}"
+                invoices.append((
+                    name, posting_date, f"{8 + n % 12:02d}:15:00", TEST_PROFILE, session,
+                    1, int(n % 10 == 0), 115, 100, "_Test Customer", "Administrator"
+                ))
+                payments.append((f"{name}-1", name, "POS Invoice", "payments", "Cash", 115))
+        
+        frappe.db.bulk_insert(
+            "POS Session", ["name", "pos_profile", "user", "status", "opening_time"], sessions
+        )
+        frappe.db.bulk_insert("POS Invoice", [
+            "name", "posting_date", "posting_time", "pos_profile", "pos_session",
+            "docstatus", "is_return", "grand_total", "net_total", "customer", "owner"
+        ], invoices)
+        frappe.db.bulk_insert(
+            "Sales Invoice Payment", ["name", "parent", "parenttype", "parentfield", "mode_of_payment", "amount"],
+            payments
+        )
+        # bulk_insert skips the submit hooks, so fill the rollups the reports read;
+        # the rebuild commits, hence the explicit cleanup in tearDownClass
+        rebuild_sales_rollup(add_days(today, -(SEED_DAYS - 1)), today)
+    
+    @classmethod
+    def tearDownClass(cls):
+        frappe.db.delete("Sales Invoice Payment", {"parent": ["like", "_T-EXPLAIN-%"]})
+        frappe.db.delete("POS Invoice", {"name": ["like", "_T-EXPLAIN-%"]})
+        frappe.db.delete("POS Session", {"name": ["like", "_T-EXPLAIN-SESSION-%"]})
+        for doctype in (SALES_ROLLUP, PAYMENT_ROLLUP, ITEM_ROLLUP):
+            frappe.db.delete(doctype, {"pos_profile": TEST_PROFILE})
+        frappe.db.commit()
+        super().tearDownClass()
+    
+    def capture_queries(self, method, **kwargs):
+        """Run a report endpoint, bypassing its cache, and collect the SELECTs it sends"""
+        queries = []
+        sql = frappe.db.sql
+        
+        def capture(query, values=(), *args, **kw):
+            if str(query).lstrip().upper().startswith("SELECT"):
+                queries.append((str(query), values))
+            return sql(query, values, *args, **kw)
+        
+        with patch.object(frappe.db, "sql", capture):
+            getattr(method, "__wrapped__", method)(**kwargs)
+        
+        self.assertTrue(queries)
+        return queries
+    
+    def assertNoFullScan(self, queries):
+        for query, values in queries:
+            for step in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+                if step.type == "ALL" and (step.rows or 0) >= FULL_SCAN_ROWS:
+                    self.fail(f"Full scan of {step.table} ({step.rows} rows) in:\n{query}")
+    
+    def test_seeded_rollups_cover_the_year(self):
+        """Test that the EXPLAIN checks run against filled rollups, not empty tables"""
+        self.assertEqual(
+            frappe.db.count(SALES_ROLLUP, {"pos_profile": TEST_PROFILE}),
+            frappe.db.sql("""
+                SELECT COUNT(DISTINCT posting_date, HOUR(posting_time), is_return)
+                FROM `tabPOS Invoice` WHERE pos_profile = %s
+            """, TEST_PROFILE)[0][0]
+        )
+        self.assertEqual(frappe.db.count(PAYMENT_ROLLUP, {"pos_profile": TEST_PROFILE}),
+                         frappe.db.count(SALES_ROLLUP, {"pos_profile": TEST_PROFILE}))
+    
+    def test_daily_report_uses_indexes(self):
+        """Test that the daily report reads one day of rollups and invoices through an index"""
+        self.assertNoFullScan(self.capture_queries(
+            reports_api.get_daily_sales_report, date=nowdate(), pos_profile=TEST_PROFILE
+        ))
+    
+    def test_sales_trend_uses_indexes(self):
+        """Test that a week of sales trend reads the rollup through an index"""
+        self.assertNoFullScan(self.capture_queries(
+            reports_api.get_recent_sales_trend, days=7, pos_profile=TEST_PROFILE
+        ))
+    
+    def test_session_report_uses_indexes(self):
+        """Test that the session report reaches invoices and payments through indexes"""
+        self.assertNoFullScan(self.capture_queries(
+            reports_api.get_session_detailed_report, session_id="_T-EXPLAIN-SESSION-000"
+        ))
+    
+    def test_customer_analytics_uses_indexes(self):
+        """Test that a week of customer analytics does not scan the whole year"""
+        self.assertNoFullScan(self.capture_queries(
+            reports_api.get_customer_analytics, days=7, pos_profile=TEST_PROFILE
+        ))
+    
+    def test_manager_lists_use_indexes(self):
+        """Test that the manager page's session and invoice lists page through indexes"""
+        first_page = reports_api.get_latest_invoices(pos_profile=TEST_PROFILE, page_length=10)
+        self.assertEqual(len(first_page["invoices"]), 10)
+        self.assertTrue(first_page["next_cursor"])
+        
+        self.assertNoFullScan(self.capture_queries(
+            reports_api.get_latest_invoices, pos_profile=TEST_PROFILE, after=first_page["next_cursor"]
+        ))
+        self.assertNoFullScan(self.capture_queries(reports_api.get_active_sessions))
+    
+    def test_malformed_cursor_is_rejected(self):
+        """Test that a cursor the server did not issue is a validation error, not a server error"""
+        for cursor in ("not-a-cursor", "yesterday|_T-EXPLAIN-000-00", "2026-01-01 08:00:00|"):
+            with self.assertRaises(frappe.ValidationError):
+                reports_api.get_latest_invoices(pos_profile=TEST_PROFILE, after=cursor)
@@ -12,6 +12,9 @@ from frappe import _
 from frappe.utils import now_datetime, flt, cint
 import json
 
+from smart_pos.smart_pos.utils.zatca_queue import get_unreported_invoices
+from smart_pos.smart_pos.utils.zatca_signing import get_batch_status, resume_batch, sign_invoice, start_batch_signing
+
 
 @frappe.whitelist()
 def is_zatca_enabled():
@@ -59,67 +62,45 @@ def get_zatca_settings(company):
 @frappe.whitelist()
 def sign_pos_invoice(invoice_name):
     """Sign and submit POS invoice to ZATCA"""
-    try:
-        # Import from zatca_erpgulf
-        from zatca_erpgulf.zatca_erpgulf.pos_sign import zatca_call_pos
-        
+    # Through sign_invoice, so it waits for the company's signing lock like batches and the queue do
+    result = sign_invoice(invoice_name)
+    
+    if result["status"] == "already_signed":
+        result["message"] = _("Invoice already reported to ZATCA")
+    elif result["status"] == "success":
         invoice = frappe.get_doc("POS Invoice", invoice_name)
-        
-        if invoice.docstatus != 1:
-            frappe.throw(_("Invoice must be submitted before ZATCA signing"))
-        
-        # Check if already signed
-        if getattr(invoice, 'custom_zatca_status', None) == 'REPORTED':
-            return {
-                "status": "already_signed",
-                "message": _("Invoice already reported to ZATCA"),
-                "invoice": invoice_name
-            }
-        
-        # Call ZATCA signing
-        result = zatca_call_pos(invoice_name)
-        
-        # Refresh invoice to get updated fields
-        invoice.reload()
-        
-        return {
-            "status": "success",
-            "message": _("Invoice signed and reported to ZATCA"),
-            "invoice": invoice_name,
-            "zatca_status": getattr(invoice, 'custom_zatca_status', None),
-            "uuid": getattr(invoice, 'custom_uuid', None),
-            "qr_code": getattr(invoice, 'custom_ksa_einvoicing_qr', None)
-        }
-        
-    except Exception as e:
-        frappe.log_error(f"ZATCA signing error for {invoice_name}: {e}")
-        return {
-            "status": "error",
-            "message": str(e),
-            "invoice": invoice_name
-        }
+        result["message"] = _("Invoice signed and reported to ZATCA")
+        result["uuid"] = getattr(invoice, 'custom_uuid', None)
+        result["qr_code"] = getattr(invoice, 'custom_ksa_einvoicing_qr', None)
+    
+    return result
 
 
 @frappe.whitelist()
 def batch_sign_invoices(invoices):
-    """Sign multiple invoices to ZATCA"""
+    """
+    Sign multiple invoices to ZATCA in the background
+    Returns the batch status; progress is published on the smart_pos_zatca_batch event
+    """
     if isinstance(invoices, str):
         invoices = json.loads(invoices)
     
-    results = []
-    for invoice_name in invoices:
-        result = sign_pos_invoice(invoice_name)
-        results.append(result)
-    
-    success_count = len([r for r in results if r.get('status') == 'success'])
-    error_count = len([r for r in results if r.get('status') == 'error'])
-    
-    return {
-        "total": len(invoices),
-        "success": success_count,
-        "errors": error_count,
-        "details": results
-    }
+    frappe.has_permission("POS Invoice", "submit", throw=True)
+    return start_batch_signing(invoices)
+
+
+@frappe.whitelist()
+def get_batch_signing_status(batch_id):
+    """Progress of a background signing batch"""
+    frappe.has_permission("POS Invoice", "submit", throw=True)
+    return get_batch_status(batch_id)
+
+
+@frappe.whitelist()
+def resume_batch_signing(batch_id):
+    """Restart an interrupted signing batch from where it stopped"""
+    frappe.has_permission("POS Invoice", "submit", throw=True)
+    return resume_batch(batch_id)
 
 
 @frappe.whitelist()
@@ -145,22 +126,8 @@ def get_zatca_qr_code(invoice_name):
 
 @frappe.whitelist()
 def get_unsigned_invoices(session_id=None, limit=100):
-    """Get invoices that haven't been signed with ZATCA"""
-    filters = {
-        "docstatus": 1,
-        "custom_zatca_status": ["in", ["", "Not Submitted", None]]
-    }
-    
-    if session_id:
-        filters["pos_session"] = session_id
-    
-    invoices = frappe.get_all(
-        "POS Invoice",
-        filters=filters,
-        fields=["name", "posting_date", "customer", "grand_total", "custom_zatca_status"],
-        order_by="creation desc",
-        limit=limit
-    )
+    """Get invoices that haven't been reported to ZATCA yet, from the reporting queue"""
+    invoices = get_unreported_invoices(session_id, cint(limit) or 100)
     
     return {
         "count": len(invoices),
@@ -0,0 +1,362 @@
+# Smart POS - Offline Sync Benchmark
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Throughput benchmark for the offline sync ingest paths
+
+Generates synthetic offline invoices for N simulated devices, replays them
+through sync_offline_data, create_pos_invoice and process_pending_sync, and
+reports invoices/sec, p50/p95/p99 latency, queries per invoice and peak RSS.
+
+Run against a local test site only: generated invoices are real documents.
+
+    bench --site test.local smart-pos-sync-benchmark --devices 5 --invoices 200
+    bench --site test.local smart-pos-sync-benchmark --compare old.json new.json
+"""
+
+import frappe
+from frappe.utils import now_datetime, nowdate, nowtime, flt, cint
+import json
+import os
+import random
+import resource
+import time
+from contextlib import contextmanager
+
+
+INGEST_PATHS = ("sync_offline_data", "create_pos_invoice", "process_pending_sync")
+BENCHMARK_PREFIX = "BENCH"
+SYNC_OFFLINE_BATCH = 20
+
+
+def run(devices=5, invoices=100, paths=None, pos_profile=None, seed=None, output=None):
+    """
+    Run the benchmark and save the results as JSON
+    invoices: invoices generated per device, per ingest path
+    """
+    paths = paths or INGEST_PATHS
+    run_id = f"{BENCHMARK_PREFIX}-{now_datetime().strftime('%Y%m%d%H%M%S')}"
+    rng = random.Random(seed)
+    fixtures = get_fixtures(pos_profile)
+    
+    results = {
+        "run_id": run_id,
+        "timestamp": str(now_datetime()),
+        "app_version": frappe.get_attr("smart_pos.hooks.app_version"),
+        "frappe_version": frappe.__version__,
+        "parameters": {
+            "devices": cint(devices),
+            "invoices_per_device": cint(invoices),
+            "pos_profile": fixtures.pos_profile,
+            "seed": seed
+        },
+        "paths": {}
+    }
+    
+    for path in paths:
+        batch = generate_invoices(fixtures, cint(devices), cint(invoices), f"{run_id}-{path}", rng)
+        results["paths"][path] = replay(path, batch)
+        print_path_result(path, results["paths"][path])
+    
+    output = output or frappe.get_site_path("private", "benchmarks", f"{run_id}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=1, default=str)
+    
+    print(f"Results saved to {output}")
+    return results
+
+
+# =============================================================================
+# Synthetic Data
+# =============================================================================
+
+def get_fixtures(pos_profile=None):
+    """Collect the profile, customers, items and payment modes invoices are built from"""
+    pos_profile = pos_profile or frappe.db.get_value("POS Profile", {"disabled": 0}, "name")
+    if not pos_profile:
+        frappe.throw("The benchmark needs at least one enabled POS Profile")
+    
+    profile = frappe.get_doc("POS Profile", pos_profile)
+    
+    items = frappe.db.sql("""
+        SELECT item.item_code, item.item_name, item.stock_uom, COALESCE(price.price_list_rate, 0) as rate
+        FROM `tabItem` item
+        LEFT JOIN `tabItem Price` price
+            ON price.item_code = item.item_code AND price.price_list = %s AND price.selling = 1
+        WHERE item.disabled = 0 AND item.is_sales_item = 1 AND item.has_variants = 0
+        LIMIT 500
+    """, profile.selling_price_list, as_dict=True)
+    if not items:
+        frappe.throw("The benchmark needs sales items")
+    
+    customers = frappe.get_all("Customer", filters={"disabled": 0}, pluck="name", limit=200)
+    if profile.customer and profile.customer not in customers:
+        customers.append(profile.customer)
+    
+    taxes = []
+    if profile.taxes_and_charges:
+        taxes = frappe.get_all(
+            "Sales Taxes and Charges",
+            filters={"parent": profile.taxes_and_charges},
+            fields=["charge_type", "account_head", "rate", "description"]
+        )
+    
+    return frappe._dict({
+        "pos_profile": profile.name,
+        "company": profile.company,
+        "warehouse": profile.warehouse,
+        "items": items,
+        "customers": customers,
+        "payment_modes": [pm.mode_of_payment for pm in profile.payments],
+        "taxes": taxes
+    })
+
+
+def generate_invoices(fixtures, devices, per_device, prefix, rng, return_ratio=0.05):
+    """Build offline invoice payloads shaped like the ones terminals upload"""
+    invoices = []
+    
+    for device in range(devices):
+        device_id = f"{prefix}-DEV{device:03d}"
+        for number in range(per_device):
+            is_return = rng.random() < return_ratio
+            sign = -1 if is_return else 1
+            
+            # Most baskets are small, a few are large
+            line_count = min(int(rng.lognormvariate(1.0, 0.8)) + 1, 40)
+            items = []
+            for item in rng.sample(fixtures["items"], min(line_count, len(fixtures["items"]))):
+                qty = sign * rng.choice((1, 1, 1, 2, 2, 3, 5))
+                rate = flt(item.rate) or flt(rng.uniform(1, 200), 2)
+                items.append({
+                    "item_code": item.item_code,
+                    "item_name": item.item_name,
+                    "uom": item.stock_uom,
+                    "qty": qty,
+                    "rate": rate,
+                    "amount": flt(qty * rate, 2)
+                })
+            
+            total = sum(item["amount"] for item in items)
+            payments = split_payment(total, fixtures["payment_modes"], rng)
+            
+            invoices.append({
+                "offline_id": f"{device_id}-{number:06d}",
+                "device_id": device_id,
+                "company": fixtures["company"],
+                "pos_profile": fixtures["pos_profile"],
+                "warehouse": fixtures["warehouse"],
+                "customer": rng.choice(fixtures["customers"]) if fixtures["customers"] else None,
+                "posting_date": nowdate(),
+                "posting_time": nowtime(),
+                "is_return": cint(is_return),
+                "items": items,
+                "payments": payments,
+                "taxes": list(fixtures["taxes"]) if rng.random() < 0.5 else [],
+                "created_at": str(now_datetime())
+            })
+    
+    return invoices
+
+
+def split_payment(total, modes, rng):
+    """Pay with one mode, sometimes split across two"""
+    if not modes:
+        return []
+    if len(modes) > 1 and rng.random() < 0.2:
+        first = flt(total * rng.uniform(0.2, 0.8), 2)
+        first_mode, second_mode = rng.sample(modes, 2)
+        return [
+            {"mode_of_payment": first_mode, "amount": first},
+            {"mode_of_payment": second_mode, "amount": flt(total - first, 2)}
+        ]
+    return [{"mode_of_payment": rng.choice(modes), "amount": flt(total, 2)}]
+
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+def replay(path, invoices):
+    """Push invoices through one ingest path and measure it"""
+    latencies = []
+    failures = 0
+    
+    with count_queries() as queries:
+        started = time.perf_counter()
+        
+        if path == "sync_offline_data":
+            from smart_pos.smart_pos.api.sync_api import sync_offline_data
+            
+            for start in range(0, len(invoices), SYNC_OFFLINE_BATCH):
+                batch = invoices[start:start + SYNC_OFFLINE_BATCH]
+                batch_started = time.perf_counter()
+                result = sync_offline_data({"invoices": batch})
+                # Per-invoice latency is the batch call time shared across its invoices
+                latencies.extend([(time.perf_counter() - batch_started) / len(batch)] * len(batch))
+                failures += len(result.get("failed", []))
+        
+        elif path == "create_pos_invoice":
+            from smart_pos.smart_pos.api.pos_api import create_pos_invoice
+            
+            for invoice in invoices:
+                invoice_started = time.perf_counter()
+                try:
+                    create_pos_invoice(dict(invoice))
+                except Exception:
+                    frappe.db.rollback()
+                    failures += 1
+                latencies.append(time.perf_counter() - invoice_started)
+        
+        elif path == "process_pending_sync":
+            failures = replay_pending_sync(invoices, latencies)
+        
+        else:
+            frappe.throw(f"Unknown ingest path: {path}")
+        
+        elapsed = time.perf_counter() - started
+    
+    return summarize(len(invoices), failures, elapsed, latencies, queries["count"])
+
+
+def replay_pending_sync(invoices, latencies):
+    """Queue invoices as sync logs, then drain them with the scheduled job"""
+    from smart_pos.smart_pos.api.sync_api import process_pending_sync
+    from smart_pos.smart_pos.doctype.pos_sync_log.pos_sync_log import POSSyncLog
+    
+    for invoice in invoices:
+        sync_log = frappe.new_doc("POS Sync Log")
+        sync_log.offline_id = invoice["offline_id"]
+        sync_log.document_type = "POS Invoice"
+        sync_log.device_id = invoice["device_id"]
+        sync_log.pos_profile = invoice["pos_profile"]
+        sync_log.set_payload(invoice)
+        sync_log.insert(ignore_permissions=True)
+    frappe.db.commit()
+    
+    failures = 0
+    process_sync = POSSyncLog.process_sync
+    
+    def timed_process_sync(self):
+        nonlocal failures
+        started = time.perf_counter()
+        result = process_sync(self)
+        latencies.append(time.perf_counter() - started)
+        failures += 0 if result.get("success") else 1
+        return result
+    
+    POSSyncLog.process_sync = timed_process_sync
+    try:
+        # Failed rows back off into the future, so each pass only sees new work
+        processed = -1
+        while processed != len(latencies):
+            processed = len(latencies)
+            process_pending_sync()
+    finally:
+        POSSyncLog.process_sync = process_sync
+    
+    return failures
+
+
+@contextmanager
+def count_queries():
+    """Count every query issued through frappe.db.sql"""
+    counter = {"count": 0}
+    sql = frappe.db.sql
+    
+    def counted_sql(*args, **kwargs):
+        counter["count"] += 1
+        return sql(*args, **kwargs)
+    
+    frappe.db.sql = counted_sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = sql
+
+
+def summarize(total, failures, elapsed, latencies, query_count):
+    latencies = sorted(latencies)
+    return {
+        "invoices": total,
+        "failed": failures,
+        "elapsed_sec": round(elapsed, 3),
+        "invoices_per_sec": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": percentile_ms(latencies, 50),
+            "p95": percentile_ms(latencies, 95),
+            "p99": percentile_ms(latencies, 99)
+        },
+        "queries_per_invoice": round(query_count / total, 1) if total else None,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def percentile_ms(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, round(percent / 100 * (len(sorted_values) - 1)))
+    return round(sorted_values[index] * 1000, 2)
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+def print_path_result(path, result):
+    latency = result["latency_ms"]
+    print(
+        f"{path:<22} {result['invoices_per_sec']:>8} inv/s  "
+        f"p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  "
+        f"{result['queries_per_invoice']} q/inv  {result['failed']} failed  "
+        f"peak RSS {result['peak_rss_mb']}MB"
+    )
+
+
+def compare(baseline_file, candidate_file):
+    """Print per-path metric changes between two saved benchmark runs"""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(candidate_file) as f:
+        candidate = json.load(f)
+    
+    print(f"{baseline['run_id']} ({baseline['app_version']}) -> {candidate['run_id']} ({candidate['app_version']})")
+    
+    for path, result in candidate["paths"].items():
+        before = baseline["paths"].get(path)
+        if not before:
+            continue
+        metrics = {
+            "invoices_per_sec": (before["invoices_per_sec"], result["invoices_per_sec"]),
+            "p95_ms": (before["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            "queries_per_invoice": (before["queries_per_invoice"], result["queries_per_invoice"]),
+            "peak_rss_mb": (before["peak_rss_mb"], result["peak_rss_mb"])
+        }
+        changes = "  ".join(
+            f"{name} {old} -> {new} ({format_change(old, new)})" for name, (old, new) in metrics.items()
+        )
+        print(f"{path:<22} {changes}")
+
+
+def format_change(old, new):
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def cleanup(run_id=None):
+    """Cancel and delete invoices and sync logs created by benchmark runs"""
+    pattern = f"{run_id or BENCHMARK_PREFIX}%"
+    
+    for name in frappe.get_all("POS Invoice", filters={"offline_id": ["like", pattern]}, pluck="name"):
+        invoice = frappe.get_doc("POS Invoice", name)
+        if invoice.docstatus == 1:
+            invoice.cancel()
+        frappe.delete_doc("POS Invoice", name, force=True)
+        frappe.db.commit()
+    
+    frappe.db.delete("POS Sync Log", {"offline_id": ["like", pattern]})
+    frappe.db.commit()
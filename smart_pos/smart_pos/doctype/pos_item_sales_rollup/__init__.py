@@ -0,0 +1 @@
+# POS Item Sales Rollup
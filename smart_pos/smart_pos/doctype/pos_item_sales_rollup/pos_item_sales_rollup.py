@@ -0,0 +1,15 @@
+# POS Item Sales Rollup
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSItemSalesRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS Item Sales Rollup", ["posting_date", "pos_profile"])
+    frappe.db.add_index("POS Item Sales Rollup", ["pos_session"])
@@ -0,0 +1 @@
+# POS Payment Rollup
@@ -0,0 +1,14 @@
+# POS Payment Rollup
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSPaymentRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS Payment Rollup", ["posting_date", "pos_profile"])
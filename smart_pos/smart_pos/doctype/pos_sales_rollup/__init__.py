@@ -0,0 +1 @@
+# POS Sales Rollup
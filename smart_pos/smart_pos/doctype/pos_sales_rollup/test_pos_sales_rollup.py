@@ -0,0 +1,97 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from smart_pos.smart_pos.api.reports_api import get_sales_heatmap
+from smart_pos.smart_pos.utils.sales_rollup import (
+    ITEM_ROLLUP,
+    get_bucket_key,
+    get_rollup_name,
+    update_sales_rollup,
+)
+
+
+class TestPOSSalesRollup(FrappeTestCase):
+    """Test cases for POS Sales Rollup DocType"""
+    
+    def make_invoice(self, **kwargs):
+        return frappe._dict({
+            "posting_date": "2026-01-15",
+            "posting_time": "14:25:00",
+            "pos_profile": "_Test Rollup Profile",
+            "company": None,
+            "owner": "Administrator",
+            "is_return": 0,
+            "grand_total": 115,
+            "net_total": 100,
+            "pos_session": "_Test Rollup Session",
+            "items": [
+                frappe._dict({"item_code": "_Test Rollup Item", "item_name": "Rollup Item",
+                    "item_group": "Products", "qty": 2, "amount": 60}),
+                frappe._dict({"item_code": "_Test Rollup Item", "item_name": "Rollup Item",
+                    "item_group": "Products", "qty": 1, "amount": 30})
+            ],
+            "payments": [
+                frappe._dict({"mode_of_payment": "Cash", "amount": 115}),
+                frappe._dict({"mode_of_payment": "Card", "amount": 0})
+            ],
+            **kwargs
+        })
+    
+    def test_bucket_name_matches_sql_key(self):
+        """Test that bucket names hash the same key the rebuild query uses"""
+        invoice = self.make_invoice()
+        name = get_rollup_name(*get_bucket_key(invoice).values())
+        expected = frappe.db.sql("""
+            SELECT MD5(CONCAT_WS('|', DATE('2026-01-15'), HOUR(TIME('14:25:00')),
+                '_Test Rollup Profile', 'Administrator', 0))
+        """)[0][0]
+        self.assertEqual(name, expected)
+    
+    def test_submit_and_cancel_net_to_zero(self):
+        """Test that cancelling an invoice removes exactly what submitting added"""
+        invoice = self.make_invoice()
+        name = get_rollup_name(*get_bucket_key(invoice).values())
+        
+        update_sales_rollup(invoice)
+        update_sales_rollup(invoice)
+        rollup = frappe.db.get_value("POS Sales Rollup", name, ["invoice_count", "grand_total"], as_dict=True)
+        self.assertEqual(rollup.invoice_count, 2)
+        self.assertEqual(rollup.grand_total, 230)
+        self.assertFalse(frappe.db.exists("POS Payment Rollup", {"pos_profile": "_Test Rollup Profile", "mode_of_payment": "Card"}))
+        
+        update_sales_rollup(invoice, -1)
+        update_sales_rollup(invoice, -1)
+        rollup = frappe.db.get_value("POS Sales Rollup", name, ["invoice_count", "grand_total"], as_dict=True)
+        self.assertEqual(rollup.invoice_count, 0)
+        self.assertEqual(rollup.grand_total, 0)
+    
+    def test_item_rollup_merges_lines_per_invoice(self):
+        """Test that repeated lines of one item count as a single transaction"""
+        invoice = self.make_invoice()
+        update_sales_rollup(invoice)
+        
+        rollup = frappe.db.get_value(ITEM_ROLLUP, {
+            "pos_session": "_Test Rollup Session",
+            "item_code": "_Test Rollup Item"
+        }, ["qty", "amount", "transaction_count", "item_group"], as_dict=True)
+        self.assertEqual(rollup.qty, 3)
+        self.assertEqual(rollup.amount, 90)
+        self.assertEqual(rollup.transaction_count, 1)
+        self.assertEqual(rollup.item_group, "Products")
+    
+    def test_heatmap_places_buckets_by_weekday_and_hour(self):
+        """Test that the heatmap reads hourly buckets into Monday-first weekday rows"""
+        update_sales_rollup(self.make_invoice(pos_profile="_Test Heatmap Profile"))
+        
+        heatmap = get_sales_heatmap.__wrapped__(
+            from_date="2026-01-01", to_date="2026-01-31", pos_profile="_Test Heatmap Profile", band=1
+        )
+        # 2026-01-15 is a Thursday, the fifth of five that month
+        self.assertEqual(heatmap["occurrences"][3], 5)
+        self.assertEqual(heatmap["total"][3][14], 115)
+        self.assertEqual(heatmap["average"][3][14], 23)
+        self.assertEqual(heatmap["band"]["p90"][3][14], 69)
+        self.assertEqual(sum(map(sum, heatmap["total"])), 115)
@@ -152,3 +152,8 @@ def close_session(session_name, actual_cash=0, closing_notes=None):
         frappe.throw(_("You can only close your own sessions"))
     
     return session.close_session(flt(actual_cash), closing_notes)
+
+
+def on_doctype_update():
+    # Open sessions for the manager page, latest opened first
+    frappe.db.add_index("POS Session", ["status", "opening_time"])
@@ -0,0 +1,3 @@
+# POS Sync Cursor
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
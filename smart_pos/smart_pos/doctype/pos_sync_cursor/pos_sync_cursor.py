@@ -0,0 +1,14 @@
+# POS Sync Cursor
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSSyncCursor(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_unique("POS Sync Cursor", ["device_id", "pos_profile", "section"])
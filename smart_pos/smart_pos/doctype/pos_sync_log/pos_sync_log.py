@@ -3,15 +3,63 @@
 # License: MIT
 
 import frappe
+import base64
+import gzip
 import json
+import os
+import random
+import zlib
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import now_datetime
+from frappe.utils import now_datetime, add_to_date, cint, getdate
+
+
+# Retry policy for failed sync operations
+MAX_SYNC_ATTEMPTS = 8
+RETRY_BASE_DELAY = 60  # seconds
+RETRY_MAX_DELAY = 6 * 60 * 60  # seconds
+
+# Payloads are stored zlib-compressed; aged ones may be moved to disk
+PAYLOAD_COMPRESSION_LEVEL = 6
+PAYLOAD_ARCHIVE_FOLDER = os.path.join("private", "sync_archive")
+
+# Numeric priorities, so the queue sorts High before Normal before Low
+SYNC_PRIORITY_RANKS = {"High": 3, "Normal": 2, "Low": 1}
+
+# Errors worth retrying: lock contention, timeouts, lost connections
+TRANSIENT_ERRORS = (
+    frappe.QueryDeadlockError,
+    frappe.QueryTimeoutError,
+    frappe.TimestampMismatchError,
+    frappe.DocumentLockedError,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Errors that will fail the same way on every retry: bad or missing data
+PERMANENT_ERRORS = (
+    frappe.ValidationError,
+    frappe.DoesNotExistError,
+    frappe.PermissionError,
+    frappe.DuplicateEntryError,
+    ValueError,
+    KeyError,
+    TypeError,
+    AttributeError,
+)
 
 
 class POSSyncLog(Document):
+    def before_insert(self):
+        if not self.next_attempt_at:
+            self.next_attempt_at = now_datetime()
+    
     def validate(self):
-        if self.data_json:
+        self.priority_rank = SYNC_PRIORITY_RANKS.get(self.priority, SYNC_PRIORITY_RANKS["Normal"])
+        
+        # Compressed payloads are serialized by set_payload; only plain JSON
+        # entered by hand needs parsing, and only when it changes
+        if self.data_json and self.has_value_changed("data_json"):
             try:
                 json.loads(self.data_json)
             except json.JSONDecodeError:
@@ -19,13 +67,17 @@ class POSSyncLog(Document):
     
     def process_sync(self):
         """Process the sync operation"""
-        self.status = "Processing"
-        self.attempt_count = (self.attempt_count or 0) + 1
-        self.last_attempt = now_datetime()
-        self.save()
+        # Status bookkeeping uses direct column updates instead of full saves;
+        # the synced document is committed together with the Synced status
+        self.db_set({
+            "status": "Processing",
+            "attempt_count": cint(self.attempt_count) + 1,
+            "last_attempt": now_datetime()
+        })
+        frappe.db.commit()
         
         try:
-            data = json.loads(self.data_json) if self.data_json else {}
+            data = load_payload(self)
             
             if self.document_type == "POS Invoice":
                 result = self.sync_pos_invoice(data)
@@ -34,20 +86,60 @@ class POSSyncLog(Document):
             else:
                 result = self.sync_generic_document(data)
             
-            self.status = "Synced"
-            self.synced_at = now_datetime()
-            self.document_name = result.get("name")
-            self.error_message = None
-            self.save()
+            self.db_set({
+                "status": "Synced",
+                "synced_at": now_datetime(),
+                "document_name": result.get("name"),
+                "error_message": None,
+                "next_attempt_at": None
+            })
+            frappe.db.commit()
             
             return {"success": True, "document_name": self.document_name}
-            
+        
         except Exception as e:
-            self.status = "Failed"
-            self.error_message = str(e)
-            self.save()
+            # Discard any partially created document before recording the failure
+            frappe.db.rollback()
             
-            return {"success": False, "error": str(e)}
+            if is_transient_error(e) and self.attempt_count < MAX_SYNC_ATTEMPTS:
+                status = "Failed"
+                next_attempt_at = add_to_date(
+                    self.last_attempt, seconds=get_retry_delay(self.attempt_count)
+                )
+            else:
+                # Permanent errors and exhausted retries are parked for manual review
+                status = "Dead Letter"
+                next_attempt_at = None
+            
+            self.db_set({
+                "status": status,
+                "error_message": str(e),
+                "next_attempt_at": next_attempt_at
+            })
+            frappe.db.commit()
+            
+            return {"success": False, "error": str(e), "status": self.status}
+    
+    def set_payload(self, data):
+        """Store the sync payload compressed"""
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                frappe.throw(_("Invalid JSON data"))
+        
+        raw = json.dumps(data, default=str).encode("utf-8")
+        values = {
+            "payload": base64.b64encode(zlib.compress(raw, PAYLOAD_COMPRESSION_LEVEL)).decode("ascii"),
+            "payload_encoding": "zlib",
+            "payload_archive": None,
+            "data_json": None
+        }
+        
+        if self.is_new():
+            self.update(values)
+        else:
+            self.db_set(values)
     
     def sync_pos_invoice(self, data):
         """Sync POS Invoice from offline data"""
@@ -105,8 +197,6 @@ class POSSyncLog(Document):
         if data.get("auto_submit", True):
             invoice.submit()
         
-        frappe.db.commit()
-        
         return {"name": invoice.name, "status": "created"}
     
     def sync_customer(self, data):
@@ -122,8 +212,6 @@ class POSSyncLog(Document):
         customer.email_id = data.get("email_id")
         customer.insert()
         
-        frappe.db.commit()
-        
         return {"name": customer.name, "status": "created"}
     
     def sync_generic_document(self, data):
@@ -133,6 +221,94 @@ class POSSyncLog(Document):
             if hasattr(doc, field):
                 setattr(doc, field, value)
         doc.insert()
-        frappe.db.commit()
         
         return {"name": doc.name, "status": "created"}
+
+
+def get_retry_delay(attempt_count):
+    """Seconds to wait before the next attempt: exponential backoff with equal jitter"""
+    ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(cint(attempt_count) - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def is_transient_error(error):
+    """Check whether a sync error is worth retrying"""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    if frappe.db.is_deadlocked(error) or frappe.db.is_timedout(error):
+        return True
+    # Unknown errors get the benefit of the doubt and are retried with backoff
+    return not isinstance(error, PERMANENT_ERRORS)
+
+
+def read_payload_bytes(log):
+    """Get the raw JSON bytes of a sync log payload, wherever it is stored"""
+    encoding = log.get("payload_encoding")
+    
+    if encoding == "zlib":
+        return zlib.decompress(base64.b64decode(log.get("payload")))
+    
+    if encoding == "Archived":
+        if not log.get("payload_archive"):
+            return b""
+        with gzip.open(frappe.get_site_path(log.get("payload_archive")), "rb") as f:
+            return f.read()
+    
+    return (log.get("data_json") or "").encode("utf-8")
+
+
+def load_payload(log):
+    """Decode the payload of a sync log document or row"""
+    raw = read_payload_bytes(log)
+    return json.loads(raw) if raw else {}
+
+
+def archive_payload(log):
+    """Move a sync log payload to a gzip file on disk and clear it from the database"""
+    raw = read_payload_bytes(log)
+    relative_path = None
+    
+    if raw:
+        relative_path = os.path.join(
+            PAYLOAD_ARCHIVE_FOLDER, str(getdate(log.get("creation"))), f"{log.get('name')}.json.gz"
+        )
+        path = frappe.get_site_path(relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "wb") as f:
+            f.write(raw)
+    
+    frappe.db.set_value(
+        "POS Sync Log",
+        log.get("name"),
+        {
+            "payload_encoding": "Archived",
+            "payload_archive": relative_path,
+            "payload": None,
+            "data_json": None
+        },
+        update_modified=False
+    )
+
+
+def delete_payload_archives(relative_paths):
+    """Remove archived payload files, and their date folders once empty"""
+    folders = set()
+    for relative_path in filter(None, relative_paths):
+        path = frappe.get_site_path(relative_path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        folders.add(os.path.dirname(path))
+    
+    for folder in folders:
+        try:
+            os.rmdir(folder)
+        except OSError:
+            # Not empty yet, or already gone
+            pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS Sync Log", ["status", "next_attempt_at"])
+    frappe.db.add_index("POS Sync Log", ["status", "creation"])
@@ -0,0 +1,120 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+import os
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from smart_pos.smart_pos.doctype.pos_sync_log.pos_sync_log import (
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    archive_payload,
+    get_retry_delay,
+    is_transient_error,
+    load_payload,
+)
+
+
+class TestPOSSyncLog(FrappeTestCase):
+    """Test cases for POS Sync Log DocType"""
+    
+    def test_retry_delay_grows_exponentially(self):
+        """Test that each attempt waits within its jittered backoff window"""
+        for attempt in range(1, 6):
+            ceiling = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            delay = get_retry_delay(attempt)
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+    
+    def test_retry_delay_is_capped(self):
+        """Test that late attempts never wait longer than the maximum delay"""
+        self.assertLessEqual(get_retry_delay(50), RETRY_MAX_DELAY)
+    
+    def test_error_classification(self):
+        """Test that data errors are permanent and lock errors are retried"""
+        self.assertFalse(is_transient_error(frappe.ValidationError("bad data")))
+        self.assertFalse(is_transient_error(frappe.DoesNotExistError("missing item")))
+        self.assertTrue(is_transient_error(frappe.QueryDeadlockError("deadlock")))
+        self.assertTrue(is_transient_error(frappe.TimestampMismatchError("modified")))
+    
+    def test_new_log_is_due_immediately(self):
+        """Test that a new sync log is scheduled for its first attempt"""
+        log = frappe.get_doc({
+            "doctype": "POS Sync Log",
+            "offline_id": frappe.generate_hash(length=12),
+            "document_type": "Customer",
+            "data_json": "{}"
+        })
+        log.insert()
+        
+        self.assertIsNotNone(log.next_attempt_at)
+        
+        # Clean up
+        log.delete()
+    
+    def test_payload_is_stored_compressed(self):
+        """Test that payloads round-trip through compressed storage"""
+        data = {"customer": "Walk-in", "items": [{"item_code": "ITEM-001", "qty": 2}] * 50}
+        log = frappe.get_doc({
+            "doctype": "POS Sync Log",
+            "offline_id": frappe.generate_hash(length=12),
+            "document_type": "POS Invoice"
+        })
+        log.set_payload(data)
+        log.insert()
+        
+        self.assertEqual(log.payload_encoding, "zlib")
+        self.assertFalse(log.data_json)
+        self.assertLess(len(log.payload), len(frappe.as_json(data)))
+        self.assertEqual(load_payload(frappe.get_doc("POS Sync Log", log.name)), data)
+        
+        # Clean up
+        log.delete()
+    
+    def test_retention_removes_archived_payload_files(self):
+        """Test that deleting an archived sync log also deletes its payload file and empty date folder"""
+        from smart_pos.smart_pos.api.sync_api import delete_sync_logs
+        
+        log = frappe.get_doc({
+            "doctype": "POS Sync Log",
+            "offline_id": frappe.generate_hash(length=12),
+            "document_type": "Customer"
+        })
+        log.set_payload({"customer_name": "Archived Customer"})
+        log.insert()
+        frappe.db.set_value(
+            "POS Sync Log", log.name,
+            {"status": "Synced", "creation": add_days(nowdate(), -400)},
+            update_modified=False
+        )
+        archive_payload(frappe.db.get_value(
+            "POS Sync Log", log.name,
+            ["name", "creation", "data_json", "payload", "payload_encoding", "payload_archive"], as_dict=True
+        ))
+        path = frappe.get_site_path(frappe.db.get_value("POS Sync Log", log.name, "payload_archive"))
+        self.assertTrue(os.path.exists(path))
+        
+        delete_sync_logs("Synced", add_days(nowdate(), -399))
+        
+        self.assertFalse(frappe.db.exists("POS Sync Log", log.name))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+    
+    def test_small_invoice_lane_is_not_starved(self):
+        """Test that a reconnecting device's invoices are scheduled ahead of a large low-priority backlog"""
+        from smart_pos.smart_pos.api.sync_api import weighted_round_robin
+        
+        backlog = [
+            frappe._dict(name=f"CUST-{i}", document_type="Customer", priority_rank=1)
+            for i in range(100)
+        ]
+        invoices = [
+            frappe._dict(name=f"INV-{i}", document_type="POS Invoice", priority_rank=2)
+            for i in range(2)
+        ]
+        
+        picked = weighted_round_robin([backlog, invoices], 4)
+        
+        self.assertEqual(picked[:2], ["INV-0", "INV-1"])
+        self.assertEqual(len(picked), 4)
@@ -0,0 +1,15 @@
+# POS ZATCA Queue
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSZATCAQueue(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS ZATCA Queue", ["status", "next_attempt_at"])
+    frappe.db.add_index("POS ZATCA Queue", ["pos_session", "status"])
@@ -0,0 +1,115 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_datetime, now_datetime, nowdate
+from unittest.mock import patch
+
+from smart_pos.smart_pos.utils import zatca_queue, zatca_signing
+
+
+STUB_SIGNER = "smart_pos.smart_pos.doctype.pos_zatca_queue.test_pos_zatca_queue.stub_zatca_call_pos"
+TEST_INVOICE = "_T-ZATCA-QUEUE-001"
+
+stub_error = []
+signed = []
+
+
+def stub_zatca_call_pos(invoice_name):
+    """Local stand-in for zatca_erpgulf's zatca_call_pos"""
+    signed.append(invoice_name)
+    if stub_error:
+        raise ConnectionError(stub_error[0])
+    frappe.db.set_value("POS Invoice", invoice_name, "custom_zatca_status", "REPORTED")
+
+
+def run_now(method, queue=None, timeout=None, **kwargs):
+    """frappe.enqueue replacement that runs the job inline"""
+    return frappe.get_attr(method)(**kwargs)
+
+
+class TestPOSZATCAQueue(FrappeTestCase):
+    """Test cases for POS ZATCA Queue DocType"""
+    
+    def setUp(self):
+        if not frappe.db.has_column("POS Invoice", "custom_zatca_status"):
+            self.skipTest("ZATCA custom fields are not installed")
+        
+        stub_error.clear()
+        signed.clear()
+        self.cleanup()
+        frappe.db.bulk_insert(
+            "POS Invoice", ["name", "posting_date", "company", "docstatus", "grand_total", "custom_zatca_status"],
+            [(TEST_INVOICE, nowdate(), "_Test Company", 1, 115, "Not Submitted")]
+        )
+        now = now_datetime()
+        frappe.get_doc({
+            "doctype": zatca_queue.ZATCA_QUEUE,
+            "name": TEST_INVOICE,
+            "invoice": TEST_INVOICE,
+            "company": "_Test Company",
+            "status": "Pending",
+            "next_attempt_at": now,
+            "creation": now,
+            "modified": now
+        }).db_insert()
+        frappe.db.commit()
+        
+        conf = patch.dict(frappe.local.conf, {"smart_pos_zatca_signer": STUB_SIGNER})
+        conf.start()
+        self.addCleanup(conf.stop)
+    
+    def tearDown(self):
+        self.cleanup()
+        frappe.db.commit()
+    
+    def cleanup(self):
+        frappe.db.delete(zatca_queue.ZATCA_QUEUE, {"name": TEST_INVOICE})
+        frappe.db.delete("POS Invoice", {"name": TEST_INVOICE})
+    
+    def get_row(self):
+        return frappe.db.get_value(
+            zatca_queue.ZATCA_QUEUE, TEST_INVOICE,
+            ["status", "attempt_count", "next_attempt_at", "error_message"], as_dict=True
+        )
+    
+    def test_worker_reports_pending_invoice(self):
+        """Test that draining the queue reports the invoice and leaves it off the pending list"""
+        zatca_queue.process_zatca_queue()
+        
+        self.assertEqual(self.get_row().status, "Reported")
+        unreported = [row.name for row in zatca_queue.get_unreported_invoices()]
+        self.assertNotIn(TEST_INVOICE, unreported)
+    
+    def test_failure_is_retried_later(self):
+        """Test that a failed report is scheduled again with backoff instead of retried at once"""
+        stub_error.append("ZATCA unavailable")
+        zatca_queue.process_zatca_queue()
+        
+        row = self.get_row()
+        self.assertEqual(row.status, "Failed")
+        self.assertEqual(row.attempt_count, 1)
+        self.assertGreater(get_datetime(row.next_attempt_at), now_datetime())
+        self.assertIn(TEST_INVOICE, [r.name for r in zatca_queue.get_unreported_invoices()])
+    
+    def test_exhausted_retries_park_as_dead_letter(self):
+        """Test that the last allowed attempt parks the row for manual review"""
+        stub_error.append("ZATCA unavailable")
+        frappe.db.set_value(
+            zatca_queue.ZATCA_QUEUE, TEST_INVOICE, "attempt_count", zatca_queue.MAX_REPORT_ATTEMPTS - 1
+        )
+        zatca_queue.process_zatca_queue()
+        
+        row = self.get_row()
+        self.assertEqual(row.status, "Dead Letter")
+        self.assertIsNone(row.next_attempt_at)
+    
+    def test_batch_signing_closes_queue_row(self):
+        """Test that an invoice signed by a batch lane is not reported again by the queue"""
+        with patch.object(frappe, "enqueue", run_now):
+            zatca_signing.start_batch_signing([TEST_INVOICE])
+        
+        self.assertEqual(self.get_row().status, "Reported")
+        zatca_queue.process_zatca_queue()
+        self.assertEqual(signed, [TEST_INVOICE])
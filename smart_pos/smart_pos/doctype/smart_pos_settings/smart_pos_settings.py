@@ -10,6 +10,8 @@ class SmartPOSSettings(Document):
     def validate(self):
         self.validate_sync_interval()
         self.validate_offline_settings()
+        self.validate_sync_retention()
+        self.validate_sync_admission()
     
     def validate_sync_interval(self):
         if self.sync_interval < 10:
@@ -24,6 +26,21 @@ class SmartPOSSettings(Document):
             frappe.throw("Max offline days cannot exceed 30")
         if self.offline_data_limit_mb < 10:
             frappe.throw("Offline data limit must be at least 10 MB")
+    
+    def validate_sync_retention(self):
+        for field in ("synced_log_retention_days", "failed_log_retention_days", "conflict_log_retention_days"):
+            if self.get(field) < 1:
+                frappe.throw(f"{self.meta.get_label(field)} must be at least 1")
+        if self.archive_sync_payloads and self.archive_payloads_after_days < 1:
+            frappe.throw("Archive payloads after days must be at least 1")
+    
+    def validate_sync_admission(self):
+        if not self.enable_sync_admission_control:
+            return
+        if self.max_concurrent_sync_requests < 1:
+            frappe.throw("Max concurrent sync requests must be at least 1")
+        if self.max_concurrent_sync_per_device < 1:
+            frappe.throw("Max concurrent sync requests per device must be at least 1")
 
 
 @frappe.whitelist()
@@ -28,11 +28,17 @@ class POSManagerDashboard {
         this.setupFilters();
         this.render();
         this.loadDashboard();
+        this.subscribeLiveTotals();
         
-        // Auto-refresh every 60 seconds
+        // Today's figures are pushed as invoices come in; resync them from
+        // the server's running totals every minute and reload everything else
+        // every 5 minutes
+        this.liveInterval = setInterval(() => {
+            this.loadLiveTotals();
+        }, 60000);
         this.refreshInterval = setInterval(() => {
             this.loadDashboard();
-        }, 60000);
+        }, 300000);
     }
     
     setupFilters() {
@@ -121,10 +127,14 @@ class POSManagerDashboard {
                     <div class="chart-card">
                         <div class="chart-header">
                             <h3>${__("Sales Trend")}</h3>
+                            <span id="trend-progress" class="chart-progress"></span>
                             <select id="trend-period" class="chart-filter">
                                 <option value="7">${__("Last 7 Days")}</option>
                                 <option value="14">${__("Last 14 Days")}</option>
                                 <option value="30">${__("Last 30 Days")}</option>
+                                <option value="90">${__("Last 90 Days")}</option>
+                                <option value="180">${__("Last 180 Days")}</option>
+                                <option value="365">${__("Last 365 Days")}</option>
                             </select>
                         </div>
                         <div class="chart-body">
@@ -279,8 +289,12 @@ class POSManagerDashboard {
             
             const stats = response.message || {};
             
-            $('#today-sales').text(this.formatCurrency(stats.today?.sales || 0));
-            $('#today-invoices').text(stats.today?.invoices || 0);
+            this.today = {
+                sales: stats.today?.sales || 0,
+                invoices: stats.today?.invoices || 0,
+                returns: stats.today?.returns || 0
+            };
+            this.renderToday();
             $('#active-sessions').text(stats.active_sessions || 0);
             $('#pending-zatca').text(stats.pending_zatca || 0);
             
@@ -300,14 +314,77 @@ class POSManagerDashboard {
         }
     }
     
+    renderToday() {
+        $('#today-sales').text(this.formatCurrency(this.today.sales));
+        $('#today-invoices').text(this.today.invoices);
+    }
+    
+    async loadLiveTotals() {
+        try {
+            const response = await frappe.call({
+                method: 'smart_pos.smart_pos.api.reports_api.get_live_dashboard',
+                args: { pos_profile: this.posProfileFilter.get_value() }
+            });
+            
+            const live = response.message || {};
+            if (!live.today) return;
+            this.today = { sales: live.today.sales, invoices: live.today.invoices, returns: live.today.returns };
+            this.renderToday();
+            
+        } catch (e) {
+            console.error('Error loading live totals:', e);
+        }
+    }
+    
+    subscribeLiveTotals() {
+        frappe.realtime.doctype_subscribe('POS Invoice');
+        this.onLiveTotals = (message) => this.applyLiveDelta(message);
+        frappe.realtime.on('smart_pos_live_totals', this.onLiveTotals);
+    }
+    
+    applyLiveDelta(message) {
+        // Each submit or cancel pushes its own delta, no queries needed
+        if (!this.today || message.date !== frappe.datetime.get_today()) return;
+        const posProfile = this.posProfileFilter.get_value();
+        if (posProfile && message.pos_profile !== posProfile) return;
+        
+        const delta = message.delta || {};
+        this.today.sales += delta.sales || 0;
+        this.today.invoices += delta.invoices || 0;
+        this.today.returns += delta.returns || 0;
+        this.renderToday();
+        
+        const session = (this.sessions || []).find(s => s.name === message.pos_session);
+        if (session) {
+            session.total_sales = (session.total_sales || 0) + (delta.sales || 0);
+            session.total_returns = (session.total_returns || 0) + (delta.returns || 0);
+            session.total_invoices = (session.total_invoices || 0) + (delta.invoices || 0);
+            this.renderSessionsTable(this.sessions);
+        }
+        
+        if (message.invoice && this.invoices) {
+            this.invoices = [message.invoice, ...this.invoices].slice(0, 10);
+            this.renderInvoicesTable(this.invoices);
+        }
+    }
+    
     async loadSalesTrend(days = 7, posProfile = null) {
+        this.trendRequest = days;
         try {
             const response = await frappe.call({
                 method: 'smart_pos.smart_pos.api.reports_api.get_sales_trend',
                 args: { days, pos_profile: posProfile }
             });
             
-            const data = response.message?.data || [];
+            let trend = response.message || {};
+            if (trend.job_id) {
+                trend = await this.waitForReportJob(trend.job_id, '#trend-progress');
+            }
+            
+            // A newer period was picked while this one was computing
+            if (this.trendRequest !== days) return;
+            
+            const data = trend?.data || [];
             this.renderSalesChart(data);
             
         } catch (e) {
@@ -410,17 +487,12 @@ class POSManagerDashboard {
     async loadActiveSessions() {
         try {
             const response = await frappe.call({
-                method: 'frappe.client.get_list',
-                args: {
-                    doctype: 'POS Session',
-                    filters: { status: 'Open' },
-                    fields: ['name', 'pos_profile', 'user', 'opening_time', 'total_sales', 'total_invoices'],
-                    order_by: 'opening_time desc'
-                }
+                method: 'smart_pos.smart_pos.api.reports_api.get_active_sessions',
+                args: { pos_profile: this.posProfileFilter.get_value() }
             });
             
-            const sessions = response.message || [];
-            this.renderSessionsTable(sessions);
+            this.sessions = response.message?.sessions || [];
+            this.renderSessionsTable(this.sessions);
             
         } catch (e) {
             console.error('Error loading sessions:', e);
@@ -439,7 +511,7 @@ class POSManagerDashboard {
             <tr>
                 <td><a href="/app/pos-session/${s.name}">${s.name}</a></td>
                 <td>${s.pos_profile}</td>
-                <td>${s.user}</td>
+                <td>${s.user_name || s.user}</td>
                 <td>${frappe.datetime.prettyDate(s.opening_time)}</td>
                 <td>${this.formatCurrency(s.total_sales || 0)}</td>
                 <td>${s.total_invoices || 0}</td>
@@ -518,23 +590,13 @@ class POSManagerDashboard {
     
     async loadRecentInvoices(posProfile) {
         try {
-            const filters = { docstatus: 1 };
-            if (posProfile) filters.pos_profile = posProfile;
-            
             const response = await frappe.call({
-                method: 'frappe.client.get_list',
-                args: {
-                    doctype: 'POS Invoice',
-                    filters: filters,
-                    fields: ['name', 'customer_name', 'posting_time', 'grand_total', 
-                             'custom_zatca_status'],
-                    order_by: 'creation desc',
-                    limit: 10
-                }
+                method: 'smart_pos.smart_pos.api.reports_api.get_latest_invoices',
+                args: { pos_profile: posProfile, page_length: 10 }
             });
             
-            const invoices = response.message || [];
-            this.renderInvoicesTable(invoices);
+            this.invoices = response.message?.invoices || [];
+            this.renderInvoicesTable(this.invoices);
             
         } catch (e) {
             console.error('Error loading invoices:', e);
@@ -567,6 +629,52 @@ class POSManagerDashboard {
         }).join(''));
     }
     
+    waitForReportJob(jobId, progressEl) {
+        // Long ranges run as background jobs: follow realtime progress and
+        // poll as a fallback in case the socket is not connected
+        return new Promise((resolve, reject) => {
+            let finished = false;
+            
+            const finish = (status) => {
+                if (finished) return;
+                finished = true;
+                frappe.realtime.off('smart_pos_report_job', onProgress);
+                clearInterval(poll);
+                $(progressEl).text('');
+                
+                if (status.status === 'Completed') {
+                    resolve(status.result);
+                } else {
+                    reject(new Error(status.error || status.status));
+                }
+            };
+            
+            const check = async () => {
+                const response = await frappe.call({
+                    method: 'smart_pos.smart_pos.api.reports_api.get_report_job',
+                    args: { job_id: jobId }
+                });
+                const status = response.message || {};
+                if (['Completed', 'Failed', 'Not Found'].includes(status.status)) {
+                    finish(status);
+                } else if (!finished) {
+                    $(progressEl).text(`${status.progress || 0}%`);
+                }
+            };
+            
+            const onProgress = (status) => {
+                if (status.job_id !== jobId || finished) return;
+                $(progressEl).text(`${status.progress || 0}%`);
+                // Completion payloads carry no result, fetch it
+                if (['Completed', 'Failed'].includes(status.status)) check();
+            };
+            
+            frappe.realtime.on('smart_pos_report_job', onProgress);
+            const poll = setInterval(check, 5000);
+            check();
+        });
+    }
+    
     formatCurrency(amount, short = false) {
         if (short && amount >= 1000) {
             return (amount / 1000).toFixed(1) + 'K';
@@ -578,6 +686,13 @@ class POSManagerDashboard {
         if (this.refreshInterval) {
             clearInterval(this.refreshInterval);
         }
+        if (this.liveInterval) {
+            clearInterval(this.liveInterval);
+        }
+        if (this.onLiveTotals) {
+            frappe.realtime.off('smart_pos_live_totals', this.onLiveTotals);
+            frappe.realtime.doctype_unsubscribe('POS Invoice');
+        }
         if (this.salesChart) {
             this.salesChart.destroy();
         }
@@ -0,0 +1,132 @@
+# Smart POS - Sync Admission Control
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Admission control for sync endpoints
+Caps concurrent sync requests per site and per device so a reconnect storm
+cannot occupy every web worker. Rejected clients get HTTP 429 with a jittered
+Retry-After hint that grows with the number of clients waiting.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+import functools
+import random
+import time
+
+
+# Slots of requests that died without releasing them expire after this
+SLOT_TTL = 120  # seconds
+WAITING_WINDOW = 60  # seconds
+
+RETRY_AFTER_BASE = 5  # seconds
+RETRY_AFTER_MAX = 120  # seconds
+
+DEVICE_HEADER = "X-POS-Device-ID"
+SYNC_CLIENT_HEADER = "X-POS-Sync"
+
+
+def admit_sync_request(sync_clients_only=False):
+    """
+    Decorator for sync endpoints, applied below @frappe.whitelist()
+    sync_clients_only: only limit requests sent by the sync engine, so the same
+    endpoint stays unthrottled for live checkout
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not should_admit(sync_clients_only):
+                return fn(*args, **kwargs)
+            
+            settings = frappe.get_cached_doc("Smart POS Settings")
+            if not settings.enable_sync_admission_control:
+                return fn(*args, **kwargs)
+            
+            slots = acquire_slots(settings)
+            frappe.flags.sync_admitted = True
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                frappe.flags.sync_admitted = False
+                release_slots(slots)
+        
+        return wrapper
+    
+    return decorator
+
+
+def should_admit(sync_clients_only):
+    """Only web requests are limited, and only once per request"""
+    request = getattr(frappe.local, "request", None)
+    if not request or frappe.flags.sync_admitted:
+        return False
+    if sync_clients_only and not request.headers.get(SYNC_CLIENT_HEADER):
+        return False
+    return True
+
+
+def acquire_slots(settings):
+    """Take a site slot and a device slot, or reject the request"""
+    cache = frappe.cache()
+    token = frappe.generate_hash(length=12)
+    device = frappe.request.headers.get(DEVICE_HEADER) or frappe.session.user
+    limits = [
+        (cache.make_key("smart_pos:sync_slots:site"), cint(settings.max_concurrent_sync_requests)),
+        (cache.make_key(f"smart_pos:sync_slots:device:{device}"), cint(settings.max_concurrent_sync_per_device))
+    ]
+    
+    taken = []
+    for key, limit in limits:
+        now = time.time()
+        pipe = cache.pipeline()
+        pipe.zremrangebyscore(key, 0, now - SLOT_TTL)
+        pipe.zadd(key, {token: now})
+        pipe.zcard(key)
+        pipe.expire(key, SLOT_TTL)
+        in_flight = pipe.execute()[2]
+        taken.append((key, token))
+        
+        if limit and in_flight > limit:
+            release_slots(taken)
+            reject(cint(settings.max_concurrent_sync_requests))
+    
+    return taken
+
+
+def release_slots(slots):
+    cache = frappe.cache()
+    for key, token in slots:
+        cache.zrem(key, token)
+
+
+def reject(capacity):
+    """Answer 429 with a Retry-After hint spread over the clients currently waiting"""
+    cache = frappe.cache()
+    waiting_key = cache.make_key("smart_pos:sync_waiting")
+    waiting = cache.incr(waiting_key)
+    cache.expire(waiting_key, WAITING_WINDOW)
+    
+    retry_after = get_retry_after(waiting, capacity)
+    frappe.local.response["retry_after"] = retry_after
+    # Sent as a header by add_retry_after_header once the error response is built
+    frappe.local.flags.sync_retry_after = retry_after
+    
+    frappe.throw(
+        _("Sync service is busy, please retry in {0} seconds").format(retry_after),
+        frappe.TooManyRequestsError
+    )
+
+
+def get_retry_after(waiting, capacity):
+    """Jittered delay whose ceiling grows with queue depth relative to capacity"""
+    ceiling = min(RETRY_AFTER_MAX, RETRY_AFTER_BASE * (1 + waiting / max(cint(capacity), 1)))
+    return int(random.uniform(RETRY_AFTER_BASE, ceiling)) + 1
+
+
+def add_retry_after_header(response=None, request=None):
+    """after_request hook: put the Retry-After hint of a rejected sync request on the response"""
+    retry_after = frappe.local.flags.sync_retry_after
+    if retry_after and response is not None:
+        response.headers["Retry-After"] = str(retry_after)
@@ -0,0 +1,103 @@
+# Smart POS - Display Names
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Display names for users, customers and items
+Names are resolved in bulk: one query per doctype for everything a request
+still needs, memoized for the rest of the request and shared across workers
+through a Redis hash per doctype. Hash entries are dropped when a record is
+updated, renamed or deleted, and the hash expires daily as a backstop.
+"""
+
+import frappe
+
+
+DISPLAY_NAME_FIELDS = {
+    "User": "full_name",
+    "Customer": "customer_name",
+    "Item": "item_name"
+}
+
+DISPLAY_NAME_TTL = 24 * 60 * 60  # seconds
+
+
+def get_display_names(doctype, names) -> dict:
+    """Map each name to its display name, falling back to the name itself"""
+    names = {name for name in names if name}
+    memo = get_request_memo(doctype)
+    missing = [name for name in names if name not in memo]
+    
+    if missing:
+        cache = frappe.cache()
+        key = get_cache_key(doctype)
+        
+        # Raw redis commands through a pipeline, the cache wrapper's hash helpers pickle values
+        pipe = cache.pipeline()
+        pipe.hmget(key, missing)
+        cached = pipe.execute()[0]
+        for name, value in zip(missing, cached, strict=True):
+            if value is not None:
+                memo[name] = value.decode() if isinstance(value, bytes) else value
+        
+        missing = [name for name in missing if name not in memo]
+        if missing:
+            field = DISPLAY_NAME_FIELDS[doctype]
+            found = dict(frappe.get_all(
+                doctype,
+                filters={"name": ["in", missing]},
+                fields=["name", field],
+                as_list=True
+            ))
+            resolved = {name: found.get(name) or name for name in missing}
+            memo.update(resolved)
+            
+            pipe = cache.pipeline()
+            pipe.hset(key, mapping=resolved)
+            pipe.expire(key, DISPLAY_NAME_TTL)
+            pipe.execute()
+    
+    return {name: memo[name] for name in names}
+
+
+def get_display_name(doctype, name):
+    if not name:
+        return name
+    return get_display_names(doctype, [name])[name]
+
+
+def set_display_names(rows, doctype, name_field, label_field):
+    """Fill label_field on every row with the display name of row[name_field]"""
+    names = get_display_names(doctype, [row.get(name_field) for row in rows])
+    for row in rows:
+        row[label_field] = names.get(row.get(name_field), row.get(name_field))
+    return rows
+
+
+def get_request_memo(doctype) -> dict:
+    if not hasattr(frappe.local, "smart_pos_display_names"):
+        frappe.local.smart_pos_display_names = {}
+    return frappe.local.smart_pos_display_names.setdefault(doctype, {})
+
+
+def get_cache_key(doctype) -> str:
+    return frappe.cache().make_key(f"smart_pos:display_names:{doctype}")
+
+
+def clear_display_names(doctype, *names):
+    names = [name for name in names if name]
+    if not names:
+        return
+    pipe = frappe.cache().pipeline()
+    pipe.hdel(get_cache_key(doctype), *names)
+    pipe.execute()
+    get_request_memo(doctype).clear()
+
+
+def on_update(doc, method=None):
+    """doc_events hook for User, Customer and Item"""
+    clear_display_names(doc.doctype, doc.name)
+
+
+def after_rename(doc, method=None, old=None, new=None, merge=False):
+    clear_display_names(doc.doctype, old, new)
@@ -0,0 +1,196 @@
+# Smart POS - Item Analytics
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+ABC classification and sales velocity per item
+Daily net quantities are loaded from the POS Item Sales Rollup one month at
+a time into an item x day NumPy matrix, and every metric is computed on the
+whole matrix at once: rolling velocities come from cumulative sums,
+percentiles and Pareto cutoffs from sorted revenue shares.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder.functions import Sum
+from frappe.utils import date_diff, flt, getdate
+
+from smart_pos.smart_pos.utils.report_jobs import split_months
+from smart_pos.smart_pos.utils.report_queries import apply_scope, get_filter_values
+
+
+# Cumulative revenue share closing each class
+ABC_CUTOFFS = (("A", 0.80), ("B", 0.95), ("C", 1.0))
+VELOCITY_WINDOWS = (7, 30, 90)
+# Rolling window for the velocity distribution of each item
+ROLLING_WINDOW = 30
+
+
+def get_numpy():
+    try:
+        import numpy
+    except ImportError:
+        frappe.throw(_("Item velocity analysis requires the numpy package"))
+    return numpy
+
+
+def load_sales_matrix(from_date, to_date, pos_profile=None, company=None):
+    """
+    Net quantity per item per day, plus net revenue per item
+    Returns (item_codes, quantities[item, day], revenue[item])
+    """
+    np = get_numpy()
+    rollup = frappe.qb.DocType("POS Item Sales Rollup")
+    codes, days, quantities, amounts = [], [], [], []
+    
+    for start, end in split_months(getdate(from_date), getdate(to_date)):
+        query = (
+            frappe.qb.from_(rollup)
+            .select(
+                rollup.item_code,
+                rollup.posting_date,
+                Sum(rollup.qty),
+                Sum(rollup.amount)
+            )
+            .where(rollup.posting_date.between(start, end))
+            .groupby(rollup.item_code, rollup.posting_date)
+        )
+        rows = apply_scope(query, rollup, pos_profile, company).run()
+        for item_code, posting_date, qty, amount in rows:
+            codes.append(item_code)
+            days.append(date_diff(posting_date, from_date))
+            quantities.append(flt(qty))
+            amounts.append(flt(amount))
+    
+    item_codes, item_index = np.unique(np.array(codes, dtype=object), return_inverse=True)
+    matrix = np.zeros((len(item_codes), date_diff(to_date, from_date) + 1), dtype=np.float32)
+    np.add.at(matrix, (item_index, np.array(days, dtype=np.int64)), np.array(quantities, dtype=np.float32))
+    revenue = np.bincount(item_index, weights=np.array(amounts), minlength=len(item_codes))
+    
+    return item_codes, matrix, revenue
+
+
+def get_stock_on_hand(item_codes, pos_profile=None, company=None):
+    """Actual quantity per item across the warehouses of the profiles in scope"""
+    np = get_numpy()
+    profile_filters = {"disabled": 0}
+    if get_filter_values(pos_profile):
+        profile_filters["name"] = ["in", get_filter_values(pos_profile)]
+    if get_filter_values(company):
+        profile_filters["company"] = ["in", get_filter_values(company)]
+    
+    warehouses = list({
+        w for w in frappe.get_all("POS Profile", filters=profile_filters, pluck="warehouse") if w
+    })
+    stock = np.zeros(len(item_codes))
+    if not warehouses or not len(item_codes):
+        return stock
+    
+    index = {code: i for i, code in enumerate(item_codes)}
+    for item_code, qty in frappe.get_all(
+        "Bin",
+        filters={"warehouse": ["in", warehouses], "item_code": ["in", list(item_codes)]},
+        fields=["item_code", "sum(actual_qty)"],
+        group_by="item_code",
+        as_list=True
+    ):
+        stock[index[item_code]] = flt(qty)
+    
+    return stock
+
+
+def analyze_items(item_codes, matrix, revenue, stock):
+    """Vectorized ABC class, velocities, velocity percentiles and days of cover per item"""
+    np = get_numpy()
+    item_count, day_count = matrix.shape
+    
+    # ABC by cumulative revenue share, the item crossing a cutoff still belongs to that class
+    order = np.argsort(-revenue, kind="stable")
+    total_revenue = revenue.sum()
+    share = np.cumsum(revenue[order]) / total_revenue if total_revenue > 0 else np.ones(item_count)
+    share_before = share - (revenue[order] / total_revenue if total_revenue > 0 else 0)
+    class_index = np.searchsorted([cutoff for label, cutoff in ABC_CUTOFFS], share_before, side="right")
+    abc = np.empty(item_count, dtype=object)
+    abc[order] = np.array([label for label, cutoff in ABC_CUTOFFS], dtype=object)[
+        np.minimum(class_index, len(ABC_CUTOFFS) - 1)
+    ]
+    
+    # Average daily quantity over the most recent windows
+    velocities = {
+        window: matrix[:, -min(window, day_count):].sum(axis=1) / min(window, day_count)
+        for window in VELOCITY_WINDOWS
+    }
+    
+    # Rolling velocity series from cumulative sums, then its distribution per item
+    window = min(ROLLING_WINDOW, day_count)
+    cumulative = np.concatenate([np.zeros((item_count, 1)), np.cumsum(matrix, axis=1, dtype=np.float64)], axis=1)
+    rolling = (cumulative[:, window:] - cumulative[:, :-window]) / window
+    velocity_p50, velocity_p90 = np.percentile(rolling, [50, 90], axis=1) if item_count else (rolling, rolling)
+    
+    # Rank of each item's 30 day velocity among all items
+    current = velocities[30]
+    velocity_rank = np.empty(item_count)
+    velocity_rank[np.argsort(current, kind="stable")] = np.arange(item_count)
+    velocity_percentile = 100 * velocity_rank / max(item_count - 1, 1)
+    
+    sold = matrix.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(current > 0, stock / current, np.nan)
+        sell_through = np.where(sold + stock > 0, sold / (sold + stock), np.nan)
+    
+    return {
+        "abc": abc,
+        "revenue": revenue,
+        "qty_sold": sold,
+        "stock": stock,
+        **{f"velocity_{window}": velocity for window, velocity in velocities.items()},
+        "velocity_p50": velocity_p50,
+        "velocity_p90": velocity_p90,
+        "velocity_percentile": velocity_percentile,
+        "days_of_cover": days_of_cover,
+        "sell_through": sell_through,
+        "order": order
+    }
+
+
+def get_pareto_summary(revenue, abc):
+    np = get_numpy()
+    item_count = len(revenue)
+    total_revenue = revenue.sum()
+    share = np.cumsum(np.sort(revenue)[::-1]) / total_revenue if total_revenue > 0 else np.zeros(item_count)
+    top_fifth = max(int(np.ceil(item_count * 0.2)), 1) if item_count else 0
+    
+    return {
+        "items": item_count,
+        "revenue": float(total_revenue),
+        "classes": {label: int((abc == label).sum()) for label, cutoff in ABC_CUTOFFS},
+        "items_for_80_percent": int(np.searchsorted(share, 0.80) + 1) if item_count else 0,
+        "items_for_95_percent": int(np.searchsorted(share, 0.95) + 1) if item_count else 0,
+        "top_20_percent_share": float(share[top_fifth - 1]) if top_fifth else 0
+    }
+
+
+def build_item_analysis(from_date, to_date, pos_profile=None, company=None, limit=500):
+    """
+    Columnar analysis result, items ordered by revenue
+    Metric columns are aligned with `items`, limited to the top `limit` items
+    """
+    np = get_numpy()
+    item_codes, matrix, revenue = load_sales_matrix(from_date, to_date, pos_profile, company)
+    stock = get_stock_on_hand(item_codes, pos_profile, company)
+    metrics = analyze_items(item_codes, matrix, revenue, stock)
+    
+    top = metrics.pop("order")[:limit] if limit else metrics.pop("order")
+    
+    def column(values):
+        values = values[top]
+        if values.dtype == object:
+            return values.tolist()
+        return [None if np.isnan(v) else round(float(v), 4) for v in values]
+    
+    return {
+        "period": {"start": str(from_date), "end": str(to_date), "days": date_diff(to_date, from_date) + 1},
+        "summary": get_pareto_summary(revenue, metrics["abc"]),
+        "items": item_codes[top].tolist(),
+        **{name: column(values) for name, values in metrics.items()}
+    }
@@ -0,0 +1,124 @@
+# Smart POS - Live Dashboard
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Running totals for today's sales, pushed to open manager dashboards
+Each POS Profile (and "*" for all profiles) has a Redis hash with today's
+invoice count, sales and returns. Submitting or cancelling an invoice
+increments it once the transaction commits and publishes the delta over
+realtime to users who can read POS Invoice, so dashboards update in place
+instead of re-running their queries.
+
+A hash is seeded from the POS Sales Rollup on first read and expires after
+LIVE_TOTALS_TTL, so any drift (an increment lost between seeding and
+writing, a Redis restart) is corrected by the next reseed.
+"""
+
+import frappe
+from frappe.utils import cint, flt, getdate, nowdate
+
+from smart_pos.smart_pos.utils.report_queries import get_filter_values, get_sales_rollup_totals
+
+
+ALL_PROFILES = "*"
+LIVE_TOTALS_EVENT = "smart_pos_live_totals"
+LIVE_TOTALS_TTL = 5 * 60  # seconds
+LIVE_FIELDS = ("invoices", "sales", "returns")
+
+# Increments only touch a hash that has been seeded, otherwise the seed would count them twice
+INCREMENT_IF_SEEDED = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'invoices', ARGV[1])
+redis.call('HINCRBYFLOAT', KEYS[1], 'sales', ARGV[2])
+redis.call('HINCRBYFLOAT', KEYS[1], 'returns', ARGV[3])
+return 1
+"""
+
+
+def get_live_totals(pos_profile=None) -> dict:
+    """Today's invoice count, sales and returns, summed over the given profiles"""
+    profiles = get_filter_values(pos_profile) or [ALL_PROFILES]
+    totals = dict.fromkeys(LIVE_FIELDS, 0)
+    for profile in profiles:
+        for field, value in get_profile_totals(profile).items():
+            totals[field] += value
+    
+    totals["net"] = totals["sales"] - totals["returns"]
+    return totals
+
+
+def get_profile_totals(profile) -> dict:
+    cache = frappe.cache()
+    key = get_live_key(profile)
+    
+    # Raw redis commands through a pipeline, the cache wrapper's hash helpers pickle values
+    pipe = cache.pipeline()
+    pipe.hgetall(key)
+    values = pipe.execute()[0]
+    if values:
+        values = {k.decode() if isinstance(k, bytes) else k: v for k, v in values.items()}
+        return {
+            "invoices": cint(values.get("invoices")),
+            "sales": flt(values.get("sales")),
+            "returns": flt(values.get("returns"))
+        }
+    
+    today = nowdate()
+    rollup = get_sales_rollup_totals(today, today, None if profile == ALL_PROFILES else profile)[0]
+    totals = {
+        "invoices": cint(rollup.invoice_count),
+        "sales": flt(rollup.sales),
+        "returns": flt(rollup.returns)
+    }
+    pipe = cache.pipeline()
+    pipe.hset(key, mapping=totals)
+    pipe.expire(key, LIVE_TOTALS_TTL)
+    pipe.execute()
+    return totals
+
+
+def update_live_totals(doc, sign=1):
+    """Apply a submitted (sign=1) or cancelled (sign=-1) invoice once its transaction commits"""
+    posting_date = getdate(doc.posting_date)
+    if posting_date != getdate(nowdate()):
+        return
+    
+    amount = abs(flt(doc.grand_total))
+    delta = {
+        "invoices": sign,
+        "sales": 0 if doc.is_return else sign * amount,
+        "returns": sign * amount if doc.is_return else 0
+    }
+    message = {
+        "date": str(posting_date),
+        "pos_profile": doc.pos_profile,
+        "pos_session": doc.pos_session,
+        "delta": delta
+    }
+    if sign > 0:
+        message["invoice"] = {
+            "name": doc.name,
+            "customer_name": doc.customer_name,
+            "posting_time": str(doc.posting_time),
+            "grand_total": doc.grand_total,
+            "custom_zatca_status": doc.get("custom_zatca_status")
+        }
+    
+    profiles = [doc.pos_profile, ALL_PROFILES] if doc.pos_profile else [ALL_PROFILES]
+    
+    def push():
+        cache = frappe.cache()
+        increment = cache.register_script(INCREMENT_IF_SEEDED)
+        for profile in profiles:
+            increment(keys=[get_live_key(profile, posting_date)], args=[delta["invoices"], delta["sales"], delta["returns"]])
+        # Only users who can read POS Invoice join this room
+        frappe.publish_realtime(LIVE_TOTALS_EVENT, message, doctype="POS Invoice")
+    
+    frappe.db.after_commit.add(push)
+
+
+def get_live_key(profile, date=None) -> str:
+    return frappe.cache().make_key(f"smart_pos:live_totals:{date or nowdate()}:{profile}")
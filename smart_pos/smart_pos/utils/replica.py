@@ -0,0 +1,99 @@
+# Smart POS - Replica Routing
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Read routing for report endpoints
+When the site has a read replica (read_from_replica and replica_host in
+site_config.json), report reads run on it through frappe.read_only, so they
+do not compete with checkout writes on the primary. Replication lag is
+checked first: if the replica is further behind than
+smart_pos_replica_max_lag seconds, or its lag cannot be read, the request
+stays on the primary. The measured lag is shared through Redis for a few
+seconds so most requests skip the check.
+
+The replica's database user needs the REPLICATION CLIENT (BINLOG MONITOR on
+MariaDB 10.5+) privilege to read its replication status.
+"""
+
+import frappe
+import functools
+
+
+DEFAULT_MAX_LAG = 30  # seconds
+LAG_CHECK_TTL = 10  # seconds
+LAG_CACHE_KEY = "smart_pos:replica_lag"
+# Cached when the lag cannot be read, so an unhealthy replica is not retried on every request
+UNKNOWN_LAG = -1
+
+
+def read_from_replica(fn):
+    """
+    Decorator for read-only report functions, applied below @frappe.whitelist()
+    and @cached_report so cache hits never open a replica connection
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not should_use_replica():
+            return fn(*args, **kwargs)
+        try:
+            return frappe.read_only()(fn)(*args, **kwargs)
+        finally:
+            # frappe.read_only swaps the primary back but leaves these set, which would
+            # stop the next call in the same process from reconnecting
+            for attr in ("replica_db", "primary_db"):
+                if hasattr(frappe.local, attr):
+                    delattr(frappe.local, attr)
+    
+    return wrapper
+
+
+def should_use_replica() -> bool:
+    if not frappe.conf.read_from_replica or not frappe.conf.replica_host:
+        return False
+    # Already routed by an outer call
+    if getattr(frappe.local, "replica_db", None) is frappe.local.db:
+        return False
+    
+    lag = get_replica_lag()
+    return lag != UNKNOWN_LAG and lag <= (frappe.conf.smart_pos_replica_max_lag or DEFAULT_MAX_LAG)
+
+
+def get_replica_lag() -> int:
+    """Seconds the replica is behind the primary, UNKNOWN_LAG if replication is not running"""
+    cache = frappe.cache()
+    lag = cache.get_value(LAG_CACHE_KEY)
+    if lag is None:
+        lag = measure_replica_lag()
+        cache.set_value(LAG_CACHE_KEY, lag, expires_in_sec=LAG_CHECK_TTL)
+    return lag
+
+
+def measure_replica_lag() -> int:
+    db = None
+    try:
+        db = connect_to_replica()
+        status = db.sql("SHOW SLAVE STATUS", as_dict=True)
+    except Exception:
+        frappe.log_error(title="Smart POS replica lag check failed")
+        return UNKNOWN_LAG
+    finally:
+        if db:
+            db.close()
+    
+    lag = status[0].get("Seconds_Behind_Master") if status else None
+    return UNKNOWN_LAG if lag is None else int(lag)
+
+
+def connect_to_replica():
+    """A separate connection using the same settings as frappe.connect_replica"""
+    from frappe.database import get_db
+    
+    conf = frappe.conf
+    user, password = conf.db_name, conf.db_password
+    if conf.different_credentials_for_replica:
+        user, password = conf.replica_db_name, conf.replica_db_password
+    
+    db = get_db(host=conf.replica_host, user=user, password=password, port=conf.replica_db_port)
+    db.connect()
+    return db
@@ -0,0 +1,106 @@
+# Smart POS - Report Cache
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Versioned cache for report results
+Every POS Profile has a data version that advances whenever one of its
+invoices is submitted or cancelled, plus an "all profiles" version for
+unfiltered reports. Cached results are keyed by endpoint, parameters and
+version, so nothing is ever invalidated explicitly: a new invoice just makes
+the next request miss.
+
+Past days change only when a back-dated invoice is submitted or cancelled,
+so their results are keyed by a separate history version and kept until
+that happens, while today's part of a range is recomputed.
+"""
+
+import frappe
+from frappe.utils import getdate, nowdate
+import functools
+import hashlib
+import inspect
+
+from smart_pos.smart_pos.utils.report_queries import get_filter_values
+
+
+ALL_PROFILES = "*"
+
+# Whole responses also carry counters that are not versioned (open sessions)
+REPORT_CACHE_TTL = 600  # seconds
+# Idle expiry for past-day results, only to bound Redis memory
+HISTORY_CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+
+
+def cached_report(fn):
+    """
+    Decorator for report endpoints, applied below @frappe.whitelist()
+    Results are cached per (endpoint, arguments, data version of pos_profile)
+    """
+    signature = inspect.signature(fn)
+    
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        
+        version = get_data_version(params.get("pos_profile"))
+        key = get_cache_key(fn.__name__, params, version, nowdate())
+        
+        cache = frappe.cache()
+        result = cache.get_value(key)
+        if result is None:
+            result = fn(*args, **kwargs)
+            cache.set_value(key, result, expires_in_sec=REPORT_CACHE_TTL)
+        return result
+    
+    return wrapper
+
+
+def get_cached_history(name, params, pos_profile, compute):
+    """
+    Cache a result that only covers past days
+    It stays valid until a back-dated invoice changes the profile's history
+    """
+    version = get_data_version(pos_profile, history=True)
+    key = get_cache_key(name, params, version)
+    
+    cache = frappe.cache()
+    result = cache.get_value(key)
+    if result is None:
+        result = compute()
+        cache.set_value(key, result, expires_in_sec=HISTORY_CACHE_TTL)
+    return result
+
+
+def get_cache_key(name, params, *parts) -> str:
+    digest = hashlib.md5(frappe.as_json(params, indent=None).encode()).hexdigest()
+    return ":".join(["smart_pos:report", name, digest, *map(str, parts)])
+
+
+def get_version_key(pos_profile, history=False) -> str:
+    """Reports over several profiles follow the all-profiles version"""
+    profiles = get_filter_values(pos_profile)
+    profile = profiles[0] if len(profiles) == 1 else ALL_PROFILES
+    kind = "history" if history else "data"
+    return frappe.cache().make_key(f"smart_pos:report_version:{kind}:{profile}")
+
+
+def get_data_version(pos_profile=None, history=False) -> int:
+    return int(frappe.cache().get(get_version_key(pos_profile, history)) or 0)
+
+
+def bump_data_version(doc):
+    """Advance the report versions an invoice belongs to, once its transaction commits"""
+    profiles = (doc.pos_profile, ALL_PROFILES) if doc.pos_profile else (ALL_PROFILES,)
+    backdated = getdate(doc.posting_date) < getdate(nowdate())
+    
+    def bump():
+        cache = frappe.cache()
+        for profile in profiles:
+            cache.incr(get_version_key(profile))
+            if backdated:
+                cache.incr(get_version_key(profile, history=True))
+    
+    frappe.db.after_commit.add(bump)
@@ -0,0 +1,73 @@
+# Smart POS - Report Export
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+File exports for report invoice lists
+Rows are written one at a time to a temporary file, which is then streamed
+back to the client, so a worker never holds the whole list in memory
+however many invoices a report covers.
+"""
+
+import frappe
+from frappe import _
+from datetime import timedelta
+import csv
+import io
+import tempfile
+
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+
+EXPORT_FORMATS = {
+    "CSV": ("text/csv", "csv"),
+    "XLSX": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx")
+}
+
+
+def build_export_response(rows, columns, filename, file_format="CSV"):
+    """Write rows (an iterator of tuples) to a file and return it as a streamed download"""
+    file_format = (file_format or "CSV").upper()
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(_("Unsupported export format: {0}").format(file_format))
+    
+    mimetype, extension = EXPORT_FORMATS[file_format]
+    output = tempfile.TemporaryFile()
+    if file_format == "XLSX":
+        write_xlsx(output, rows, columns)
+    else:
+        write_csv(output, rows, columns)
+    output.seek(0)
+    
+    response = Response(wrap_file(frappe.request.environ, output), mimetype=mimetype, direct_passthrough=True)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+def write_csv(output, rows, columns):
+    # utf-8-sig so spreadsheet apps detect Arabic text correctly
+    text = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(format_row(row))
+    text.flush()
+    text.detach()
+
+
+def write_xlsx(output, rows, columns):
+    from openpyxl import Workbook
+    
+    # Write-only workbooks flush rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(format_row(row))
+    workbook.save(output)
+
+
+def format_row(row) -> list:
+    """Posting times come back as timedeltas, which spreadsheets cannot store"""
+    return [str(value) if isinstance(value, timedelta) else value for value in row]
@@ -0,0 +1,174 @@
+# Smart POS - Report Jobs
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Background jobs for long-range reports
+A long range is split into calendar-month pieces that are enqueued as
+separate jobs, so several workers can compute them in parallel. Each piece
+stores its partial result and bumps a counter; the piece that completes the
+set merges the partials into the final result. Identical requests share one
+job; everyone who requested it may read it, progress and completion are
+pushed to all of them over realtime, and the result is kept for
+REPORT_JOB_TTL so the client can fetch it by job id.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, get_last_day, getdate, nowdate
+import hashlib
+
+from smart_pos.smart_pos.utils.replica import read_from_replica
+
+
+REPORT_JOB_EVENT = "smart_pos_report_job"
+REPORT_JOB_QUEUE = "long"
+REPORT_JOB_TTL = 24 * 60 * 60  # seconds
+REPORT_PIECE_TIMEOUT = 1500  # seconds
+
+
+def start_report_job(report, from_date, to_date, piece_method, merge_method, params, version=None):
+    """
+    Enqueue a report as per-month pieces, or join an identical job already running
+    piece_method(from_date, to_date, **params) computes one month
+    merge_method(pieces, **params) combines the month results in order
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    pieces = split_months(from_date, to_date)
+    job_id = get_job_id(report, from_date, to_date, params, version)
+    
+    add_requester(job_id)
+    meta = get_job(job_id)
+    if meta and meta.status != "Failed":
+        return get_job_status(job_id, meta)
+    
+    meta = frappe._dict({
+        "job_id": job_id,
+        "report": report,
+        "user": frappe.session.user,
+        "status": "Queued",
+        "pieces": [[str(start), str(end)] for start, end in pieces],
+        "piece_method": piece_method,
+        "merge_method": merge_method,
+        "params": params
+    })
+    save_job(meta)
+    frappe.cache().delete_key(get_job_key(job_id, "done"))
+    
+    for index in range(len(pieces)):
+        frappe.enqueue(
+            "smart_pos.smart_pos.utils.report_jobs.run_report_piece",
+            queue=REPORT_JOB_QUEUE,
+            timeout=REPORT_PIECE_TIMEOUT,
+            job_id=job_id,
+            index=index
+        )
+    
+    return get_job_status(job_id, meta)
+
+
+def run_report_piece(job_id, index):
+    """Compute one month of a report job, merging the result if it is the last piece"""
+    meta = get_job(job_id)
+    if not meta or meta.status == "Failed":
+        return
+    
+    cache = frappe.cache()
+    try:
+        start, end = meta.pieces[index]
+        piece_method = read_from_replica(frappe.get_attr(meta.piece_method))
+        result = piece_method(getdate(start), getdate(end), **meta.params)
+        cache.set_value(get_job_key(job_id, f"piece:{index}"), result, expires_in_sec=REPORT_JOB_TTL)
+        
+        done = cache.incr(cache.make_key(get_job_key(job_id, "done")))
+        cache.expire(cache.make_key(get_job_key(job_id, "done")), REPORT_JOB_TTL)
+        publish_progress(meta)
+        
+        # Exactly one piece sees the final count, and that one merges
+        if done == len(meta.pieces):
+            pieces = [cache.get_value(get_job_key(job_id, f"piece:{i}")) for i in range(len(meta.pieces))]
+            result = frappe.get_attr(meta.merge_method)(pieces, **meta.params)
+            cache.set_value(get_job_key(job_id, "result"), result, expires_in_sec=REPORT_JOB_TTL)
+            meta.status = "Completed"
+            save_job(meta)
+            publish_progress(meta)
+    
+    except Exception:
+        meta.status = "Failed"
+        meta.error = _("Report could not be generated")
+        save_job(meta)
+        publish_progress(meta)
+        frappe.log_error(title=f"Smart POS report job {meta.report} failed")
+
+
+def get_job_status(job_id, meta=None, with_result=False) -> dict:
+    meta = meta or get_job(job_id)
+    if not meta:
+        return {"job_id": job_id, "status": "Not Found"}
+    
+    done = int(frappe.cache().get(frappe.cache().make_key(get_job_key(job_id, "done"))) or 0)
+    status = {
+        "job_id": job_id,
+        "report": meta.report,
+        "status": meta.status,
+        "progress": round(100 * min(done, len(meta.pieces)) / len(meta.pieces)),
+        "error": meta.get("error")
+    }
+    if with_result and meta.status == "Completed":
+        status["result"] = frappe.cache().get_value(get_job_key(job_id, "result"))
+    return status
+
+
+def publish_progress(meta):
+    status = get_job_status(meta.job_id, meta)
+    for user in get_requesters(meta.job_id):
+        frappe.publish_realtime(REPORT_JOB_EVENT, status, user=user)
+
+
+def add_requester(job_id):
+    cache = frappe.cache()
+    key = cache.make_key(get_job_key(job_id, "users"))
+    pipe = cache.pipeline()
+    pipe.sadd(key, frappe.session.user)
+    pipe.expire(key, REPORT_JOB_TTL)
+    pipe.execute()
+
+
+def get_requesters(job_id) -> list:
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.smembers(cache.make_key(get_job_key(job_id, "users")))
+    return [user.decode() if isinstance(user, bytes) else user for user in pipe.execute()[0]]
+
+
+def is_job_requester(job_id) -> bool:
+    return frappe.session.user in get_requesters(job_id)
+
+
+def split_months(from_date, to_date) -> list:
+    """Calendar-month (start, end) pairs covering the range"""
+    pieces = []
+    start = from_date
+    while start <= to_date:
+        end = min(get_last_day(start), to_date)
+        pieces.append((start, end))
+        start = add_days(end, 1)
+    return pieces
+
+
+def get_job_id(report, from_date, to_date, params, version=None) -> str:
+    """Identical requests for the same data version share one job"""
+    key = frappe.as_json([report, str(from_date), str(to_date), params, version, nowdate()], indent=None)
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_job_key(job_id, part="meta") -> str:
+    return f"smart_pos:report_job:{job_id}:{part}"
+
+
+def get_job(job_id):
+    return frappe.cache().get_value(get_job_key(job_id))
+
+
+def save_job(meta):
+    frappe.cache().set_value(get_job_key(meta.job_id), meta, expires_in_sec=REPORT_JOB_TTL)
@@ -0,0 +1,243 @@
+# Smart POS - Report Queries
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Shared query layer for report SQL
+Report queries are built with frappe.qb, so filter values always travel as
+bound parameters and the statement text depends only on which filters are
+used, never on their values. POS Profile and Company filters accept a single
+name or a list of names (a JSON array from the client) and become IN lists.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder import Case, Order
+from frappe.query_builder.functions import Abs, Avg, Coalesce, Count, Max, Sum
+from frappe.utils import get_datetime
+import json
+
+
+def get_filter_values(value) -> list:
+    """Normalize a filter given as one name, a list, or a JSON list"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.startswith("["):
+            return [value]
+        value = json.loads(value)
+    return [v for v in value if v]
+
+
+def apply_scope(query, table, pos_profile=None, company=None):
+    """Restrict a query to the given POS Profiles and Companies"""
+    profiles = get_filter_values(pos_profile)
+    if profiles:
+        query = query.where(table.pos_profile.isin(profiles))
+    
+    companies = get_filter_values(company)
+    if companies:
+        query = query.where(table.company.isin(companies))
+    
+    return query
+
+
+def get_group_fields(group_by) -> list:
+    if not group_by:
+        return []
+    return [group_by] if isinstance(group_by, str) else list(group_by)
+
+
+def sum_when(condition, value):
+    return Coalesce(Sum(Case().when(condition, value).else_(0)), 0)
+
+
+def get_sales_rollup_totals(from_date, to_date, pos_profile=None, company=None, group_by=None):
+    """
+    Invoice counts and sales/returns totals from the POS Sales Rollup
+    group_by: optional bucket column (posting_date, hour or cashier), or a list of them
+    """
+    rollup = frappe.qb.DocType("POS Sales Rollup")
+    query = (
+        frappe.qb.from_(rollup)
+        .select(
+            Coalesce(Sum(rollup.invoice_count), 0).as_("invoice_count"),
+            sum_when(rollup.is_return == 0, rollup.invoice_count).as_("sales_count"),
+            sum_when(rollup.is_return == 1, rollup.invoice_count).as_("return_count"),
+            sum_when(rollup.is_return == 0, rollup.grand_total).as_("sales"),
+            sum_when(rollup.is_return == 1, Abs(rollup.grand_total)).as_("returns")
+        )
+        .where(rollup.posting_date.between(from_date, to_date))
+    )
+    
+    for field in get_group_fields(group_by):
+        column = rollup[field]
+        query = query.select(column).groupby(column).orderby(column)
+    
+    return apply_scope(query, rollup, pos_profile, company).run(as_dict=True)
+
+
+def get_payment_rollup_totals(from_date, to_date, pos_profile=None, company=None):
+    """Amount collected per mode of payment from the POS Payment Rollup"""
+    rollup = frappe.qb.DocType("POS Payment Rollup")
+    query = (
+        frappe.qb.from_(rollup)
+        .select(rollup.mode_of_payment, Sum(rollup.amount).as_("total"))
+        .where(rollup.posting_date.between(from_date, to_date))
+        .groupby(rollup.mode_of_payment)
+    )
+    return apply_scope(query, rollup, pos_profile, company).run(as_dict=True)
+
+
+def get_top_items(from_date, to_date, pos_profile=None, company=None, limit=20):
+    """Best selling items by quantity from the POS Item Sales Rollup, returns excluded"""
+    rollup = frappe.qb.DocType("POS Item Sales Rollup")
+    query = (
+        frappe.qb.from_(rollup)
+        .select(
+            rollup.item_code,
+            Max(rollup.item_name).as_("item_name"),
+            Sum(rollup.qty).as_("total_qty"),
+            Sum(rollup.amount).as_("total_amount"),
+            Sum(rollup.transaction_count).as_("transaction_count")
+        )
+        .where(rollup.posting_date.between(from_date, to_date))
+        .where(rollup.is_return == 0)
+        .groupby(rollup.item_code)
+        .orderby("total_qty", order=Order.desc)
+        .limit(limit)
+    )
+    return apply_scope(query, rollup, pos_profile, company).run(as_dict=True)
+
+
+def get_top_customers(from_date, to_date, pos_profile=None, company=None, limit=20):
+    """Customers by total spend over submitted sales invoices"""
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(
+            invoice.customer,
+            invoice.customer_name,
+            Count("*").as_("visit_count"),
+            Sum(invoice.grand_total).as_("total_spent"),
+            Avg(invoice.grand_total).as_("avg_basket")
+        )
+        .where(invoice.posting_date.between(from_date, to_date))
+        .where(invoice.docstatus == 1)
+        .where(invoice.is_return == 0)
+        .groupby(invoice.customer, invoice.customer_name)
+        .orderby("total_spent", order=Order.desc)
+        .limit(limit)
+    )
+    return apply_scope(query, invoice, pos_profile, company).run(as_dict=True)
+
+
+def get_customer_totals(from_date, to_date, pos_profile=None, company=None):
+    """Distinct customers and transactions over submitted invoices"""
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(
+            Count(invoice.customer).distinct().as_("unique_customers"),
+            Count("*").as_("total_transactions")
+        )
+        .where(invoice.posting_date.between(from_date, to_date))
+        .where(invoice.docstatus == 1)
+    )
+    return apply_scope(query, invoice, pos_profile, company).run(as_dict=True)[0]
+
+
+def get_customer_activity(from_date, to_date, pos_profile=None, company=None):
+    """Per-customer sales and transaction totals, mergeable across date ranges"""
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(
+            invoice.customer,
+            Max(invoice.customer_name).as_("customer_name"),
+            sum_when(invoice.is_return == 0, 1).as_("visit_count"),
+            sum_when(invoice.is_return == 0, invoice.grand_total).as_("total_spent"),
+            Count("*").as_("transaction_count")
+        )
+        .where(invoice.posting_date.between(from_date, to_date))
+        .where(invoice.docstatus == 1)
+        .groupby(invoice.customer)
+    )
+    return apply_scope(query, invoice, pos_profile, company).run(as_dict=True)
+
+
+def get_open_sessions(pos_profile=None, company=None, page_length=50, after=None):
+    """
+    Open POS Sessions, latest opened first, with the running totals invoices keep on them
+    after: the next_cursor of the previous page
+    """
+    session = frappe.qb.DocType("POS Session")
+    query = (
+        frappe.qb.from_(session)
+        .select(
+            session.name,
+            session.pos_profile,
+            session.user,
+            session.opening_time,
+            session.total_sales,
+            session.total_returns,
+            session.total_invoices
+        )
+        .where(session.status == "Open")
+    )
+    query = apply_keyset(apply_scope(query, session, pos_profile, company), session.opening_time, session.name, after)
+    return get_keyset_page(query, "opening_time", page_length)
+
+
+def get_recent_invoices(pos_profile=None, company=None, page_length=10, after=None):
+    """Submitted POS Invoices, newest first"""
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(invoice)
+        .select(
+            invoice.name,
+            invoice.creation,
+            invoice.customer_name,
+            invoice.posting_time,
+            invoice.grand_total,
+            invoice.custom_zatca_status
+        )
+        .where(invoice.docstatus == 1)
+    )
+    query = apply_keyset(apply_scope(query, invoice, pos_profile, company), invoice.creation, invoice.name, after)
+    return get_keyset_page(query, "creation", page_length)
+
+
+def apply_keyset(query, order_column, name_column, after=None):
+    """
+    Order newest first by order_column and continue after a cursor from get_keyset_page
+    Names break ties, so rows sharing a timestamp are neither skipped nor repeated
+    """
+    if after:
+        value, name = decode_keyset_cursor(after)
+        query = query.where(
+            (order_column < value) | ((order_column == value) & (name_column < name))
+        )
+    return query.orderby(order_column, order=Order.desc).orderby(name_column, order=Order.desc)
+
+
+def decode_keyset_cursor(after) -> tuple:
+    """Split a "timestamp|name" cursor, rejecting anything get_keyset_page did not issue"""
+    value, separator, name = str(after).partition("|")
+    try:
+        value = get_datetime(value) if value and separator and name else None
+    except (ValueError, OverflowError):
+        value = None
+    if not value:
+        frappe.throw(_("Invalid page cursor: {0}").format(after), frappe.ValidationError)
+    return value, name
+
+
+def get_keyset_page(query, order_field, page_length) -> tuple:
+    """Rows of one page and the cursor for the next, None on the last page"""
+    rows = query.limit(page_length + 1).run(as_dict=True)
+    if len(rows) <= page_length:
+        return rows, None
+    last = rows[page_length - 1]
+    return rows[:page_length], f"{last[order_field]}|{last.name}"
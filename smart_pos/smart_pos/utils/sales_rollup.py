@@ -0,0 +1,209 @@
+# Smart POS - Sales Rollup
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Pre-aggregated POS sales for reporting
+Submitted invoices are folded into hourly buckets keyed by
+(posting_date, hour, pos_profile, cashier, is_return) as they are submitted
+and cancelled, so reports sum a handful of rows per day instead of scanning
+every invoice. Payment modes get their own buckets with the same key.
+
+Item sales are rolled up per (posting_date, pos_profile, pos_session,
+item_code, is_return) with item_group denormalized, for top product and
+item group breakdowns over any range or session.
+
+Bucket names are an MD5 of the key, computed identically in Python and SQL,
+so incremental updates and rebuilds upsert the same rows.
+"""
+
+import frappe
+from frappe.utils import cint, flt, get_time, getdate, add_days, nowdate, now_datetime
+import hashlib
+
+
+SALES_ROLLUP = "POS Sales Rollup"
+PAYMENT_ROLLUP = "POS Payment Rollup"
+ITEM_ROLLUP = "POS Item Sales Rollup"
+
+# Rebuilds commit once per chunk to keep transactions short
+REBUILD_CHUNK_DAYS = 31
+
+
+def get_rollup_name(*key) -> str:
+    """Deterministic bucket name, matches MD5(CONCAT_WS('|', ...)) in ROLLUP_QUERIES"""
+    return hashlib.md5("|".join(str(part) for part in key).encode()).hexdigest()
+
+
+def get_bucket_key(doc) -> dict:
+    return {
+        "posting_date": getdate(doc.posting_date),
+        "hour": get_time(doc.posting_time).hour,
+        "pos_profile": doc.pos_profile or "",
+        "cashier": doc.owner,
+        "is_return": cint(doc.is_return)
+    }
+
+
+def update_sales_rollup(doc, sign=1):
+    """Add a submitted invoice to its buckets, or remove it with sign=-1 on cancel"""
+    key = get_bucket_key(doc)
+    
+    upsert_rollup(SALES_ROLLUP, key, {
+        "invoice_count": sign,
+        "grand_total": sign * flt(doc.grand_total),
+        "net_total": sign * flt(doc.net_total)
+    }, company=doc.company)
+    
+    payments = {}
+    for payment in doc.payments or []:
+        if flt(payment.amount):
+            payments[payment.mode_of_payment] = payments.get(payment.mode_of_payment, 0) + flt(payment.amount)
+    
+    for mode_of_payment, amount in payments.items():
+        upsert_rollup(PAYMENT_ROLLUP, dict(key, mode_of_payment=mode_of_payment or ""), {
+            "payment_count": sign,
+            "amount": sign * amount
+        }, company=doc.company)
+    
+    update_item_rollup(doc, sign)
+
+
+def update_item_rollup(doc, sign=1):
+    items = {}
+    for item in doc.items or []:
+        row = items.setdefault(item.item_code, frappe._dict(
+            qty=0, amount=0, item_name=item.item_name, item_group=item.item_group
+        ))
+        row.qty += flt(item.qty)
+        row.amount += flt(item.amount)
+    
+    for item_code, row in items.items():
+        key = {
+            "posting_date": getdate(doc.posting_date),
+            "pos_profile": doc.pos_profile or "",
+            "pos_session": doc.pos_session or "",
+            "item_code": item_code,
+            "is_return": cint(doc.is_return)
+        }
+        upsert_rollup(ITEM_ROLLUP, key, {
+            "qty": sign * row.qty,
+            "amount": sign * row.amount,
+            "transaction_count": sign
+        }, company=doc.company, item_name=row.item_name, item_group=row.item_group)
+
+
+def upsert_rollup(doctype, key, totals, **extra):
+    """Insert a bucket or add totals to the existing one in a single statement"""
+    now = now_datetime()
+    values = {
+        "name": get_rollup_name(*key.values()),
+        "creation": now,
+        "modified": now,
+        "modified_by": frappe.session.user,
+        "owner": frappe.session.user,
+        **key,
+        **extra,
+        **totals
+    }
+    
+    columns = ", ".join(f"`{column}`" for column in values)
+    placeholders = ", ".join(f"%({column})s" for column in values)
+    updates = ", ".join(f"`{column}` = `{column}` + VALUES(`{column}`)" for column in totals)
+    
+    frappe.db.sql(f"""
+        INSERT INTO `tab{doctype}` ({columns})
+        VALUES ({placeholders})
+        ON DUPLICATE KEY UPDATE {updates}, `modified` = VALUES(`modified`)
+    """, values)
+
+
+def rebuild_sales_rollup(from_date=None, to_date=None, doctypes=None):
+    """
+    Recompute rollup buckets from POS Invoices, one chunk of days at a time
+    Without dates the whole invoice history is rebuilt
+    doctypes: rollups to rebuild, all of them by default
+    """
+    if not from_date:
+        from_date = frappe.db.sql("""
+            SELECT MIN(posting_date) FROM `tabPOS Invoice` WHERE docstatus = 1
+        """)[0][0]
+        if not from_date:
+            return
+    
+    start = getdate(from_date)
+    end_date = getdate(to_date or nowdate())
+    
+    while start <= end_date:
+        end = min(add_days(start, REBUILD_CHUNK_DAYS - 1), end_date)
+        rebuild_rollup_range(start, end, doctypes or ROLLUP_QUERIES)
+        frappe.db.commit()
+        start = add_days(end, 1)
+
+
+def rebuild_rollup_range(from_date, to_date, doctypes):
+    values = {"from_date": from_date, "to_date": to_date, "user": frappe.session.user}
+    
+    for doctype in doctypes:
+        frappe.db.sql(f"""
+            DELETE FROM `tab{doctype}` WHERE posting_date BETWEEN %(from_date)s AND %(to_date)s
+        """, values)
+        frappe.db.sql(ROLLUP_QUERIES[doctype], values)
+
+
+ROLLUP_QUERIES = {
+    SALES_ROLLUP: """
+        INSERT INTO `tabPOS Sales Rollup`
+            (name, creation, modified, modified_by, owner,
+             posting_date, hour, pos_profile, cashier, is_return, company,
+             invoice_count, grand_total, net_total)
+        SELECT
+            MD5(CONCAT_WS('|', posting_date, HOUR(posting_time), IFNULL(pos_profile, ''), owner, is_return)),
+            NOW(), NOW(), %(user)s, %(user)s,
+            posting_date, HOUR(posting_time), IFNULL(pos_profile, ''), owner, is_return, MAX(company),
+            COUNT(*), SUM(grand_total), SUM(net_total)
+        FROM `tabPOS Invoice`
+        WHERE posting_date BETWEEN %(from_date)s AND %(to_date)s AND docstatus = 1
+        GROUP BY posting_date, HOUR(posting_time), IFNULL(pos_profile, ''), owner, is_return
+    """,
+    PAYMENT_ROLLUP: """
+        INSERT INTO `tabPOS Payment Rollup`
+            (name, creation, modified, modified_by, owner,
+             posting_date, hour, pos_profile, cashier, is_return, mode_of_payment, company,
+             payment_count, amount)
+        SELECT
+            MD5(CONCAT_WS('|', pi.posting_date, HOUR(pi.posting_time), IFNULL(pi.pos_profile, ''),
+                pi.owner, pi.is_return, IFNULL(sip.mode_of_payment, ''))),
+            NOW(), NOW(), %(user)s, %(user)s,
+            pi.posting_date, HOUR(pi.posting_time), IFNULL(pi.pos_profile, ''), pi.owner, pi.is_return,
+            IFNULL(sip.mode_of_payment, ''), MAX(pi.company),
+            COUNT(DISTINCT pi.name), SUM(sip.amount)
+        FROM `tabSales Invoice Payment` sip
+        JOIN `tabPOS Invoice` pi ON pi.name = sip.parent
+        WHERE sip.parenttype = 'POS Invoice'
+            AND pi.posting_date BETWEEN %(from_date)s AND %(to_date)s
+            AND pi.docstatus = 1
+            AND sip.amount != 0
+        GROUP BY pi.posting_date, HOUR(pi.posting_time), IFNULL(pi.pos_profile, ''), pi.owner,
+            pi.is_return, IFNULL(sip.mode_of_payment, '')
+    """,
+    ITEM_ROLLUP: """
+        INSERT INTO `tabPOS Item Sales Rollup`
+            (name, creation, modified, modified_by, owner,
+             posting_date, pos_profile, pos_session, item_code, is_return,
+             company, item_name, item_group,
+             qty, amount, transaction_count)
+        SELECT
+            MD5(CONCAT_WS('|', pi.posting_date, IFNULL(pi.pos_profile, ''), IFNULL(pi.pos_session, ''),
+                item.item_code, pi.is_return)),
+            NOW(), NOW(), %(user)s, %(user)s,
+            pi.posting_date, IFNULL(pi.pos_profile, ''), IFNULL(pi.pos_session, ''), item.item_code, pi.is_return,
+            MAX(pi.company), MAX(item.item_name), MAX(item.item_group),
+            SUM(item.qty), SUM(item.amount), COUNT(DISTINCT pi.name)
+        FROM `tabPOS Invoice Item` item
+        JOIN `tabPOS Invoice` pi ON pi.name = item.parent
+        WHERE pi.posting_date BETWEEN %(from_date)s AND %(to_date)s AND pi.docstatus = 1
+        GROUP BY pi.posting_date, IFNULL(pi.pos_profile, ''), IFNULL(pi.pos_session, ''),
+            item.item_code, pi.is_return
+    """
+}
@@ -0,0 +1,108 @@
+# Smart POS - Compact Sync Protocol
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Compact upload format for offline sync
+
+A batch is newline-delimited JSON, normally gzip-compressed. The first line is
+a header declaring the protocol version and a field dictionary per table:
+
+    {"v": 1, "fields": {"invoice": [...], "item": [...], "payment": [...], "tax": [...], "customer": [...]}}
+
+Every following line is one record whose values are positional against the
+header, so field names are sent once per batch instead of once per row:
+
+    ["i", [invoice values], [[item values], ...], [[payment values], ...], [[tax values], ...]]
+    ["c", [customer values]]
+"""
+
+import frappe
+from frappe import _
+import gzip
+import io
+import json
+
+
+PROTOCOL_VERSION = 1
+CONTENT_TYPE = "application/x-smart-pos-sync"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Decoded size ceiling, guards against decompression bombs
+MAX_DECODED_BYTES = 64 * 1024 * 1024
+
+INVOICE_TABLES = (("items", "item"), ("payments", "payment"), ("taxes", "tax"))
+
+
+def open_payload(body: bytes):
+    """Wrap a request body in a line reader, decompressing gzip on the fly"""
+    stream = io.BytesIO(body)
+    if body[:2] == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+def iter_records(body: bytes):
+    """
+    Decode a compact batch one record at a time
+    Yields (record_type, record) with record_type 'invoice' or 'customer'
+    """
+    stream = open_payload(body)
+    decoded_bytes = 0
+    fields = None
+    
+    while True:
+        # Bounded, so a body without newlines stops decompressing at the limit
+        line = stream.readline(MAX_DECODED_BYTES - decoded_bytes + 1)
+        if not line:
+            break
+        decoded_bytes += len(line)
+        if decoded_bytes > MAX_DECODED_BYTES:
+            frappe.throw(_("Sync batch is too large"))
+        
+        line = line.strip()
+        if not line:
+            continue
+        
+        if fields is None:
+            header = json.loads(line)
+            if header.get("v") != PROTOCOL_VERSION:
+                frappe.throw(_("Unsupported sync protocol version: {0}").format(header.get("v")))
+            fields = header.get("fields") or {}
+            continue
+        
+        record = json.loads(line)
+        kind = record[0]
+        
+        if kind == "i":
+            invoice = unpack_row(fields.get("invoice"), record[1])
+            for index, (table, dictionary) in enumerate(INVOICE_TABLES, start=2):
+                rows = record[index] if len(record) > index else []
+                invoice[table] = [unpack_row(fields.get(dictionary), row) for row in rows or []]
+            yield "invoice", invoice
+        
+        elif kind == "c":
+            yield "customer", unpack_row(fields.get("customer"), record[1])
+        
+        else:
+            frappe.throw(_("Unknown sync record type: {0}").format(kind))
+
+
+def unpack_row(field_names, values) -> dict:
+    """Map positional values back to field names, dropping empty values"""
+    if not field_names:
+        return {}
+    values = values or []
+    if len(values) != len(field_names):
+        frappe.throw(
+            _("Sync row has {0} values for {1} fields").format(len(values), len(field_names)),
+            frappe.ValidationError
+        )
+    return frappe._dict(
+        (field, value) for field, value in zip(field_names, values, strict=True) if value is not None
+    )
+
+
+def build_ack(acks, errors) -> dict:
+    """Compact acknowledgement: [offline_id, server_name] and [offline_id, error] pairs"""
+    return {"v": PROTOCOL_VERSION, "ack": acks, "err": errors}
@@ -0,0 +1,64 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from unittest.mock import patch
+
+from smart_pos.smart_pos.utils import replica
+
+
+def current_connection():
+    return frappe.local.db
+
+
+class TestReplicaRouting(FrappeTestCase):
+    """
+    Routing checks against a replica connection
+    Point smart_pos_test_replica_host/port in site_config.json at a second local
+    MariaDB instance replicating this site; by default the primary server is
+    reused as the replica, which exercises the connection switch but not lag.
+    """
+    
+    def setUp(self):
+        frappe.cache().delete_value(replica.LAG_CACHE_KEY)
+        conf = frappe.conf
+        self.replica_conf = {
+            "read_from_replica": 1,
+            "replica_host": conf.smart_pos_test_replica_host or conf.db_host or "127.0.0.1",
+            "replica_db_port": conf.smart_pos_test_replica_port or conf.db_port,
+            "smart_pos_replica_max_lag": 30
+        }
+    
+    def tearDown(self):
+        frappe.cache().delete_value(replica.LAG_CACHE_KEY)
+    
+    def run_routed(self, lag):
+        primary = frappe.local.db
+        with patch.dict(frappe.local.conf, self.replica_conf), \
+                patch.object(replica, "measure_replica_lag", return_value=lag):
+            used = replica.read_from_replica(current_connection)()
+        self.assertIs(frappe.local.db, primary)
+        return used, primary
+    
+    def test_fresh_replica_serves_reads(self):
+        """Test that reads move to the replica connection while it is within the lag threshold"""
+        used, primary = self.run_routed(lag=2)
+        self.assertIsNot(used, primary)
+    
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Test that reads stay on the primary once the replica is too far behind"""
+        used, primary = self.run_routed(lag=120)
+        self.assertIs(used, primary)
+    
+    def test_stopped_replication_falls_back_to_primary(self):
+        """Test that reads stay on the primary when replication status cannot be read"""
+        used, primary = self.run_routed(lag=replica.UNKNOWN_LAG)
+        self.assertIs(used, primary)
+    
+    def test_lag_is_measured_once_per_interval(self):
+        """Test that the lag check is shared between requests through the cache"""
+        with patch.object(replica, "measure_replica_lag", return_value=2) as measure:
+            replica.get_replica_lag()
+            replica.get_replica_lag()
+        self.assertEqual(measure.call_count, 1)
@@ -0,0 +1,209 @@
+# Copyright (c) 2026, Ahmad and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import nowdate
+from unittest.mock import patch
+import threading
+import time
+
+from smart_pos.smart_pos.utils import zatca_signing
+
+
+STUB_SIGNER = "smart_pos.smart_pos.utils.test_zatca_signing.stub_zatca_call_pos"
+TEST_INVOICE_COUNT = 10
+
+signed = []
+in_flight = []
+overlaps = []
+in_flight_lock = threading.Lock()
+lock_taken = []
+
+
+def stub_zatca_call_pos(invoice_name):
+    """Local stand-in for zatca_erpgulf's zatca_call_pos"""
+    signed.append(invoice_name)
+    frappe.db.set_value("POS Invoice", invoice_name, "custom_zatca_status", "REPORTED")
+
+
+def slow_zatca_call_pos(invoice_name):
+    """Stub signer that records any other signer running at the same time"""
+    with in_flight_lock:
+        if in_flight:
+            overlaps.append(invoice_name)
+        in_flight.append(invoice_name)
+    time.sleep(0.05)
+    stub_zatca_call_pos(invoice_name)
+    with in_flight_lock:
+        in_flight.remove(invoice_name)
+
+
+def lock_checking_zatca_call_pos(invoice_name):
+    """Stub signer that outlasts the lock timeout, then checks whether the lock was taken"""
+    time.sleep(1.5)
+    lock = frappe.cache().lock(zatca_signing.get_signing_lock_key("_Test Company"), timeout=1, blocking_timeout=0)
+    lock_taken.append(lock.acquire())
+    stub_zatca_call_pos(invoice_name)
+
+
+def run_in_thread(site, method, *args, **kwargs):
+    """Run method on its own site connection, as a separate worker would"""
+    def target():
+        frappe.init(site=site)
+        frappe.connect()
+        try:
+            method(*args, **kwargs)
+        finally:
+            frappe.destroy()
+    
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def run_now(method, queue=None, timeout=None, **kwargs):
+    """frappe.enqueue replacement that runs the job inline"""
+    return frappe.get_attr(method)(**kwargs)
+
+
+class TestZATCASigning(FrappeTestCase):
+    """Batch signing against a stub signer, with lanes run inline"""
+    
+    def setUp(self):
+        if not frappe.db.has_column("POS Invoice", "custom_zatca_status"):
+            self.skipTest("ZATCA custom fields are not installed")
+        
+        signed.clear()
+        overlaps.clear()
+        lock_taken.clear()
+        self.invoices = [f"_T-ZATCA-{n:03d}" for n in range(TEST_INVOICE_COUNT)]
+        frappe.db.delete("POS Invoice", {"name": ["in", self.invoices]})
+        frappe.db.bulk_insert(
+            "POS Invoice", ["name", "posting_date", "company", "docstatus", "grand_total", "custom_zatca_status"],
+            [(name, nowdate(), "_Test Company", 1, 115, "Not Submitted") for name in self.invoices]
+        )
+        frappe.db.commit()
+        
+        conf = patch.dict(frappe.local.conf, {"smart_pos_zatca_signer": STUB_SIGNER})
+        conf.start()
+        self.addCleanup(conf.stop)
+    
+    def tearDown(self):
+        frappe.db.delete("POS Invoice", {"name": ["in", self.invoices]})
+        frappe.db.commit()
+    
+    def test_batch_signs_every_invoice_once(self):
+        """Test that a batch reports each distinct invoice exactly once"""
+        with patch.object(frappe, "enqueue", run_now):
+            status = zatca_signing.start_batch_signing(self.invoices + self.invoices[:3])
+        
+        status = zatca_signing.get_batch_status(status["batch_id"])
+        self.assertEqual(status["status"], "Completed")
+        self.assertEqual(status["success"], TEST_INVOICE_COUNT)
+        self.assertEqual(sorted(signed), self.invoices)
+    
+    def test_resume_requeues_in_flight_invoice(self):
+        """Test that resuming an interrupted batch finishes it without signing anything twice"""
+        with patch.object(frappe, "enqueue"):
+            batch_id = zatca_signing.start_batch_signing(self.invoices)["batch_id"]
+        
+        # A lane took the first invoice and its worker died before finishing it
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        pipe.lpop(zatca_signing.get_batch_key(batch_id, "pending"))
+        pipe.hset(zatca_signing.get_batch_key(batch_id), "lane:0:0", self.invoices[0])
+        pipe.execute()
+        
+        with patch.object(frappe, "enqueue", run_now):
+            zatca_signing.resume_batch(batch_id)
+        
+        status = zatca_signing.get_batch_status(batch_id)
+        self.assertEqual(status["status"], "Completed")
+        self.assertEqual(status["done"], TEST_INVOICE_COUNT)
+        self.assertEqual(sorted(signed), self.invoices)
+    
+    def test_superseded_lane_stops(self):
+        """Test that lanes of an older generation stop once a batch is resumed"""
+        with patch.object(frappe, "enqueue"):
+            batch_id = zatca_signing.start_batch_signing(self.invoices)["batch_id"]
+            zatca_signing.resume_batch(batch_id)
+        
+        zatca_signing.run_signing_lane(batch_id, lane=0, generation=0)
+        self.assertEqual(signed, [])
+    
+    def test_parallel_lanes_sign_one_at_a_time_per_company(self):
+        """Test that two lanes running together for one company never sign concurrently"""
+        with patch.object(frappe, "enqueue"):
+            batch_id = zatca_signing.start_batch_signing(self.invoices)["batch_id"]
+        
+        # Patched on the module, so the lanes' own site connections use the stub too
+        with patch.object(zatca_signing, "get_zatca_signer", return_value=slow_zatca_call_pos):
+            lanes = [
+                run_in_thread(frappe.local.site, zatca_signing.run_signing_lane, batch_id, lane=lane)
+                for lane in range(2)
+            ]
+            for lane in lanes:
+                lane.join()
+        
+        self.assertEqual(overlaps, [])
+        self.assertEqual(sorted(signed), self.invoices)
+        self.assertEqual(zatca_signing.get_batch_status(batch_id)["status"], "Completed")
+    
+    def test_concurrent_signers_report_an_invoice_once(self):
+        """Test that an invoice two workers try to sign at once is reported only once"""
+        with patch.object(zatca_signing, "get_zatca_signer", return_value=slow_zatca_call_pos):
+            workers = [
+                run_in_thread(frappe.local.site, zatca_signing.sign_invoice, self.invoices[0])
+                for _ in range(2)
+            ]
+            for worker in workers:
+                worker.join()
+        
+        self.assertEqual(signed, [self.invoices[0]])
+    
+    def test_rate_limit_holds_calls_over_the_limit(self):
+        """Test that calls beyond the per-company limit wait for the next window"""
+        with patch.object(zatca_signing, "ZATCA_RATE_LIMIT", 2), \
+                patch.object(zatca_signing.time, "sleep", wraps=zatca_signing.time.sleep) as sleep:
+            # Five quick calls cannot fit in the two windows they could straddle
+            for _ in range(5):
+                zatca_signing.wait_for_rate_limit("_Test Rate Limit Company")
+        
+        self.assertTrue(sleep.called)
+    
+    def test_busy_lock_requeues_invoice(self):
+        """Test that an invoice whose company lock is held elsewhere is retried, not counted as an error"""
+        held = frappe.cache().lock(
+            zatca_signing.get_signing_lock_key("_Test Company"), timeout=30, blocking_timeout=0
+        )
+        self.assertTrue(held.acquire())
+        results = []
+        sign_invoice = zatca_signing.sign_invoice
+        
+        def sign_then_release(invoice_name):
+            result = sign_invoice(invoice_name)
+            results.append(result["status"])
+            if held.owned():
+                held.release()
+            return result
+        
+        with patch.object(frappe, "enqueue", run_now), \
+                patch.object(zatca_signing, "ZATCA_SIGN_LOCK_WAIT", 0.1), \
+                patch.object(zatca_signing, "sign_invoice", sign_then_release):
+            batch_id = zatca_signing.start_batch_signing(self.invoices)["batch_id"]
+        
+        status = zatca_signing.get_batch_status(batch_id)
+        self.assertEqual(results[0], "busy")
+        self.assertEqual(status["status"], "Completed")
+        self.assertEqual(status["errors"], 0)
+        self.assertEqual(sorted(signed), self.invoices)
+    
+    def test_lock_outlives_slow_signer(self):
+        """Test that the company lock is renewed while a signer runs past its timeout"""
+        with patch.object(zatca_signing, "ZATCA_SIGN_LOCK_TIMEOUT", 1), \
+                patch.object(zatca_signing, "get_zatca_signer", return_value=lock_checking_zatca_call_pos):
+            result = zatca_signing.sign_invoice(self.invoices[0])
+        
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(lock_taken, [False])
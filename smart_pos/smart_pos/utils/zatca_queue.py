@@ -0,0 +1,216 @@
+# Smart POS - ZATCA Reporting Queue
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Post-submit ZATCA reporting, kept out of checkout
+Submitting an invoice of a ZATCA-enabled company adds a POS ZATCA Queue row
+in the same transaction, so a committed invoice always has its queue entry.
+A background job drains due rows in batches, claiming them with SKIP LOCKED
+so several workers never report the same invoice, and retries failures with
+exponential backoff until MAX_REPORT_ATTEMPTS, after which the row is parked
+as Dead Letter. The job is started after each submit and every minute by the
+scheduler; a job id keeps at most one drain queued at a time.
+
+Reporting goes through zatca_signing.sign_invoice, which holds the company's
+signing lock shared with batch lanes, and marks the queue row Reported when
+an invoice is signed by a batch or on its own. A row that could not get the
+lock goes back to Pending without using up an attempt.
+"""
+
+import frappe
+from frappe.query_builder import Order
+from frappe.utils import add_to_date, now_datetime
+
+from smart_pos.smart_pos.doctype.pos_sync_log.pos_sync_log import get_retry_delay
+from smart_pos.smart_pos.utils.zatca_signing import SIGNED_STATUSES, sign_invoice
+
+
+ZATCA_QUEUE = "POS ZATCA Queue"
+UNREPORTED_STATUSES = ("Pending", "Processing", "Failed", "Dead Letter")
+DUE_STATUSES = ("Pending", "Failed")
+
+ZATCA_QUEUE_JOB_ID = "smart_pos_zatca_queue"
+ZATCA_QUEUE_BATCH_SIZE = 50
+MAX_REPORT_ATTEMPTS = 10
+# A row left Processing this long belongs to a worker that died
+PROCESSING_TIMEOUT = 15 * 60  # seconds
+# Wait before retrying a row whose company was being signed by someone else
+BUSY_RETRY_DELAY = 60  # seconds
+
+
+def is_zatca_company(company) -> bool:
+    if not company or "zatca_erpgulf" not in frappe.get_installed_apps():
+        return False
+    return bool(frappe.get_cached_value("Company", company, "custom_basic_auth_from_production"))
+
+
+def queue_zatca_report(doc):
+    """Add a submitted invoice to the reporting queue, inside its submit transaction"""
+    if not is_zatca_company(doc.company):
+        return
+    
+    now = now_datetime()
+    frappe.get_doc({
+        "doctype": ZATCA_QUEUE,
+        "name": doc.name,
+        "invoice": doc.name,
+        "company": doc.company,
+        "pos_profile": doc.pos_profile,
+        "pos_session": doc.pos_session,
+        "status": "Pending",
+        "next_attempt_at": now,
+        "creation": now,
+        "modified": now,
+        "owner": frappe.session.user,
+        "modified_by": frappe.session.user
+    }).db_insert(ignore_if_duplicate=True)
+    
+    start_zatca_queue()
+
+
+def remove_from_zatca_queue(doc):
+    """A cancelled invoice is no longer reported"""
+    frappe.db.delete(ZATCA_QUEUE, {"name": doc.name, "status": ["!=", "Reported"]})
+
+
+def start_zatca_queue():
+    """Start a drain once the current transaction commits, unless one is already queued"""
+    frappe.enqueue(
+        "smart_pos.smart_pos.utils.zatca_queue.process_zatca_queue",
+        queue="long",
+        job_id=ZATCA_QUEUE_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=True
+    )
+
+
+def process_zatca_queue():
+    """Report due invoices until none are left"""
+    release_stale_rows()
+    while True:
+        names = claim_due_rows(ZATCA_QUEUE_BATCH_SIZE)
+        if not names:
+            return
+        for name in names:
+            report_queue_row(name)
+
+
+def claim_due_rows(limit) -> list:
+    """Mark the next due rows Processing; rows claimed by another worker are skipped"""
+    queue = frappe.qb.DocType(ZATCA_QUEUE)
+    now = now_datetime()
+    names = (
+        frappe.qb.from_(queue)
+        .select(queue.name)
+        .where(queue.status.isin(DUE_STATUSES))
+        .where(queue.next_attempt_at <= now)
+        .orderby(queue.next_attempt_at, order=Order.asc)
+        .limit(limit)
+        .for_update(skip_locked=True)
+    ).run(pluck=True)
+    
+    if names:
+        (
+            frappe.qb.update(queue)
+            .set(queue.status, "Processing")
+            .set(queue.last_attempt, now)
+            .set(queue.attempt_count, queue.attempt_count + 1)
+            .where(queue.name.isin(names))
+        ).run()
+    frappe.db.commit()
+    return names
+
+
+def release_stale_rows():
+    """Hand rows of dead workers back to the queue"""
+    queue = frappe.qb.DocType(ZATCA_QUEUE)
+    (
+        frappe.qb.update(queue)
+        .set(queue.status, "Failed")
+        .set(queue.next_attempt_at, now_datetime())
+        .where(queue.status == "Processing")
+        .where(queue.last_attempt < add_to_date(now_datetime(), seconds=-PROCESSING_TIMEOUT))
+    ).run()
+    frappe.db.commit()
+
+
+def report_queue_row(name):
+    row = frappe.db.get_value(ZATCA_QUEUE, name, ["invoice", "attempt_count", "last_attempt"], as_dict=True)
+    result = sign_invoice(row.invoice)
+    zatca_status = result.get("zatca_status")
+    
+    if result["status"] in ("success", "already_signed") and zatca_status in SIGNED_STATUSES:
+        values = {
+            "status": "Reported",
+            "zatca_status": zatca_status,
+            "reported_at": now_datetime(),
+            "next_attempt_at": None,
+            "error_message": None
+        }
+    elif result["status"] == "busy":
+        # Nothing was sent to ZATCA, so the claim does not count as an attempt
+        values = {
+            "status": "Pending",
+            "attempt_count": row.attempt_count - 1,
+            "next_attempt_at": add_to_date(now_datetime(), seconds=BUSY_RETRY_DELAY)
+        }
+    elif row.attempt_count < MAX_REPORT_ATTEMPTS:
+        values = {
+            "status": "Failed",
+            "zatca_status": zatca_status,
+            "next_attempt_at": add_to_date(row.last_attempt, seconds=get_retry_delay(row.attempt_count)),
+            "error_message": result.get("message") or zatca_status
+        }
+    else:
+        # Exhausted retries are parked for manual review
+        values = {
+            "status": "Dead Letter",
+            "zatca_status": zatca_status,
+            "next_attempt_at": None,
+            "error_message": result.get("message") or zatca_status
+        }
+    
+    frappe.db.set_value(ZATCA_QUEUE, name, values)
+    frappe.db.commit()
+
+
+def mark_reported(invoice_name, zatca_status):
+    """Close the queue row of an invoice that was just signed, in the signer's transaction"""
+    queue = frappe.qb.DocType(ZATCA_QUEUE)
+    (
+        frappe.qb.update(queue)
+        .set(queue.status, "Reported")
+        .set(queue.zatca_status, zatca_status)
+        .set(queue.reported_at, now_datetime())
+        .set(queue.next_attempt_at, None)
+        .set(queue.error_message, None)
+        .where(queue.name == invoice_name)
+        .where(queue.status != "Reported")
+    ).run()
+
+
+def get_unreported_invoices(session_id=None, limit=100) -> list:
+    """Invoices waiting for ZATCA, newest first, read from the queue's status index"""
+    queue = frappe.qb.DocType(ZATCA_QUEUE)
+    invoice = frappe.qb.DocType("POS Invoice")
+    query = (
+        frappe.qb.from_(queue)
+        .join(invoice).on(invoice.name == queue.invoice)
+        .select(
+            invoice.name,
+            invoice.posting_date,
+            invoice.customer,
+            invoice.grand_total,
+            invoice.custom_zatca_status,
+            queue.status.as_("queue_status"),
+            queue.attempt_count,
+            queue.error_message
+        )
+        .where(queue.status.isin(UNREPORTED_STATUSES))
+        .orderby(queue.creation, order=Order.desc)
+        .limit(limit)
+    )
+    if session_id:
+        query = query.where(queue.pos_session == session_id)
+    return query.run(as_dict=True)
@@ -0,0 +1,359 @@
+# Smart POS - ZATCA Signing
+# Copyright (c) 2026, Ahmad
+# License: MIT
+
+"""
+Background ZATCA signing for batches of POS Invoices
+A batch is a Redis list of pending invoice names drained by up to
+ZATCA_BATCH_LANES background jobs in parallel. Calls to ZATCA are rate
+limited per company across all lanes and workers, progress is published to
+the user who started the batch, and counters live in a Redis hash next to
+the list.
+
+Each lane records the invoice it is working on. If a lane dies, the batch
+stops making progress; resume_stale_batches (scheduled) puts in-flight
+invoices back on the list and starts a new generation of lanes, and lanes
+of an older generation stop at their next invoice. Invoices that ZATCA
+already accepted are skipped, so resuming never reports one twice.
+
+zatca_erpgulf reads and rewrites the Company's previous invoice hash and
+ICV counter for every invoice it signs, so only one signer per company may
+run at a time. sign_invoice holds a Redis lock per company around the
+signer, shared by batch lanes, the reporting queue and single signing, and
+re-checks the invoice's status while holding it. The lock is renewed while
+the signer runs, so a slow ZATCA call cannot outlive it. A signer that
+cannot get the lock in time reports the invoice as busy; lanes and the queue
+put it back for later instead of counting a failure. Signing an invoice closes
+its reporting queue row in the same transaction, so the queue never sends it
+again.
+
+The signer is zatca_erpgulf's zatca_call_pos; a site can point
+smart_pos_zatca_signer in site_config.json at a local stub for testing.
+"""
+
+import frappe
+from frappe import _
+from contextlib import contextmanager
+from redis.exceptions import LockError
+import threading
+import time
+
+
+ZATCA_SIGNER = "zatca_erpgulf.zatca_erpgulf.pos_sign.zatca_call_pos"
+SIGNED_STATUSES = ("REPORTED", "CLEARED")
+
+ZATCA_BATCH_EVENT = "smart_pos_zatca_batch"
+ZATCA_BATCH_QUEUE = "long"
+ZATCA_BATCH_LANES = 4
+ZATCA_LANE_TIMEOUT = 4 * 60 * 60  # seconds
+ZATCA_BATCH_TTL = 3 * 24 * 60 * 60  # seconds
+# A running batch without progress for this long is resumed by the scheduler
+ZATCA_STALE_AFTER = 10 * 60  # seconds
+PROGRESS_EVERY = 25  # invoices
+
+# ZATCA calls per second per company, shared by every lane and worker
+ZATCA_RATE_LIMIT = 5
+
+# One signer per company; the timeout frees the lock of a worker that died,
+# a live holder renews it every third of the timeout
+ZATCA_SIGN_LOCK_TIMEOUT = 120  # seconds
+ZATCA_SIGN_LOCK_WAIT = 60  # seconds
+
+BATCH_COUNTERS = ("total", "done", "success", "errors", "skipped", "generation", "heartbeat")
+
+
+def get_zatca_signer():
+    try:
+        return frappe.get_attr(frappe.conf.smart_pos_zatca_signer or ZATCA_SIGNER)
+    except (ImportError, AttributeError):
+        frappe.throw(_("ZATCA signing requires the zatca_erpgulf app"))
+
+
+def sign_invoice(invoice_name) -> dict:
+    """Sign and report one invoice, reading only the columns it needs"""
+    try:
+        invoice = frappe.db.get_value(
+            "POS Invoice", invoice_name, ["docstatus", "company", "custom_zatca_status"], as_dict=True
+        )
+        if not invoice:
+            return {"invoice": invoice_name, "status": "error", "message": _("Invoice not found")}
+        if invoice.docstatus != 1:
+            return {"invoice": invoice_name, "status": "error",
+                    "message": _("Invoice must be submitted before ZATCA signing")}
+        if invoice.custom_zatca_status in SIGNED_STATUSES:
+            return {"invoice": invoice_name, "status": "already_signed", "zatca_status": invoice.custom_zatca_status}
+        
+        with company_signing_lock(invoice.company) as acquired:
+            if not acquired:
+                return {"invoice": invoice_name, "status": "busy",
+                        "message": _("ZATCA signing for {0} is busy, please retry shortly").format(invoice.company)}
+            
+            # Another signer may have reported it while this one waited
+            zatca_status = frappe.db.get_value("POS Invoice", invoice_name, "custom_zatca_status")
+            if zatca_status in SIGNED_STATUSES:
+                return {"invoice": invoice_name, "status": "already_signed", "zatca_status": zatca_status}
+            
+            wait_for_rate_limit(invoice.company)
+            get_zatca_signer()(invoice_name)
+            zatca_status = frappe.db.get_value("POS Invoice", invoice_name, "custom_zatca_status")
+            if zatca_status in SIGNED_STATUSES:
+                # Imported here, zatca_queue imports this module
+                from smart_pos.smart_pos.utils.zatca_queue import mark_reported
+                mark_reported(invoice_name, zatca_status)
+            # The next holder must see this invoice's status and the Company's new hash
+            frappe.db.commit()
+        
+        return {"invoice": invoice_name, "status": "success", "zatca_status": zatca_status}
+    
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title=f"ZATCA signing error for {invoice_name}")
+        return {"invoice": invoice_name, "status": "error", "message": str(e)}
+
+
+@contextmanager
+def company_signing_lock(company):
+    """
+    Hold the company's signing lock, waiting up to ZATCA_SIGN_LOCK_WAIT for it
+    Yields False without the lock if another signer kept it that long
+    """
+    cache = frappe.cache()
+    # Not thread-local, so the renewal thread can extend it
+    lock = cache.lock(
+        get_signing_lock_key(company),
+        timeout=ZATCA_SIGN_LOCK_TIMEOUT,
+        blocking_timeout=ZATCA_SIGN_LOCK_WAIT,
+        thread_local=False
+    )
+    if not lock.acquire():
+        yield False
+        return
+    
+    stop = threading.Event()
+    renewal = threading.Thread(target=renew_lock, args=(lock, stop), daemon=True)
+    renewal.start()
+    try:
+        # A fresh transaction, so reads see what the previous holder committed
+        frappe.db.commit()
+        yield True
+    finally:
+        stop.set()
+        renewal.join()
+        try:
+            lock.release()
+        except LockError:
+            # Expired, renewal could not reach Redis
+            pass
+
+
+def renew_lock(lock, stop):
+    """Reset the lock's timeout until the holder is done, so a slow signer keeps it"""
+    while not stop.wait(ZATCA_SIGN_LOCK_TIMEOUT / 3):
+        try:
+            lock.reacquire()
+        except LockError:
+            return
+
+
+def get_signing_lock_key(company) -> str:
+    return frappe.cache().make_key(f"smart_pos:zatca_signing:{company}")
+
+
+def wait_for_rate_limit(company):
+    """Block until a ZATCA call for company fits in the current one-second window"""
+    cache = frappe.cache()
+    while True:
+        window = int(time.time())
+        key = cache.make_key(f"smart_pos:zatca_rate:{company}:{window}")
+        pipe = cache.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 2)
+        if pipe.execute()[0] <= ZATCA_RATE_LIMIT:
+            return
+        time.sleep(max(window + 1 - time.time(), 0))
+
+
+def start_batch_signing(invoices) -> dict:
+    """Queue invoices for background signing and return the new batch's status"""
+    invoices = list(dict.fromkeys(name for name in invoices if name))
+    batch_id = frappe.generate_hash(length=12)
+    
+    pipe = frappe.cache().pipeline()
+    pipe.hset(get_batch_key(batch_id), mapping={
+        "user": frappe.session.user,
+        "status": "Queued" if invoices else "Completed",
+        "total": len(invoices),
+        "done": 0,
+        "success": 0,
+        "errors": 0,
+        "skipped": 0,
+        "generation": 0,
+        "heartbeat": int(time.time())
+    })
+    if invoices:
+        pipe.rpush(get_batch_key(batch_id, "pending"), *invoices)
+        pipe.sadd(get_registry_key(), batch_id)
+    for key in (get_batch_key(batch_id), get_batch_key(batch_id, "pending")):
+        pipe.expire(key, ZATCA_BATCH_TTL)
+    pipe.execute()
+    
+    if invoices:
+        enqueue_lanes(batch_id, 0, len(invoices))
+    return get_batch_status(batch_id)
+
+
+def enqueue_lanes(batch_id, generation, pending):
+    for lane in range(min(ZATCA_BATCH_LANES, pending)):
+        frappe.enqueue(
+            "smart_pos.smart_pos.utils.zatca_signing.run_signing_lane",
+            queue=ZATCA_BATCH_QUEUE,
+            timeout=ZATCA_LANE_TIMEOUT,
+            batch_id=batch_id,
+            lane=lane,
+            generation=generation
+        )
+
+
+def run_signing_lane(batch_id, lane, generation=0):
+    """Sign invoices from the batch's pending list until it is empty or the lane is superseded"""
+    cache = frappe.cache()
+    key = get_batch_key(batch_id)
+    pending_key = get_batch_key(batch_id, "pending")
+    # Per generation, so a superseded lane finishing its invoice cannot clear a new lane's entry
+    lane_field = f"lane:{generation}:{lane}"
+    
+    while True:
+        batch = get_batch(batch_id)
+        if not batch or batch.status == "Completed" or batch.generation != generation:
+            return
+        
+        pipe = cache.pipeline()
+        pipe.lpop(pending_key)
+        invoice_name = decode(pipe.execute()[0])
+        if not invoice_name:
+            return
+        
+        # Recorded before signing, so a resume can requeue it if this worker dies
+        pipe = cache.pipeline()
+        pipe.hset(key, mapping={"status": "Running", lane_field: invoice_name, "heartbeat": int(time.time())})
+        pipe.execute()
+        
+        result = sign_invoice(invoice_name)
+        frappe.db.commit()
+        
+        if result["status"] == "busy":
+            # Nothing was signed, try it again after the rest of the list
+            pipe = cache.pipeline()
+            pipe.rpush(pending_key, invoice_name)
+            pipe.hdel(key, lane_field)
+            pipe.hset(key, "heartbeat", int(time.time()))
+            pipe.execute()
+            continue
+        
+        counter = {"success": "success", "already_signed": "skipped"}.get(result["status"], "errors")
+        pipe = cache.pipeline()
+        pipe.hdel(key, lane_field)
+        pipe.hincrby(key, counter, 1)
+        pipe.hincrby(key, "done", 1)
+        pipe.hset(key, "heartbeat", int(time.time()))
+        done = pipe.execute()[2]
+        
+        # Exactly one lane sees the final count, and that one completes the batch
+        if done >= batch.total:
+            pipe = cache.pipeline()
+            pipe.hset(key, "status", "Completed")
+            pipe.srem(get_registry_key(), batch_id)
+            pipe.execute()
+            publish_batch_progress(batch_id)
+            return
+        
+        if done % PROGRESS_EVERY == 0:
+            publish_batch_progress(batch_id)
+
+
+def resume_batch(batch_id) -> dict:
+    """Requeue in-flight invoices of an interrupted batch and start a new generation of lanes"""
+    cache = frappe.cache()
+    key = get_batch_key(batch_id)
+    batch = get_batch(batch_id)
+    if not batch or batch.status == "Completed":
+        return get_batch_status(batch_id)
+    
+    pipe = cache.pipeline()
+    if batch.lanes:
+        pipe.lpush(get_batch_key(batch_id, "pending"), *batch.lanes.values())
+        pipe.hdel(key, *batch.lanes.keys())
+    pipe.hincrby(key, "generation", 1)
+    pipe.hset(key, mapping={"status": "Queued", "heartbeat": int(time.time())})
+    pipe.llen(get_batch_key(batch_id, "pending"))
+    results = pipe.execute()
+    
+    generation, pending = batch.generation + 1, results[-1]
+    if pending:
+        enqueue_lanes(batch_id, generation, pending)
+    return get_batch_status(batch_id)
+
+
+def resume_stale_batches():
+    """Resume batches whose lanes stopped reporting progress (scheduled every 5 minutes)"""
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.smembers(get_registry_key())
+    for batch_id in map(decode, pipe.execute()[0]):
+        batch = get_batch(batch_id)
+        if not batch:
+            # Expired
+            pipe = cache.pipeline()
+            pipe.srem(get_registry_key(), batch_id)
+            pipe.execute()
+        elif batch.status != "Completed" and time.time() - batch.heartbeat > ZATCA_STALE_AFTER:
+            resume_batch(batch_id)
+
+
+def get_batch(batch_id):
+    pipe = frappe.cache().pipeline()
+    pipe.hgetall(get_batch_key(batch_id))
+    values = {decode(field): decode(value) for field, value in pipe.execute()[0].items()}
+    if not values:
+        return None
+    
+    batch = frappe._dict(values)
+    for field in BATCH_COUNTERS:
+        batch[field] = int(batch.get(field) or 0)
+    batch.lanes = {field: name for field, name in values.items() if field.startswith("lane:")}
+    return batch
+
+
+def get_batch_status(batch_id) -> dict:
+    batch = get_batch(batch_id)
+    if not batch:
+        return {"batch_id": batch_id, "status": "Not Found"}
+    
+    return {
+        "batch_id": batch_id,
+        "status": batch.status,
+        "total": batch.total,
+        "done": batch.done,
+        "success": batch.success,
+        "errors": batch.errors,
+        "skipped": batch.skipped,
+        "progress": round(100 * batch.done / batch.total) if batch.total else 100
+    }
+
+
+def publish_batch_progress(batch_id):
+    batch = get_batch(batch_id)
+    if batch:
+        frappe.publish_realtime(ZATCA_BATCH_EVENT, get_batch_status(batch_id), user=batch.user)
+
+
+def get_batch_key(batch_id, part="state") -> str:
+    return frappe.cache().make_key(f"smart_pos:zatca_batch:{batch_id}:{part}")
+
+
+def get_registry_key() -> str:
+    return frappe.cache().make_key("smart_pos:zatca_batches")
+
+
+def decode(value):
+    return value.decode() if isinstance(value, bytes) else value